@@ -1,21 +1,38 @@
 # pandas series and dataframe algebra helper module
 # functions written assuming financial data is used as input
 
+from __future__ import annotations
+
 import math
-import pandas as pd
 import numpy as np
 
 from numbers import Real
 from typing import Union, List, Optional
 
-def rolling_volatility(close_prices: pd.Series, window: Optional[int] = 21) -> pd.Series:
+import kernels
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+Frameable = Union["pd.Series", "pd.DataFrame", np.ndarray]
+
+def _wrap(data: Frameable, values: np.ndarray) -> Frameable:
+    '''Wraps kernel output in the index/columns of the input, without copying.'''
+    if isinstance(data, np.ndarray):
+        return values
+    if isinstance(data, pd.Series):
+        return pd.Series(values, index=data.index, name=data.name, copy=False)
+    return pd.DataFrame(values, index=data.index, columns=data.columns, copy=False)
+
+def rolling_volatility(close_prices: Frameable, window: Optional[int] = 21, out: Optional[np.ndarray] = None) -> Frameable:
     '''
     Calculates annualized rolling volatility from a series of closing prices.
 
-    :param close_prices: A pandas Series of asset closing prices indexed by date.
+    :param close_prices: A pandas Series of asset closing prices indexed by date, or a wide DataFrame / 2-D array (time x tickers).
     :param window: The rolling window size in days used to compute standard deviation. Default is 21 (approx. one trading month).
+    :param out: (Optional) preallocated float64 array of the input's shape to write the result into.
 
-    :return: A pd.Series of annualized rolling volatility values.
+    :return: A pd.Series of annualized rolling volatility values (DataFrame / ndarray for wide input).
 
     **Examples**
 
@@ -31,8 +48,11 @@ def rolling_volatility(close_prices: pd.Series, window: Optional[int] = 21) -> p
     2024-01-23    0.209876
     ...
     dtype: float64
+
+    >>> energy = PriceUniverse('ticks/energy-us.txt').load(period='1y', interval='1d')
+    >>> rolling_volatility(energy) #every ticker in one pass
     '''
-    return close_prices.pct_change().rolling(window=window).std()*np.sqrt(252)
+    return _wrap(close_prices, kernels.rolling_volatility(np.asarray(close_prices, dtype=np.float64), window, out=out))
 
 def log(series: pd.Series) -> pd.Series:
     '''
@@ -54,13 +74,13 @@ def log(series: pd.Series) -> pd.Series:
     '''
     return np.log(series)
 
-def avg(series: pd.Series) -> np.float64:
+def avg(series: Frameable) -> Union[np.float64, pd.Series, np.ndarray]:
     '''
-    Returns mean of a pandas Series.
+    Returns mean of a pandas Series, skipping NaN.
 
-    :param series: A pandas Series of numeric values.
+    :param series: A pandas Series of numeric values, or a wide DataFrame / 2-D array (time x tickers).
 
-    :return: A single float representing the average of the input values.
+    :return: A single float representing the average of the input values (one per column for wide input).
 
     **Examples**
 
@@ -69,16 +89,20 @@ def avg(series: pd.Series) -> np.float64:
     >>> avg(s)
     25.0
     '''
+    if isinstance(series, np.ndarray):
+        means = kernels.mean(series)
+        return means[()] if means.ndim == 0 else means
     return series.mean()
 
-def rolling_avg(series: pd.Series, window: Optional[int] = 7) -> pd.Series:
+def rolling_avg(series: Frameable, window: Optional[int] = 7, out: Optional[np.ndarray] = None) -> Frameable:
     '''
     Computes the rolling average over a specified window for a pandas Series.
 
-    :param series: A pandas Series of numeric values.
+    :param series: A pandas Series of numeric values, or a wide DataFrame / 2-D array (time x tickers).
     :param window: The number of periods to include in each rolling average calculation. Default is 7.
+    :param out: (Optional) preallocated float64 array of the input's shape to write the result into.
 
-    :return: A pandas Series containing the rolling average values.
+    :return: A pandas Series containing the rolling average values (DataFrame / ndarray for wide input).
 
     **Examples**
 
@@ -96,16 +120,17 @@ def rolling_avg(series: pd.Series, window: Optional[int] = 7) -> pd.Series:
     8    8.0
     dtype: float64
     '''
-    return series.rolling(window=window).mean()
+    return _wrap(series, kernels.rolling_mean(np.asarray(series, dtype=np.float64), window, out=out))
 
-def rolling_var(close_prices: pd.Series, window: Optional[int] = 21) -> pd.Series:
+def rolling_var(close_prices: Frameable, window: Optional[int] = 21, out: Optional[np.ndarray] = None) -> Frameable:
     '''
     Calculates rolling variance of daily returns over a specified window.
 
-    :param close_prices: A pandas Series of asset closing prices indexed by date.
+    :param close_prices: A pandas Series of asset closing prices indexed by date, or a wide DataFrame / 2-D array (time x tickers).
     :param window: The number of periods used to compute rolling variance. Default is 21 (approx. one trading month).
+    :param out: (Optional) preallocated float64 array of the input's shape to write the result into.
 
-    :return: A pandas Series of rolling variance values.
+    :return: A pandas Series of rolling variance values (DataFrame / ndarray for wide input).
 
     **Examples**
 
@@ -122,7 +147,8 @@ def rolling_var(close_prices: pd.Series, window: Optional[int] = 21) -> pd.Serie
     ...
     dtype: float64
     '''
-    return close_prices.pct_change().rolling(window=window).var()
+    returns = kernels.pct_change(np.asarray(close_prices, dtype=np.float64), out=out)
+    return _wrap(close_prices, kernels.rolling_var(returns, window, out=returns))
 
 def add_timerespective(first: pd.Series, second: Union[pd.Series, Real]) -> pd.Series:
     if isinstance(second, pd.Series):
@@ -132,15 +158,18 @@ def add_timerespective(first: pd.Series, second: Union[pd.Series, Real]) -> pd.S
             raise ValueError("Indices do not match.")
     return first+second
 
-def add(primary: pd.Series, secondary: pd.Series) -> pd.Series:
+def add(primary: Union[pd.Series, np.ndarray], secondary: Union[pd.Series, np.ndarray]) -> Union[pd.Series, np.ndarray]:
     '''
     Adds values from a secondary Series to a primary Series element-wise.
 
-    :param primary: A pandas Series to be modified in-place.
-    :param secondary: A pandas Series whose values will be added to the primary Series.
+    :param primary: A pandas Series (or ndarray) to be modified in-place.
+    :param secondary: A pandas Series (or ndarray) whose values will be added to the primary Series.
 
     :return: A pandas Series with updated values after element-wise addition.
 
+    If secondary is shorter, only the first len(secondary) values of primary change. If it is longer,
+    the overlapping values are added and an IndexError is raised.
+
     **Examples**
 
     >>> import pandas as pd
@@ -153,11 +182,13 @@ def add(primary: pd.Series, secondary: pd.Series) -> pd.Series:
     3     4
     dtype: int64
     '''
-    secondary_values = secondary.values
-    for i in range(len(secondary_values)):
-        if i>len(primary):
-            return primary
-        primary.iloc[i] += secondary_values[i]
+    if isinstance(primary, np.ndarray):
+        return kernels.add_prefix(primary, secondary)
+    secondary_values = np.asarray(secondary)
+    n = min(len(primary), len(secondary_values))
+    primary.iloc[:n] += secondary_values[:n]
+    if len(secondary_values) > len(primary):
+        raise IndexError(f"Secondary of length {len(secondary_values)} does not fit primary of length {len(primary)}.")
     return primary
 
 def subtract_by_index(first: pd.Series, second: Union[pd.Series, Real]) -> pd.Series:
@@ -193,13 +224,13 @@ def difference(first: pd.Series, second: Union[pd.Series, Real]) -> pd.Series:
     return first-second
 
 # todo: return series
-def value_signs_diff(series: pd.Series) -> List[int]:
+def value_signs_diff(series: Frameable) -> List[int]:
     '''
     Computes the sign of the difference between consecutive values in a Series.
 
-    :param series: A pandas Series of numeric values.
+    :param series: A pandas Series (or ndarray) of numeric values, or a wide DataFrame / 2-D array (time x tickers).
 
-    :return: A list of integers where 1 indicates an increase and -1 indicates a decrease or no change.
+    :return: A list of integers where 1 indicates an increase and -1 indicates a decrease or no change (a list per row for wide input).
 
     **Examples**
 
@@ -208,16 +239,9 @@ def value_signs_diff(series: pd.Series) -> List[int]:
     >>> value_signs_diff(s)
     [1, -1, -1, 1]
     '''
-    signs = []
-    vals = series.values
-    for i in range(1, len(vals)):
-        if vals[i]-vals[i-1]>0:
-            signs.append(1)
-        else:
-            signs.append(-1)
-    return signs
+    return kernels.diff_signs(np.asarray(series)).tolist()
 
-def value_signs_series(series: pd.Series) -> pd.Series:
+def value_signs_series(series: Frameable) -> Frameable:
     '''
     Returns a pandas Series indicating the sign of change between consecutive values.
 
@@ -225,9 +249,9 @@ def value_signs_series(series: pd.Series) -> pd.Series:
     - 1 if the current value is greater than the previous
     - -1 if the current value is less than or equal to the previous
 
-    :param series: A pandas Series of numeric values.
+    :param series: A pandas Series (or ndarray) of numeric values, or a wide DataFrame / 2-D array (time x tickers).
 
-    :return: A pandas Series of integers representing the sign of change.
+    :return: A pandas Series of integers representing the sign of change (DataFrame / ndarray for wide or ndarray input).
 
     **Examples**
 
@@ -241,19 +265,16 @@ def value_signs_series(series: pd.Series) -> pd.Series:
     4    1
     dtype: int64
     '''
-    diffs = series.diff()
-    signs = diffs.apply(lambda x: 1 if x > 0 else -1 if x < 0 else -1)
-    signs.iloc[0] = 0
-    return signs.astype(int)
+    return _wrap(series, kernels.step_signs(np.asarray(series)))
 
 # todo: return series
-def value_diff(series: pd.Series) -> List[int]:
+def value_diff(series: Frameable) -> List[int]:
     '''
     Computes the difference between consecutive values in a Series.
 
-    :param series: A pandas Series of numeric values.
+    :param series: A pandas Series (or ndarray) of numeric values, or a wide DataFrame / 2-D array (time x tickers).
 
-    :return: A list of integers or floats representing the change from one value to the next.
+    :return: A list of integers or floats representing the change from one value to the next (a list per row for wide input).
 
     **Examples**
 
@@ -262,21 +283,18 @@ def value_diff(series: pd.Series) -> List[int]:
     >>> value_diff(s)
     [5, -3, 6]
     '''
-    diff = []
-    vals = series.values 
-    for i in range(1, len(vals)):
-        diff.append(vals[i]-vals[i-1])
-    return diff
+    return kernels.diff(np.asarray(series)).tolist()
 
-def value_diff_series(series: pd.Series) -> pd.Series:
+def value_diff_series(series: Frameable, out: Optional[np.ndarray] = None) -> Frameable:
     '''
     Computes the difference between consecutive values in a Series and returns the result as a pandas Series.
 
-    The first value is set to 0 to indicate no prior comparison.
+    The first value is set to 0 to indicate no prior comparison (as is any NaN difference).
 
-    :param series: A pandas Series of numeric values.
+    :param series: A pandas Series of numeric values, or a wide DataFrame / 2-D array (time x tickers).
+    :param out: (Optional) preallocated float64 array of the input's shape to write the result into.
 
-    :return: A pandas Series of differences between consecutive values.
+    :return: A pandas Series of differences between consecutive values (DataFrame / ndarray for wide input).
 
     **Examples**
 
@@ -289,16 +307,15 @@ def value_diff_series(series: pd.Series) -> pd.Series:
     3    6
     dtype: int64
     '''
-    diffs = series.diff().fillna(0)
-    return diffs.astype(np.float64)
+    return _wrap(series, kernels.diff_filled(np.asarray(series, dtype=np.float64), out=out))
 
-def normalize(data: Union[pd.Series, pd.DataFrame]) -> Union[pd.Series, pd.DataFrame]:
+def normalize(data: Frameable) -> Frameable:
     '''
     Normalizes a pandas Series or DataFrame using min-max scaling.
 
     Each value is scaled to a range between 0 and 1 based on its column or series minimum and maximum.
 
-    :param data: A pandas Series or DataFrame containing numeric values.
+    :param data: A pandas Series or DataFrame (or 1-D / 2-D array) containing numeric values.
 
     :return: A normalized Series or DataFrame with values scaled between 0 and 1.
 
@@ -322,11 +339,32 @@ def normalize(data: Union[pd.Series, pd.DataFrame]) -> Union[pd.Series, pd.DataF
     1  0.5  0.5
     2  1.0  1.0
     '''
-    if isinstance(data, pd.Series):
-        return (data-data.min())/(data.max()-data.min())
-    else:
-        normalized_df = data.apply(lambda x: (x - x.min()) / (x.max() - x.min()))
-        return normalized_df
+    if isinstance(data, np.ndarray):
+        low, high = np.nanmin(data, axis=0), np.nanmax(data, axis=0)
+        return (data-low)/(high-low)
+    return (data-data.min())/(data.max()-data.min())
+
+def scale(series: Frameable, initial: Real = 100, out: Optional[np.ndarray] = None) -> Frameable:
+    '''
+    Index-scales prices so each series starts at *initial*: phi(t) = P(t) / P(t_0) * initial.
+
+    t_0 is the first non-NaN row of each column, so tickers with a late first quote in an aligned
+    wide frame are scaled from their own first price.
+
+    :param series: A pandas Series of prices, or a wide DataFrame / 2-D array (time x tickers).
+    :param initial: scale value p of phi(t_0).
+    :param out: (Optional) preallocated float64 array of the input's shape to write the result into.
 
-def scale(series: pd.Series, initial: Real = 100) -> pd.Series:
-    return (series/series.iloc[0])*initial
+    :return: Scaled prices of the same type and shape as the input.
+
+    **Examples**
+
+    >>> import pandas as pd
+    >>> s = pd.Series([50, 55, 45])
+    >>> scale(s)
+    0    100.0
+    1    110.0
+    2     90.0
+    dtype: float64
+    '''
+    return _wrap(series, kernels.scale(np.asarray(series, dtype=np.float64), initial, out=out))
@@ -1,6 +1,5 @@
 # Module for various analytic plot displays #
 
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 
@@ -9,11 +8,17 @@ from numbers import Real
 
 import stats
 import algebra
+from hedge import rolling_hedge
+from sector_index import SectorIndex
 from instrument import Priceable
+from universe import PriceUniverse
 from static_types.quoteables import LOADABLE
 from static_types.quote_timing import QuoteTiming
 from static_types.time_range import Interval, Period
 from static_types.sector_tracker import SectorName, SectorTick
+from lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
 
 # base linear plot class
 class Plot:
@@ -52,11 +57,10 @@ class PricePlot:
         >>> enb_cvx_prices_day_seconds = PricePlot('ENB', 'CVX', price_timing=QuoteTiming.OPEN)
         >>> enb_cvx_prices_day_seconds.show() #displays ENB raw prices against CVX for last day, by seconds
         '''
-        self.price_series = []
-        for tick in ticks:
-            self.price_series.append(
-                Priceable(type=LOADABLE.STOCK, name_symbol=tick).get_price_history(price_timing=price_timing, period=period, interval=interval)
-                )
+        universe = PriceUniverse(ticks)
+        prices = universe.load(period=period, interval=interval, price_timing=price_timing)
+        universe.raise_failures()
+        self.price_series = [prices[tick].dropna().rename(f"{tick} {str(price_timing)}") for tick in ticks]
         i=0
         for s in self.price_series:
             plt.plot(s, label=ticks[i])
@@ -92,13 +96,11 @@ class ScaledPricePlot:
         >>> enb_cvx_prices_scaled = ScaledPricePlot('ENB', 'CVX', price_timing=QuoteTiming.CLOSE, period=Period.FIVE_DAY, interval=Interval.HOUR)
         >>> enb_cvx_prices_scaled.show()
         '''
-        self.price_series = []
-        for tick in ticks:
-            self.price_series.append(
-                algebra.scale(
-                Priceable(type=LOADABLE.STOCK, name_symbol=tick).get_price_history(price_timing=price_timing, period=period, interval=interval),
-                initial=scale_start)
-                )
+        universe = PriceUniverse(ticks)
+        prices = universe.load(period=period, interval=interval, price_timing=price_timing)
+        universe.raise_failures()
+        scaled = algebra.scale(prices, initial=scale_start)
+        self.price_series = [scaled[tick].dropna().rename(f"{tick} {str(price_timing)}") for tick in ticks]
         i=0
         for s in self.price_series:
             plt.plot(s, label=ticks[i])
@@ -117,7 +119,9 @@ class CompareStatDisplay:
                  interval: Union[Interval, str] = Interval.MINUTE,
                  quote_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
                  mal_window: Union[int, None] = None,
-                 maf_window: Union[int, None] = None
+                 maf_window: Union[int, None] = None,
+                 hedge_window: Union[int, None] = None,
+                 hedge_method: str = 'ols'
                  ):
         '''
         Comparative display that includes two plots:
@@ -131,6 +135,8 @@ class CompareStatDisplay:
         :param quote_timing: Close, Open, High, Low
         :param mal_window: (Optional) moving average window for leader priceable
         :param maf_window: (Optional) moving average window for follower priceable
+        :param hedge_window: (Optional) rolling hedge-ratio window, adds the residual spread L - (a + r*F) to axs[1]
+        :param hedge_method: 'ols' or 'tls' hedge-ratio regression
 
         **Usage**
 
@@ -161,9 +167,28 @@ class CompareStatDisplay:
             self.axs[0].plot(maf, label=f'{follower} Moving Avg')
         
         self.axs[1].plot(algebra.difference(l_prices_scaled, f_prices_scaled), label='L - F Diff', color='lightcoral')
+        if hedge_window != None:
+            legs = pd.concat([l_prices_scaled, f_prices_scaled], axis=1).dropna()
+            hedged = rolling_hedge(legs.iloc[:, 0], legs.iloc[:, 1], window=hedge_window, method=hedge_method)
+            self.axs[1].plot(hedged['spread'], label='L - (a + rF) Hedged', color='seagreen')
         self.axs[1].hlines(y=0, xmin=l_prices_scaled.index[0], xmax=l_prices_scaled.index[-1], color='black', linestyle='-')
 
-    def plot_sector_index(self, sector_index_tick: Union[SectorTick, str], quote_timing: Union[QuoteTiming, str]):
+    def plot_sector_index(self, sector_index_tick: Union[SectorTick, str, SectorIndex], quote_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE):
+        '''
+        Adds the sector index price to axs[0], scaled like leader and follower.
+
+        :param sector_index_tick: sector ETF ticker (downloaded), or a SectorIndex built from loaded constituents (no I/O)
+        :param quote_timing: Close, Open, High, Low of the ETF prices
+
+        **Examples**
+
+        >>> display = CompareStatDisplay('XOM', 'SLNG')
+        >>> display.plot_sector_index(SectorTick.ENERGY, QuoteTiming.CLOSE)
+        >>> display.plot_sector_index(SectorIndex.from_ticks('ticks/energy-us.txt', weights='cap')) #any custom sector
+        '''
+        if isinstance(sector_index_tick, SectorIndex):
+            self.axs[0].plot(algebra.scale(sector_index_tick.values), color='gray', label='Sector Index Price')
+            return
         load = Priceable(type='stock', name_symbol=sector_index_tick)
         price_series = load.get_price_history(period=self.per, interval=self.intr, price_timing=quote_timing)
         self.axs[0].plot(algebra.scale(price_series), color='gray', label='Sector Index Price')
@@ -0,0 +1,195 @@
+# asyncio fetch pipeline for priceable history #
+# bounded concurrency, token-bucket rate limiting and backoff on provider throttling #
+
+import random
+import asyncio
+import weakref
+import pandas as pd
+
+from typing import Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from providers import DataProvider, YFinanceProvider, RateLimitError
+from static_types.time_range import Interval, Period
+
+class TokenBucket:
+    '''
+    Token-bucket rate limiter: allows bursts of *capacity* requests and *rate* requests per second sustained.
+
+    Tokens are shared by every event loop using the bucket, its asyncio lock is created per running loop.
+
+    **Examples**
+
+    >>> bucket = TokenBucket(rate=2, capacity=5)
+    >>> await bucket.acquire() #returns immediately while tokens remain, otherwise waits for a refill
+    '''
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        '''
+        :param rate: tokens added per second
+        :param capacity: maximum tokens held, defaults to max(1, rate)
+        '''
+        if rate<=0:
+            raise ValueError("Token bucket rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self._last = None
+        self._locks = weakref.WeakKeyDictionary()
+
+    def _refill(self, now: float) -> None:
+        if self._last is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        async with lock:
+            self._refill(loop.time())
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill(loop.time())
+            self.tokens -= tokens
+
+class AsyncFetcher:
+    '''
+    Fetches history frames concurrently from a DataProvider.
+
+    At most *max_in_flight* requests run at once, request starts are limited by a token bucket, and
+    throttling errors (RateLimitError by default) are retried with exponential backoff and full jitter.
+    Providers exposing an async ahistory() are awaited directly, blocking providers run in worker threads.
+    A fetcher may be reused across event loops (ie: successive asyncio.run calls), the in-flight limit applies per loop.
+
+    **Examples**
+
+    >>> fetcher = AsyncFetcher(max_in_flight=8, rate=4)
+    >>> frames, failures = fetcher.run(read_ticks('ticks/energy-us.txt'), period='1d', interval='1m')
+    >>> failures
+    {'PBR.A': SymbolNotFoundError('No history returned for PBR.A.')}
+    '''
+    def __init__(self,
+                 provider: Optional[DataProvider] = None,
+                 max_in_flight: int = 8,
+                 rate: Optional[float] = 5.0,
+                 burst: Optional[float] = None,
+                 max_retries: int = 5,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0,
+                 retry_on: Tuple[Type[BaseException], ...] = (RateLimitError, ConnectionError, TimeoutError),
+                 seed: Optional[int] = None
+                 ) -> None:
+        '''
+        :param provider: history source, defaults to YFinanceProvider
+        :param max_in_flight: maximum concurrent requests
+        :param rate: (Optional) sustained requests per second, None disables rate limiting
+        :param burst: (Optional) token bucket capacity
+        :param max_retries: retries per request before the error is surfaced
+        :param base_delay: backoff delay of the first retry in seconds
+        :param max_delay: cap of a single backoff delay in seconds
+        :param retry_on: exception types that are retried
+        :param seed: (Optional) seed of the backoff jitter
+        '''
+        if max_in_flight<1:
+            raise ValueError("Fetcher requires at least 1 request in flight.")
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.rng = random.Random(seed)
+        self.retries = 0
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        '''
+        Returns the delay before retry *attempt* (0-based): uniform in [0, min(max_delay, base_delay * 2^attempt)],
+        and never shorter than a retry_after hint carried by the error.
+        '''
+        delay = self.rng.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _request(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str, None]) -> pd.DataFrame:
+        ahistory = getattr(self.provider, "ahistory", None)
+        if ahistory is not None:
+            return await ahistory(symbol, period, interval)
+        return await asyncio.to_thread(self.provider.history, symbol, period, interval)
+
+    async def fetch(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str] = None) -> pd.DataFrame:
+        '''
+        Fetches one history frame, retrying throttled requests.
+        '''
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            try:
+                async with semaphore:
+                    return await self._request(symbol, period, interval)
+            except self.retry_on as e:
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.backoff(attempt, e))
+                attempt += 1
+
+    async def fetch_many(self,
+                         symbols: Sequence[str],
+                         period: Union[Period, str],
+                         interval: Union[Interval, str] = None,
+                         timeout: Optional[float] = None
+                         ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, BaseException]]:
+        '''
+        Fetches many symbols concurrently.
+
+        :param symbols: ticker strings
+        :param period: period range for data lookback
+        :param interval: interval for price quoting during lookback period
+        :param timeout: (Optional) seconds after which unfinished requests are cancelled and reported as TimeoutError
+
+        :return: (frames by symbol, errors by symbol)
+
+        Cancelling the awaiting task cancels every outstanding request.
+        '''
+        tasks = {symbol: asyncio.ensure_future(self.fetch(symbol, period, interval)) for symbol in dict.fromkeys(symbols)}
+        try:
+            if tasks:
+                await asyncio.wait(tasks.values(), timeout=timeout)
+        except asyncio.CancelledError:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        frames, errors, pending = {}, {}, []
+        for symbol, task in tasks.items():
+            if not task.done() or task.cancelled():
+                task.cancel()
+                pending.append(task)
+                errors[symbol] = TimeoutError(f"Fetch of {symbol} cancelled after {timeout}s.")
+            elif task.exception() is not None:
+                errors[symbol] = task.exception()
+            else:
+                frames[symbol] = task.result()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return frames, errors
+
+    def run(self,
+            symbols: Sequence[str],
+            period: Union[Period, str],
+            interval: Union[Interval, str] = None,
+            timeout: Optional[float] = None
+            ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, BaseException]]:
+        '''
+        Blocking wrapper of fetch_many for scripts without a running event loop.
+        '''
+        return asyncio.run(self.fetch_many(symbols, period=period, interval=interval, timeout=timeout))
@@ -0,0 +1,248 @@
+# Vectorized leader/follower reversion backtests over divergence signals #
+# positions come from forward-filled entry/exit events, so no per-bar Python loop is needed #
+
+import os
+import itertools
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from numbers import Real
+from typing import Optional, Sequence, Mapping, Dict, List, Any
+
+import kernels
+from scanner import pair_indices
+from shared import SharedArray, ArraySpec, attach
+from store import ResultStore, digest
+
+RESULT_KIND = "backtest"
+
+# parameters a sweep grid may vary, with their defaults
+PARAMETERS = {"entry": 2.0, "exit": 0.0, "stop": None, "cost": 0.0, "hedge_window": None}
+
+METRICS = ("total_return", "sharpe", "max_drawdown", "trades", "win_rate", "avg_hold", "exposure")
+
+def _forward_fill(values: np.ndarray, events: np.ndarray, initial: int = 0) -> np.ndarray:
+    '''Holds values[t] of the last bar with an event (along axis 0), *initial* before the first event.'''
+    rows = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    last = np.maximum.accumulate(np.where(events, rows, -1), axis=0)
+    held = np.take_along_axis(values, np.maximum(last, 0), axis=0)
+    return np.where(last >= 0, held, initial)
+
+def positions(spread: np.ndarray, entry: Real, exit: Real = 0.0, stop: Optional[Real] = None) -> np.ndarray:
+    '''
+    Returns spread positions (+1 long leader / short follower, -1 the reverse, 0 flat) of every bar.
+
+    Short the spread when s > entry, long it when s < -entry, flat once |s| <= exit (hysteresis
+    between exit and entry). With a *stop*, |s| > stop closes the position and blocks re-entry until
+    |s| <= exit. NaN bars keep the current position. Each state is a forward fill of its events.
+
+    :param spread: 1-D or (time x pairs) spreads phi_L - phi_F, or hedge residuals
+    :param entry: divergence bias D that opens a position
+    :param exit: |spread| at or below which the position is closed, below *entry*
+    :param stop: (Optional) |spread| above which the position is stopped out, above *entry*
+
+    **Examples**
+
+    >>> positions(np.array([0, 1, 2.5, 1.5, 0.5, -0.1, -3, 4]), entry=2, exit=0.2)
+    array([ 0,  0, -1, -1, -1,  0,  1, -1], dtype=int8)
+    '''
+    if not 0 <= exit < entry:
+        raise ValueError("Exit threshold must be non-negative and below the entry threshold.")
+    if stop is not None and stop <= entry:
+        raise ValueError("Stop threshold must be above the entry threshold.")
+    s = np.asarray(spread, dtype=np.float64)
+    valid = ~np.isnan(s)
+    magnitude = np.where(valid, np.abs(s), np.nan)
+    with np.errstate(invalid='ignore'):
+        reset = valid & (magnitude <= exit)
+        stopped_out = valid & (magnitude > stop) if stop is not None else np.zeros(s.shape, dtype=bool)
+        blocked = _forward_fill(stopped_out.astype(np.int8), stopped_out | reset) == 1
+        short = valid & (s > entry) & ~blocked
+        long = valid & (s < -entry) & ~blocked
+    state = np.where(short, -1, np.where(long, 1, 0)).astype(np.int8)
+    return _forward_fill(state, short | long | reset | stopped_out).astype(np.int8)
+
+def _spread(leader: np.ndarray, follower: np.ndarray, hedge_window: Optional[int]) -> np.ndarray:
+    lead, follow = kernels.scale(leader), kernels.scale(follower)
+    if hedge_window is None:
+        return lead - follow
+    ratio, intercept = kernels.rolling_regression(follow, lead, hedge_window)
+    # estimates of the previous bar, so the signal never uses the bar it trades on
+    ratio = np.concatenate([np.full((1,) + ratio.shape[1:], np.nan), ratio[:-1]])
+    intercept = np.concatenate([np.full((1,) + intercept.shape[1:], np.nan), intercept[:-1]])
+    return lead - intercept - ratio * follow
+
+def simulate(leader: np.ndarray,
+             follower: np.ndarray,
+             entry: Real = 2.0,
+             exit: Real = 0.0,
+             stop: Optional[Real] = None,
+             cost: Real = 0.0,
+             hedge_window: Optional[int] = None
+             ) -> Dict[str, np.ndarray]:
+    '''
+    Simulates dollar-neutral spread trades on aligned leader/follower prices.
+
+    The position set at bar t's close (from positions() on the scaled spread, or the lagged hedge
+    residual when *hedge_window* is given) earns pos * (r_L - r_F) over bar t+1. Changing a position
+    costs *cost* per unit notional and leg.
+
+    :param leader: 1-D or (time x pairs) leader prices
+    :param follower: follower prices of the same shape
+    :param cost: proportional cost per leg traded, ie: 0.0005 for 5 bps
+
+    :return: dict of spread, position, pnl (per bar, net of cost), equity (cumulative pnl) arrays
+    '''
+    leader = np.asarray(leader, dtype=np.float64)
+    follower = np.asarray(follower, dtype=np.float64)
+    spread = _spread(leader, follower, hedge_window)
+    position = positions(spread, entry, exit, stop)
+    held = np.concatenate([np.zeros((1,) + position.shape[1:], dtype=np.int8), position[:-1]])
+    returns = np.nan_to_num(kernels.pct_change(leader) - kernels.pct_change(follower), nan=0.0)
+    changed = position != held
+    exit_cost = np.where(changed, 2 * cost * np.abs(held), 0.0)
+    entry_cost = np.where(changed, 2 * cost * np.abs(position), 0.0)
+    gross = held * returns
+    pnl = gross - exit_cost - entry_cost
+    return {
+        "spread": spread,
+        "position": position,
+        "held": held,
+        "pnl": pnl,
+        "equity": np.cumsum(pnl, axis=0),
+        "_trade_pnl": gross - exit_cost,
+        "_entry_cost": entry_cost,
+        }
+
+def summarize(result: Dict[str, np.ndarray], periods: int = 252) -> np.ndarray:
+    '''
+    Returns (pairs x METRICS) statistics of simulate() output, trades are aggregated with bincount.
+
+    :param periods: bars per year, for the annualized Sharpe ratio (ie: 252 * 390 for minute bars)
+    '''
+    pnl, position, held = (np.atleast_2d(result[key].T).T for key in ("pnl", "position", "held"))
+    length, pairs = pnl.shape
+    equity = np.cumsum(pnl, axis=0)
+    out = np.full((pairs, len(METRICS)), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:, 0] = equity[-1] if length else 0.0
+        out[:, 1] = pnl.mean(axis=0) / pnl.std(axis=0, ddof=1) * np.sqrt(periods)
+        out[:, 2] = (np.maximum.accumulate(np.maximum(equity, 0.0), axis=0) - equity).max(axis=0) if length else 0.0
+    # trades: entries are bars where a non-zero position differs from the one held into the bar
+    entries = ((position != 0) & (position != held)).T
+    trade = np.cumsum(entries.ravel()).reshape(pairs, length) - 1
+    held_trade = np.concatenate([np.full((pairs, 1), -1), trade[:, :-1]], axis=1)
+    holding = held.T != 0
+    count = int(entries.sum())
+    trade_pnl = np.bincount(held_trade[holding], weights=np.atleast_2d(result["_trade_pnl"].T)[holding], minlength=count)
+    trade_pnl -= np.bincount(trade[entries], weights=np.atleast_2d(result["_entry_cost"].T)[entries], minlength=count)
+    hold = np.bincount(held_trade[holding], minlength=count)
+    owner = np.flatnonzero(entries.ravel()) // max(length, 1)
+    trades = np.bincount(owner, minlength=pairs)
+    out[:, 3] = trades
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:, 4] = np.bincount(owner, weights=(trade_pnl > 0).astype(np.float64), minlength=pairs) / trades
+        out[:, 5] = np.bincount(owner, weights=hold.astype(np.float64), minlength=pairs) / trades
+        out[:, 6] = holding.mean(axis=1) if length else np.nan
+    return out
+
+def parameter_grid(grid: Mapping[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    '''
+    Expands {parameter: values} into every combination, filling unspecified PARAMETERS with defaults.
+
+    **Examples**
+
+    >>> parameter_grid({'entry': [1, 2], 'exit': [0, 0.5]})[1]
+    {'entry': 1, 'exit': 0.5, 'stop': None, 'cost': 0.0, 'hedge_window': None}
+    '''
+    unknown = [name for name in grid if name not in PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown backtest parameters {unknown}, expected {list(PARAMETERS)}.")
+    names = list(PARAMETERS)
+    values = [list(grid.get(name, [PARAMETERS[name]])) for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+def _sweep(prices: np.ndarray, leaders: np.ndarray, followers: np.ndarray, combos: List[Dict[str, Any]], periods: int) -> np.ndarray:
+    '''(pairs x combos x METRICS) of a chunk of pairs.'''
+    lead, follow = prices[:, leaders], prices[:, followers]
+    out = np.empty((len(leaders), len(combos), len(METRICS)))
+    for j, combo in enumerate(combos):
+        if combo["exit"] >= combo["entry"] or (combo["stop"] is not None and combo["stop"] <= combo["entry"]):
+            out[:, j] = np.nan
+            continue
+        out[:, j] = summarize(simulate(lead, follow, **combo), periods)
+    return out
+
+def _sweep_chunk(spec: ArraySpec, leaders: np.ndarray, followers: np.ndarray, combos: List[Dict[str, Any]], periods: int) -> np.ndarray:
+    return _sweep(attach(spec), leaders, followers, combos, periods)
+
+def sweep(prices: pd.DataFrame,
+          grid: Mapping[str, Sequence[Any]],
+          leaders: Optional[Sequence[str]] = None,
+          periods: int = 252,
+          store: Optional[ResultStore] = None,
+          processes: Optional[int] = None,
+          chunk: int = 32
+          ) -> pd.DataFrame:
+    '''
+    Backtests every parameter combination of *grid* on every leader/follower pair of a price frame.
+
+    Pairs are split into chunks that run in a process pool over a shared-memory copy of the prices.
+    With a ResultStore, each pair's rows are written as soon as its chunk finishes, under a digest of
+    the prices, the pair and the grid; rerunning the same sweep skips stored pairs, so an interrupted
+    sweep resumes where it stopped.
+
+    :param prices: aligned (time x tickers) prices, ie: PriceUniverse.load()
+    :param grid: {parameter: values} over PARAMETERS (entry, exit, stop, cost, hedge_window)
+    :param leaders: (Optional) leader tickers against every other ticker, defaults to all pairs
+    :param periods: bars per year for the Sharpe ratio
+    :param store: (Optional) ResultStore to stream per-pair results to and resume from
+    :param processes: worker processes, defaults to os.cpu_count(), 1 runs in this process
+    :param chunk: pairs per task
+
+    :return: one row per (pair, combination) with leader, follower, the parameters and METRICS
+
+    **Examples**
+
+    >>> prices = PriceUniverse('ticks/energy-us.txt').load(period='5d', interval='1m')
+    >>> results = sweep(prices, {'entry': [1, 1.5, 2, 3], 'exit': [0, 0.5], 'cost': [0.0002]},
+    ...                 periods=252*390, store=ResultStore())
+    >>> results.sort_values('sharpe', ascending=False).head()
+    '''
+    combos = parameter_grid(grid)
+    tickers = list(prices.columns)
+    values = prices.ffill().to_numpy(dtype=np.float64)
+    lead, follow = pair_indices(tickers, leaders)
+    data_key = digest(prices, periods)
+    keys = [digest(data_key, tickers[i], tickers[j], combos) for i, j in zip(lead, follow)]
+    frames: List[Optional[pd.DataFrame]] = [
+        store.get(RESULT_KIND, key) if store is not None else None for key in keys
+        ]
+    todo = np.array([p for p, frame in enumerate(frames) if frame is None], dtype=np.intp)
+    parameters = pd.DataFrame(combos)
+
+    def collect(rows: np.ndarray, metrics: np.ndarray) -> None:
+        for p, row in zip(rows, metrics):
+            frame = pd.concat([parameters, pd.DataFrame(row, columns=list(METRICS))], axis=1)
+            frame.insert(0, "follower", tickers[follow[p]])
+            frame.insert(0, "leader", tickers[lead[p]])
+            frames[p] = frame
+            if store is not None:
+                store.put(RESULT_KIND, keys[p], frame)
+
+    parts = [todo[start:start + chunk] for start in range(0, len(todo), chunk)]
+    processes = processes if processes is not None else (os.cpu_count() or 1)
+    if processes <= 1 or len(parts) <= 1:
+        for rows in parts:
+            collect(rows, _sweep(values, lead[rows], follow[rows], combos, periods))
+    else:
+        with SharedArray(values) as shared:
+            with ProcessPoolExecutor(max_workers=min(processes, len(parts))) as pool:
+                futures = {
+                    pool.submit(_sweep_chunk, shared.spec, lead[rows], follow[rows], combos, periods): rows
+                    for rows in parts
+                    }
+                for future in as_completed(futures):
+                    collect(futures[future], future.result())
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,156 @@
+# OHLCV bar container shared by every quote timing of one priceable request #
+
+import pandas as pd
+import numpy as np
+
+from typing import Union, Optional
+
+from static_types.quote_timing import QuoteTiming
+
+FIELDS = (QuoteTiming.OPEN.value, QuoteTiming.HIGH.value, QuoteTiming.LOW.value, QuoteTiming.CLOSE.value, 'Volume')
+FIELD_ROW = {field: i for i, field in enumerate(FIELDS)}
+
+class BarFrame:
+    '''
+    Holds one fetched OHLCV history as a (field x time) float64 block and serves each field as a view.
+
+    The block is read-only, so served Series share memory with it and cannot be modified in place
+    (use .copy() on a served Series before mutating it). Priceable.get_price_history and
+    get_volume_history return such copies.
+
+    **Examples**
+
+    >>> from instrument import Priceable
+    >>> bars = Priceable(type='stock', name_symbol='XOM').get_bars(period='5d', interval='1h')
+    >>> bars.close
+    Datetime
+    2025-08-18 09:30:00-04:00    108.419998
+    ...
+    Name: Close, Length: 35, dtype: float64
+    >>> bars[QuoteTiming.HIGH].max() - bars[QuoteTiming.LOW].min()
+    2.3899993896484375
+    '''
+    def __init__(self, frame: pd.DataFrame, symbol: Optional[str] = None) -> None:
+        '''
+        :param frame: history frame with Open, High, Low, Close, Volume columns
+        :param symbol: ticker symbol of the history
+        '''
+        self.symbol = symbol
+        self.index = frame.index
+        block = np.empty((len(FIELDS), len(frame)), dtype=np.float64)
+        for field, row in FIELD_ROW.items():
+            if field in frame.columns:
+                block[row] = frame[field].to_numpy(dtype=np.float64)
+            else:
+                block[row] = np.nan
+        block.flags.writeable = False
+        self.values = block
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def column(self, field: Union[QuoteTiming, str]) -> np.ndarray:
+        '''
+        Returns one field as a read-only 1-D ndarray view.
+        '''
+        field = field.value if isinstance(field, QuoteTiming) else field
+        if field not in FIELD_ROW:
+            raise KeyError(f"Unknown bar field {field}. Expected one of {FIELDS}.")
+        return self.values[FIELD_ROW[field]]
+
+    def series(self, field: Union[QuoteTiming, str], name: Optional[str] = None) -> pd.Series:
+        '''
+        Returns one field as a pd.Series view on the bar block.
+
+        :param field: Open, High, Low, Close, Volume
+        :param name: (Optional) series name, defaults to the field name
+        '''
+        values = self.column(field)
+        if name is None:
+            name = field.value if isinstance(field, QuoteTiming) else field
+        return pd.Series(values, index=self.index, name=name, copy=False)
+
+    def __getitem__(self, field: Union[QuoteTiming, str]) -> pd.Series:
+        return self.series(field)
+
+    @property
+    def open(self) -> pd.Series:
+        return self.series(QuoteTiming.OPEN)
+
+    @property
+    def high(self) -> pd.Series:
+        return self.series(QuoteTiming.HIGH)
+
+    @property
+    def low(self) -> pd.Series:
+        return self.series(QuoteTiming.LOW)
+
+    @property
+    def close(self) -> pd.Series:
+        return self.series(QuoteTiming.CLOSE)
+
+    @property
+    def volume(self) -> pd.Series:
+        return self.series('Volume')
+
+    def to_frame(self) -> pd.DataFrame:
+        '''Returns a (copied) DataFrame with one column per field.'''
+        return pd.DataFrame(self.values.T.copy(), index=self.index, columns=list(FIELDS))
+
+# calendar lookback per period, session based periods (1d, 5d) are handled by trim_to_period
+PERIOD_OFFSET = {
+    'mo': lambda n: pd.DateOffset(months=n),
+    'y': lambda n: pd.DateOffset(years=n),
+}
+
+def trim_to_period(frame: pd.DataFrame, period: str) -> pd.DataFrame:
+    '''
+    Trims a history frame to the trailing lookback of a yfinance period string, anchored at its last bar.
+
+    :param frame: history frame indexed by timestamp
+    :param period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
+
+    **Examples**
+
+    >>> trim_to_period(two_weeks_of_minute_bars, '5d').index.normalize().nunique()
+    5
+    '''
+    period = period.value if hasattr(period, 'value') else str(period)
+    if len(frame)==0 or period=='max':
+        return frame
+    last = frame.index[-1]
+    if period=='ytd':
+        return frame[frame.index >= last.normalize().replace(month=1, day=1)]
+    if period.endswith('d'):
+        sessions = frame.index.normalize()
+        keep = sessions.unique()[-int(period[:-1]):]
+        return frame[sessions.isin(keep)]
+    for unit, offset in PERIOD_OFFSET.items():
+        if period.endswith(unit):
+            return frame[frame.index > last - offset(int(period[:-len(unit)]))]
+    raise ValueError(f"Unknown period {period}.")
+
+# bar length per yfinance interval string
+INTERVAL_LENGTH = {
+    '1m': pd.Timedelta(minutes=1),
+    '2m': pd.Timedelta(minutes=2),
+    '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15),
+    '30m': pd.Timedelta(minutes=30),
+    '60m': pd.Timedelta(hours=1),
+    '90m': pd.Timedelta(minutes=90),
+    '1h': pd.Timedelta(hours=1),
+    '1d': pd.Timedelta(days=1),
+    '5d': pd.Timedelta(days=5),
+    '7d': pd.Timedelta(days=7),
+    '1wk': pd.Timedelta(days=7),
+}
+
+def interval_length(interval: Union[str, None]) -> pd.Timedelta:
+    '''
+    Returns the bar length of a yfinance interval string (None is the yfinance default of 1d).
+    '''
+    interval = '1d' if interval is None else (interval.value if hasattr(interval, 'value') else str(interval))
+    if interval not in INTERVAL_LENGTH:
+        raise ValueError(f"No fixed bar length for interval {interval}.")
+    return INTERVAL_LENGTH[interval]
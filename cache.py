@@ -0,0 +1,306 @@
+# Persistent on-disk cache for priceable bar history #
+# Frames are stored as parquet files, one per (symbol, period, interval) #
+
+import os
+import re
+import json
+import atexit
+import time
+import threading
+import pandas as pd
+
+from enum import Enum
+from typing import Optional, Union, Dict, Any, List
+
+from static_types.time_range import Interval, Period
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "COMOVEMENT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "market-comovement")
+    )
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# seconds a cached frame is served before it is considered stale, by bar interval
+INTERVAL_TTL = {
+    Interval.MINUTE.value: 60,
+    Interval.TWO_MINUTE.value: 120,
+    Interval.FIVE_MINUTE.value: 300,
+    Interval.HOUR.value: 60 * 60,
+    Interval.DAY.value: 4 * 60 * 60,
+    Interval.FIVE_DAY.value: 12 * 60 * 60,
+    Interval.WEEK.value: 12 * 60 * 60,
+    Interval.MONTH.value: 24 * 60 * 60,
+    Interval.THREE_MONTH.value: 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+def key_part(value: Union[Enum, str, None], default: str = Interval.DAY.value) -> str:
+    '''
+    Returns the plain string form of a Period/Interval enum or string, used for cache keys.
+    '''
+    if value is None:
+        return default
+    if isinstance(value, Enum):
+        return str(value.value)
+    return str(value)
+
+class BarCache:
+    '''
+    Persistent cache of OHLCV history frames keyed by (symbol, period, interval).
+
+    Each entry is stamped with the time of its last bar and the time it was fetched. An entry is fresh
+    while it is younger than the TTL of its interval (see INTERVAL_TTL). Total size on disk is capped
+    at max_bytes, least recently used entries are evicted first.
+
+    The time of the last bar is index metadata (last_bar) rather than part of the key: a request
+    never knows it in advance, and a newer fetch of the same request replaces the entry.
+
+    Reads only update access times in memory. The index file is rewritten by put(), invalidation and
+    eviction, and by a read at most once per *access_flush* seconds, so bulk loads cost file reads only.
+    Parquet files are read and written outside the lock, which only guards the index.
+
+    Several processes may share a root: every index write first merges the index on disk (the newer
+    fetch of a key wins, entries whose files are gone are dropped), so entries put by another process
+    are kept. There is no lock between processes, so two writes in the same instant can still lose an
+    entry; its parquet file then stays on disk untracked until the key is put again.
+
+    **Examples**
+
+    >>> from cache import BarCache
+    >>> cache = BarCache(root='/tmp/bars', max_bytes=64*1024**2)
+    >>> cache.put('XOM', '1mo', '1d', frame)
+    >>> cache.get('XOM', '1mo', '1d')
+                                     Open        High         Low       Close    Volume  Dividends  Stock Splits
+    Date
+    2025-07-10 00:00:00-04:00  110.970001  112.550003  110.589996  112.269997  15317300        0.0           0.0
+    ...
+    '''
+    INDEX_FILE = "index.json"
+
+    def __init__(self,
+                 root: str = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: Optional[Dict[str, float]] = None,
+                 access_flush: float = 60
+                 ) -> None:
+        '''
+        :param root: directory holding parquet files and the cache index
+        :param max_bytes: size cap of all cached files, in bytes
+        :param ttl: (Optional) per-interval freshness overrides in seconds, ie: {'1m': 30}
+        :param access_flush: minimum seconds between index writes caused only by reads (LRU access times)
+        '''
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = dict(INTERVAL_TTL)
+        if ttl is not None:
+            self.ttl.update({key_part(k): v for k, v in ttl.items()})
+        self.access_flush = access_flush
+        self._lock = threading.RLock()
+        os.makedirs(self.root, exist_ok=True)
+        self._index = self._read_index()
+        self._accessed = False
+        self._written_at = time.time()
+
+    @staticmethod
+    def make_key(symbol: str, period: Union[Period, str], interval: Union[Interval, str, None]) -> str:
+        return f"{symbol}|{key_part(period)}|{key_part(interval)}"
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        path = os.path.join(self.root, self.INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _merge_index(self) -> None:
+        '''Merges entries written by other processes into the in-memory index and drops entries whose files are gone.'''
+        for key, meta in self._read_index().items():
+            ours = self._index.get(key)
+            if ours is None or meta["fetched_at"] > ours["fetched_at"]:
+                accessed = meta["accessed_at"] if ours is None else max(meta["accessed_at"], ours["accessed_at"])
+                self._index[key] = dict(meta, accessed_at=accessed)
+            else:
+                ours["accessed_at"] = max(ours["accessed_at"], meta["accessed_at"])
+        files = {entry.name for entry in os.scandir(self.root)}
+        for key in [key for key, meta in self._index.items() if meta["file"] not in files]:
+            del self._index[key]
+
+    def _write_index(self) -> None:
+        self._merge_index()
+        path = os.path.join(self.root, self.INDEX_FILE)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, path)
+        self._accessed = False
+        self._written_at = time.time()
+
+    def flush(self) -> None:
+        '''Writes access times recorded by reads since the last index write.'''
+        with self._lock:
+            if self._accessed:
+                self._write_index()
+
+    def _file_name(self, key: str) -> str:
+        return re.sub(r"[^A-Za-z0-9._-]", "_", key.replace("|", "__")) + ".parquet"
+
+    def ttl_for(self, interval: Union[Interval, str, None]) -> float:
+        return self.ttl.get(key_part(interval), DEFAULT_TTL)
+
+    def entry(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str, None]) -> Optional[Dict[str, Any]]:
+        '''
+        Returns index metadata of a cached entry (fresh or stale), or None.
+        '''
+        with self._lock:
+            meta = self._index.get(self.make_key(symbol, period, interval))
+            return dict(meta) if meta is not None else None
+
+    def find(self, symbol: str, interval: Union[Interval, str, None] = None) -> List[Dict[str, Any]]:
+        '''
+        Returns index metadata of every cached entry of a symbol, optionally narrowed to an interval.
+        '''
+        with self._lock:
+            return [
+                dict(meta) for meta in self._index.values()
+                if meta["symbol"] == symbol and (interval is None or meta["interval"] == key_part(interval))
+                ]
+
+    def is_fresh(self, meta: Dict[str, Any], now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - meta["fetched_at"] < self.ttl_for(meta["interval"])
+
+    def get(self,
+            symbol: str,
+            period: Union[Period, str],
+            interval: Union[Interval, str, None],
+            allow_stale: bool = False
+            ) -> Optional[pd.DataFrame]:
+        '''
+        Returns cached history frame, or None on a miss or a stale entry.
+
+        :param symbol: ticker symbol
+        :param period: lookback period of the cached request
+        :param interval: bar interval of the cached request
+        :param allow_stale: return the entry even if its TTL has passed
+        '''
+        key = self.make_key(symbol, period, interval)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None or (not allow_stale and not self.is_fresh(meta)):
+                return None
+            path = os.path.join(self.root, meta["file"])
+        try:
+            frame = pd.read_parquet(path)
+        except (OSError, ValueError):
+            with self._lock:
+                # only drop the entry that failed, not one a concurrent put() just replaced it with
+                if self._index.get(key) is meta:
+                    self._drop(key)
+                    self._write_index()
+            return None
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is not None:
+                meta["accessed_at"] = time.time()
+                self._accessed = True
+                if meta["accessed_at"] - self._written_at >= self.access_flush:
+                    self._write_index()
+        return frame
+
+    def put(self,
+            symbol: str,
+            period: Union[Period, str],
+            interval: Union[Interval, str, None],
+            frame: pd.DataFrame,
+            fetched_at: Optional[float] = None
+            ) -> None:
+        '''
+        Stores a history frame and evicts least recently used entries above the size cap.
+        '''
+        key = self.make_key(symbol, period, interval)
+        name = self._file_name(key)
+        path = os.path.join(self.root, name)
+        now = time.time()
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        frame.to_parquet(tmp)
+        with self._lock:
+            # replaced under the lock so the file on disk always matches the indexed entry
+            os.replace(tmp, path)
+            self._index[key] = {
+                "file": name,
+                "symbol": symbol,
+                "period": key_part(period),
+                "interval": key_part(interval),
+                "last_bar": frame.index[-1].isoformat() if len(frame) else None,
+                "fetched_at": now if fetched_at is None else fetched_at,
+                "accessed_at": now,
+                "bytes": os.path.getsize(path),
+            }
+            self._merge_index()
+            self._evict(keep=key)
+            self._write_index()
+
+    def invalidate(self, symbol: str, period: Union[Period, str, None] = None, interval: Union[Interval, str, None] = None) -> None:
+        '''
+        Drops cached entries of a symbol, optionally narrowed to a period and/or interval.
+        '''
+        with self._lock:
+            for key, meta in list(self._index.items()):
+                if meta["symbol"] != symbol:
+                    continue
+                if period is not None and meta["period"] != key_part(period):
+                    continue
+                if interval is not None and meta["interval"] != key_part(interval):
+                    continue
+                self._drop(key)
+            self._write_index()
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._index):
+                self._drop(key)
+            self._write_index()
+
+    def size(self) -> int:
+        '''Returns total bytes of cached files.'''
+        with self._lock:
+            return sum(meta["bytes"] for meta in self._index.values())
+
+    def _drop(self, key: str) -> None:
+        meta = self._index.pop(key, None)
+        if meta is None:
+            return
+        try:
+            os.remove(os.path.join(self.root, meta["file"]))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        total = sum(meta["bytes"] for meta in self._index.values())
+        for key, meta in sorted(self._index.items(), key=lambda item: item[1]["accessed_at"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= meta["bytes"]
+            self._drop(key)
+
+_default_cache: Optional[BarCache] = None
+_default_cache_lock = threading.Lock()
+
+def default_cache() -> BarCache:
+    '''
+    Returns the process-wide cache rooted at DEFAULT_CACHE_DIR (env COMOVEMENT_CACHE_DIR).
+
+    Safe to call from loader threads: exactly one BarCache (and in-memory index) is ever created.
+    '''
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = BarCache()
+                atexit.register(_default_cache.flush)
+    return _default_cache
@@ -0,0 +1,66 @@
+# Shared synthetic price fixtures for the test modules #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from typing import Optional, Union
+
+TICKERS = ("XOM", "CVX", "COP", "EOG", "OXY")
+
+def synthetic_prices(rows: int = 300,
+                     tickers: Union[int, tuple] = 3,
+                     seed: int = 0,
+                     vol: Union[float, np.ndarray] = 0.01,
+                     drift: Union[float, np.ndarray] = 0.0,
+                     common: float = 0.0,
+                     missing: float = 0.0,
+                     start: float = 100.0,
+                     days: Optional[int] = None
+                     ) -> pd.DataFrame:
+    '''
+    Returns (rows x tickers) geometric random walk prices, start * exp(cumsum(log returns)).
+
+    :param tickers: number of columns (energy tickers, then T05, T06, ...) or the column names
+    :param vol: per-bar volatility, an array broadcasting to (rows, tickers) switches regimes per bar
+    :param drift: per-bar mean log return, broadcast like vol
+    :param common: volatility of a random walk shared by every column
+    :param missing: fraction of bars set to NaN
+    :param days: (Optional) spread the bars over that many 1m sessions from 2025-08-18 09:30 New York, else a RangeIndex
+    '''
+    rng = np.random.default_rng(seed)
+    names = list(tickers) if isinstance(tickers, tuple) else [
+        TICKERS[i] if i < len(TICKERS) else f"T{i:02d}" for i in range(tickers)
+        ]
+    shared = np.cumsum(rng.standard_normal(rows)) * common if common else np.zeros(rows)
+    returns = drift + vol * rng.standard_normal((rows, len(names)))
+    values = start * np.exp(shared[:, None] + np.cumsum(returns, axis=0))
+    values[rng.random(values.shape) < missing] = np.nan
+    index = None
+    if days is not None:
+        per_day = -(-rows // days)
+        index = pd.DatetimeIndex([
+            pd.Timestamp("2025-08-18 09:30", tz="America/New_York") + pd.Timedelta(days=i // per_day, minutes=i % per_day)
+            for i in range(rows)
+            ])
+    return pd.DataFrame(values, index=index, columns=names)
+
+def synthetic_bars(prices: pd.DataFrame, volume: float = 1000.0) -> dict:
+    '''
+    Returns one flat OHLCV frame per column of *prices* (Open = High = Low = Close), for FrameProvider.
+    '''
+    return {
+        tick: pd.DataFrame({"Open": prices[tick], "High": prices[tick], "Low": prices[tick], "Close": prices[tick],
+                            "Volume": volume})
+        for tick in prices.columns
+        }
+
+@pytest.fixture
+def make_prices():
+    '''Factory of synthetic price frames, see synthetic_prices.'''
+    return synthetic_prices
+
+@pytest.fixture
+def make_bars():
+    '''Factory of per-ticker OHLCV fixture frames from a price frame, see synthetic_bars.'''
+    return synthetic_bars
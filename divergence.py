@@ -0,0 +1,243 @@
+# Divergence episodes: maximal runs of bars where |phi_L(t) - phi_F(t)| > D #
+# batch detection is a vectorized run-length encoding, EpisodeTracker extends/closes episodes bar by bar #
+
+import numpy as np
+import pandas as pd
+
+from numbers import Real
+from typing import Union, Optional, Sequence, Tuple
+
+import algebra
+
+EPISODE_COLUMNS = ("pair", "start", "end", "peak_time", "peak", "side", "duration", "area", "open")
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Run-length encodes a (pairs x time) boolean mask.
+
+    :return: flat (row-major) start and inclusive end positions of every run of True, in pair then time order
+    '''
+    pairs, length = mask.shape
+    padded = np.zeros((pairs, length + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    # positions in the diff grid are (pair, t) with row width length+1; map back to width *length*
+    width = length + 1
+    starts = (starts // width) * length + starts % width
+    ends = (ends // width) * length + ends % width - 1
+    return starts, ends
+
+def _episodes(spread: np.ndarray, threshold: Real) -> dict:
+    '''
+    Episode statistics of a (time x pairs) spread block, one entry per episode.
+    '''
+    values = np.ascontiguousarray(spread.T)
+    pairs, length = values.shape
+    magnitude = np.abs(values)
+    with np.errstate(invalid='ignore'):
+        mask = magnitude > threshold
+    starts, ends = _runs(mask)
+    flat = magnitude.ravel()
+    if len(starts):
+        bounds = np.empty(2 * len(starts), dtype=np.intp)
+        bounds[0::2], bounds[1::2] = starts, ends + 1
+        # reduceat over [start, end+1) pairs; the trailing bound may equal len(flat), so reduce a padded copy
+        padded = np.append(flat, 0.0)
+        excess = np.append(flat - threshold, 0.0)
+        peak = np.maximum.reduceat(padded, bounds)[0::2]
+        area = np.add.reduceat(excess, bounds)[0::2]
+        # first bar of each episode that reaches its peak
+        duration = ends - starts + 1
+        inside = np.repeat(starts, duration) + (np.arange(duration.sum()) - np.repeat(np.cumsum(duration) - duration, duration))
+        run = np.repeat(np.arange(len(starts)), duration)
+        hits = flat[inside] == peak[run]
+        _, first = np.unique(run[hits], return_index=True)
+        peak_at = inside[hits][first]
+    else:
+        peak = area = np.empty(0)
+        duration = peak_at = np.empty(0, dtype=np.intp)
+    return {
+        "pair": starts // length if length else starts,
+        "start": starts % length if length else starts,
+        "end": ends % length if length else ends,
+        "peak_time": peak_at % length if length else peak_at,
+        "peak": peak,
+        "side": np.sign(values.ravel()[peak_at]).astype(np.int64),
+        "duration": duration,
+        "area": area,
+        "open": (ends % length == length - 1) if length else np.zeros(0, dtype=bool),
+        }
+
+def episodes(spread: Union[pd.Series, pd.DataFrame, np.ndarray], threshold: Real) -> pd.DataFrame:
+    '''
+    Returns every divergence episode of one or many spreads phi_L - phi_F.
+
+    An episode is a maximal run of bars with |spread| > *threshold* (the README's divergence bias D).
+    NaN bars are not diverging. All pairs are run-length encoded in one vectorized pass.
+
+    :param spread: a Series (one pair), or a (time x pairs) DataFrame / array of spreads
+    :param threshold: divergence bias D > 0
+
+    :return: one row per episode with columns
+        pair (column label or position), start, end (inclusive), peak_time (index labels, or positions for
+        arrays), peak (max |spread|), side (+1 when the leader is above), duration (bars),
+        area (sum of |spread| - D over the episode, in scaled-price units x bars) and
+        open (episode still running at the last bar).
+
+    **Examples**
+
+    >>> spread = algebra.difference(algebra.scale(xom), algebra.scale(cvx))
+    >>> episodes(spread, threshold=1.5)
+       pair                     start                       end  ...  duration      area   open
+    0     0 2025-08-18 10:41:00-04:00 2025-08-18 10:58:00-04:00  ...        18  6.210341  False
+    ...
+    '''
+    if threshold <= 0:
+        raise ValueError("Divergence threshold must be positive.")
+    values = np.asarray(spread, dtype=np.float64)
+    single = values.ndim == 1
+    found = _episodes(values[:, None] if single else values, threshold)
+    table = pd.DataFrame(found, columns=list(EPISODE_COLUMNS))
+    if isinstance(spread, (pd.Series, pd.DataFrame)):
+        for column in ("start", "end", "peak_time"):
+            table[column] = spread.index[table[column].to_numpy()]
+    if isinstance(spread, pd.DataFrame):
+        table["pair"] = spread.columns[table["pair"].to_numpy()]
+    elif isinstance(spread, pd.Series):
+        # a list, so a (leader, follower) tuple name labels every row instead of being spread over them
+        table["pair"] = [spread.name] * len(table)
+    return table
+
+def pair_spreads(prices: pd.DataFrame,
+                 pairs: Optional[Sequence[Tuple[str, str]]] = None,
+                 scale_start: Real = 100
+                 ) -> pd.DataFrame:
+    '''
+    Returns the scaled spreads phi_L - phi_F of leader/follower pairs as a (time x pairs) frame.
+
+    :param prices: aligned (time x tickers) prices, ie: PriceUniverse.load()
+    :param pairs: (Optional) (leader, follower) tickers, defaults to every pair with the earlier ticker as leader
+    :param scale_start: value of phi(t_0)
+
+    :return: DataFrame with (leader, follower) MultiIndex columns
+    '''
+    tickers = list(prices.columns)
+    if pairs is None:
+        lead, follow = np.triu_indices(len(tickers), 1)
+        pairs = [(tickers[i], tickers[j]) for i, j in zip(lead, follow)]
+    position = {tick: i for i, tick in enumerate(tickers)}
+    lead = np.array([position[leader] for leader, _ in pairs], dtype=np.intp)
+    follow = np.array([position[follower] for _, follower in pairs], dtype=np.intp)
+    scaled = algebra.scale(prices.to_numpy(dtype=np.float64), initial=scale_start)
+    return pd.DataFrame(algebra.difference(scaled[:, lead], scaled[:, follow]),
+                        index=prices.index,
+                        columns=pd.MultiIndex.from_tuples(list(pairs), names=["leader", "follower"]))
+
+def detect(prices: pd.DataFrame,
+           threshold: Real,
+           pairs: Optional[Sequence[Tuple[str, str]]] = None,
+           scale_start: Real = 100
+           ) -> pd.DataFrame:
+    '''
+    Returns the divergence episodes of leader/follower pairs of a price frame, with leader and follower columns.
+
+    **Examples**
+
+    >>> prices = PriceUniverse('ticks/energy-us.txt').load(period='5d', interval='1m')
+    >>> detect(prices, threshold=2, pairs=[('XOM', 'CVX'), ('XOM', 'SHEL')])
+    '''
+    table = episodes(pair_spreads(prices, pairs, scale_start), threshold)
+    leaders, followers = zip(*table.pop("pair")) if len(table) else ((), ())
+    table.insert(0, "follower", list(followers))
+    table.insert(0, "leader", list(leaders))
+    return table
+
+class EpisodeTracker:
+    '''
+    Streaming episode detection for one or many pairs.
+
+    update() takes the latest spread of every pair and returns the episodes that just closed; episodes
+    that are still open are available from open_episodes(). State is a handful of arrays per pair, so
+    each bar is O(pairs) regardless of how long an episode runs.
+
+    **Examples**
+
+    >>> tracker = EpisodeTracker(threshold=2, names=spreads.columns)
+    >>> for time, row in spreads.iterrows():
+    ...     closed = tracker.update(row.to_numpy(), time)
+    '''
+    def __init__(self, threshold: Real, names: Optional[Sequence] = None) -> None:
+        if threshold <= 0:
+            raise ValueError("Divergence threshold must be positive.")
+        self.threshold = threshold
+        self.names = None if names is None else list(names)
+        self.bars = 0
+        self._active = None
+
+    def _start(self, pairs: int) -> None:
+        self._active = np.zeros(pairs, dtype=bool)
+        self._start_time = np.empty(pairs, dtype=object)
+        self._peak_time = np.empty(pairs, dtype=object)
+        self._peak = np.zeros(pairs)
+        self._side = np.zeros(pairs, dtype=np.int64)
+        self._duration = np.zeros(pairs, dtype=np.int64)
+        self._area = np.zeros(pairs)
+        self._last_time = None
+
+    def _table(self, rows: np.ndarray, end: np.ndarray, still_open: bool) -> pd.DataFrame:
+        names = np.empty(len(self._active), dtype=object)
+        names[:] = self.names if self.names is not None else range(len(self._active))
+        return pd.DataFrame({
+            "pair": names[rows],
+            "start": self._start_time[rows],
+            "end": end,
+            "peak_time": self._peak_time[rows],
+            "peak": self._peak[rows],
+            "side": self._side[rows],
+            "duration": self._duration[rows],
+            "area": self._area[rows],
+            "open": np.full(len(rows), still_open),
+            }, columns=list(EPISODE_COLUMNS))
+
+    def update(self, spread: Union[Real, np.ndarray], time=None) -> pd.DataFrame:
+        '''
+        Adds one bar of spreads (a scalar, or one value per pair) and returns the episodes it closed.
+
+        :param spread: phi_L - phi_F for every pair at this bar
+        :param time: (Optional) bar label, defaults to the bar count
+        '''
+        spread = np.atleast_1d(np.asarray(spread, dtype=np.float64))
+        if self._active is None:
+            self._start(len(spread))
+        time = self.bars if time is None else time
+        magnitude = np.abs(spread)
+        with np.errstate(invalid='ignore'):
+            diverging = magnitude > self.threshold
+        closing = np.flatnonzero(self._active & ~diverging)
+        closed = self._table(closing, np.full(len(closing), self._last_time, dtype=object), still_open=False)
+        opening = diverging & ~self._active
+        self._start_time[opening] = time
+        self._peak[opening] = -np.inf
+        self._duration[opening] = 0
+        self._area[opening] = 0.0
+        self._active = diverging
+        higher = diverging & (magnitude > self._peak)
+        self._peak[higher] = magnitude[higher]
+        self._peak_time[higher] = time
+        self._side[higher] = np.sign(spread[higher])
+        self._duration += diverging
+        self._area[diverging] += magnitude[diverging] - self.threshold
+        self._last_time = time
+        self.bars += 1
+        return closed
+
+    def open_episodes(self) -> pd.DataFrame:
+        '''
+        Returns the episodes still running at the last bar (open=True), as episodes() reports them.
+        '''
+        if self._active is None:
+            return pd.DataFrame(columns=list(EPISODE_COLUMNS))
+        rows = np.flatnonzero(self._active)
+        return self._table(rows, np.full(len(rows), self._last_time, dtype=object), still_open=True)
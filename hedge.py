@@ -0,0 +1,112 @@
+# Rolling hedge ratio r of leader/follower pairs: phi_L(t) = a + r * phi_F(t) over a trailing window #
+# the residual phi_L - a - r * phi_F replaces the raw scaled difference as the pair spread #
+
+import numpy as np
+import pandas as pd
+
+from numbers import Real
+from typing import Union, Optional, Sequence, Tuple
+
+import algebra
+import kernels
+
+METHODS = ("ols", "tls")
+
+def rolling_hedge(leader: Union[pd.Series, np.ndarray],
+                  follower: Union[pd.Series, np.ndarray],
+                  window: int = 60,
+                  method: str = "ols",
+                  lag: int = 0
+                  ) -> pd.DataFrame:
+    '''
+    Returns the rolling hedge ratio r, intercept a and residual spread of one pair.
+
+    The README's Delta P_F = (1/r) * Delta P_L makes r the slope of leader on follower prices.
+    Pass index-scaled prices (algebra.scale) to estimate it in phi units.
+
+    :param leader: leader prices
+    :param follower: follower prices, aligned with the leader
+    :param window: trailing regression window in bars
+    :param method: "ols" (leader on follower) or "tls" (orthogonal, symmetric in both legs)
+    :param lag: bars between the estimate and the spread it is applied to, 1 avoids look-ahead
+
+    :return: DataFrame with columns ratio, intercept, spread on the leader's index
+
+    **Examples**
+
+    >>> xom, cvx = algebra.scale(xom_prices), algebra.scale(cvx_prices)
+    >>> rolling_hedge(xom, cvx, window=60, lag=1).tail(2)
+                                  ratio  intercept    spread
+    Datetime
+    2025-08-18 15:58:00-04:00  0.912034   8.642317  0.104877
+    2025-08-18 15:59:00-04:00  0.911652   8.680114  0.087432
+    '''
+    index = leader.index if isinstance(leader, pd.Series) else None
+    y = np.asarray(leader, dtype=np.float64)
+    x = np.asarray(follower, dtype=np.float64)
+    ratio, intercept = kernels.rolling_regression(x, y, window, method)
+    return pd.DataFrame({
+        "ratio": ratio,
+        "intercept": intercept,
+        "spread": _residual(y, x, ratio, intercept, lag),
+        }, index=index)
+
+def _residual(y: np.ndarray, x: np.ndarray, ratio: np.ndarray, intercept: np.ndarray, lag: int) -> np.ndarray:
+    if lag > 0:
+        ratio = np.concatenate([np.full((lag,) + ratio.shape[1:], np.nan), ratio[:-lag]])
+        intercept = np.concatenate([np.full((lag,) + intercept.shape[1:], np.nan), intercept[:-lag]])
+    return y - intercept - ratio * x
+
+def pair_hedges(prices: pd.DataFrame,
+                pairs: Optional[Sequence[Tuple[str, str]]] = None,
+                window: int = 60,
+                method: str = "ols",
+                lag: int = 0,
+                scale_start: Optional[Real] = 100,
+                chunk_bytes: int = 64 * 1024**2
+                ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    '''
+    Rolling hedge ratios and residual spreads of many leader/follower pairs in one batched pass.
+
+    Every pair's window sums come from prefix sums over the (time x pairs) leg matrices, so the cost
+    is O(1) per pair and bar whatever the window. Pairs are regressed in chunks of columns, as in
+    scanner.PairScanner.scan, so intermediate memory stays bounded by *chunk_bytes* on top of the two results.
+
+    :param prices: aligned (time x tickers) prices, ie: PriceUniverse.load()
+    :param pairs: (Optional) (leader, follower) tickers, defaults to every pair with the earlier ticker as leader
+    :param window: trailing regression window in bars
+    :param method: "ols" or "tls"
+    :param lag: bars between the estimate and the spread it is applied to
+    :param scale_start: value of phi(t_0), None to regress raw prices
+    :param chunk_bytes: approximate memory cap of one chunk's regression arrays
+
+    :return: (ratios, spreads), both with (leader, follower) MultiIndex columns like divergence.pair_spreads,
+        so spreads can be passed to divergence.episodes or ReconvergenceEstimator.estimate in place of raw spreads.
+
+    **Examples**
+
+    >>> ratios, spreads = pair_hedges(prices, pairs=[('XOM', 'CVX'), ('XOM', 'SHEL')], window=120, method='tls')
+    >>> divergence.episodes(spreads, threshold=1.5)
+    '''
+    tickers = list(prices.columns)
+    if pairs is None:
+        lead, follow = np.triu_indices(len(tickers), 1)
+        pairs = [(tickers[i], tickers[j]) for i, j in zip(lead, follow)]
+    position = {tick: i for i, tick in enumerate(tickers)}
+    lead = np.array([position[leader] for leader, _ in pairs], dtype=np.intp)
+    follow = np.array([position[follower] for _, follower in pairs], dtype=np.intp)
+    values = prices.to_numpy(dtype=np.float64)
+    if scale_start is not None:
+        values = algebra.scale(values, initial=scale_start)
+    ratios = np.empty((len(values), len(lead)))
+    spreads = np.empty((len(values), len(lead)))
+    chunk = max(1, int(chunk_bytes // (8 * 16 * max(len(values), 1))))
+    for start in range(0, len(lead), chunk):
+        stop = min(start + chunk, len(lead))
+        y, x = values[:, lead[start:stop]], values[:, follow[start:stop]]
+        ratio, intercept = kernels.rolling_regression(x, y, window, method)
+        ratios[:, start:stop] = ratio
+        spreads[:, start:stop] = _residual(y, x, ratio, intercept, lag)
+    columns = pd.MultiIndex.from_tuples(list(pairs), names=["leader", "follower"])
+    return (pd.DataFrame(ratios, index=prices.index, columns=columns, copy=False),
+            pd.DataFrame(spreads, index=prices.index, columns=columns, copy=False))
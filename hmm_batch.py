@@ -0,0 +1,227 @@
+# Batch HMM regime labelling for every leader/follower pair of a ticks file #
+# usage: python hmm_batch.py ticks/energy-us.txt --leaders XOM CVX [--states 2 3 4] [--period 5d] [--output DIR] #
+
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+
+from typing import Union, Optional, Sequence, List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import kernels
+from hmm_model import select_model, session_lengths, full_covariances
+from scanner import pair_indices
+from shared import SharedArray, ArraySpec, attach
+from store import ResultStore, DEFAULT_RESULT_DIR, digest
+from universe import PriceUniverse
+from static_types.quote_timing import QuoteTiming
+from static_types.time_range import Interval, Period
+
+STATES_KIND = "hmm_states"
+PARAMS_KIND = "hmm_params"
+
+SUMMARY_COLUMNS = ("leader", "follower", "n_components", "covariance_type", "log_likelihood", "aic", "bic", "bars", "error")
+
+def pair_features(values: np.ndarray, leader: int, follower: int, opens: np.ndarray, scale: float = 1e4) -> np.ndarray:
+    '''
+    Returns the (bars x 2) return features of one pair, like HMM.features, multiplied by *scale*.
+
+    Returns of bars without a price, and of the session *opens* (overnight gaps), are 0. The default
+    scale (basis points) keeps minute-return variances well above hmmlearn's min_covar floor.
+
+    :param values: forward-filled (time x tickers) prices
+    :param opens: row positions whose returns are zeroed
+    '''
+    returns = kernels.pct_change(values[:, [leader, follower]])
+    returns[opens] = 0.0
+    returns[~np.isfinite(returns)] = 0.0
+    returns *= scale
+    return returns
+
+def _label(values: np.ndarray, lead: np.ndarray, follow: np.ndarray, lengths: np.ndarray, scale: float,
+           options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    '''Selects, fits and labels a chunk of pairs; a pair that cannot be fitted reports its error.'''
+    opens = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    results = []
+    for i, j in zip(lead, follow):
+        features = pair_features(values, i, j, opens, scale)
+        try:
+            model, scores = select_model(features, lengths=lengths, processes=1, **options)
+        except ValueError as e:
+            results.append({"error": repr(e)})
+            continue
+        best = scores.iloc[0]
+        results.append({
+            "states": model.predict(features, lengths).astype(np.int8),
+            "probabilities": model.predict_proba(features, lengths).astype(np.float32),
+            "startprob": model.startprob_,
+            "transmat": model.transmat_,
+            "means": model.means_,
+            "covars": full_covariances(model),
+            "scores": {column: best[column] for column in ("n_components", "covariance_type", "seed",
+                                                           "log_likelihood", "aic", "bic", "iterations")},
+            })
+    return results
+
+def _label_chunk(spec: ArraySpec, *args) -> List[Dict[str, Any]]:
+    return _label(attach(spec), *args)
+
+def _frames(result: Dict[str, Any], leader: str, follower: str, index: pd.Index, scale: float):
+    '''Columnar (states, params) frames of one pair's result.'''
+    k = len(result["startprob"])
+    probabilities = result["probabilities"]
+    states = pd.DataFrame({"time": index, "leader": leader, "follower": follower, "state": result["states"]})
+    for s in range(k):
+        states[f"p{s}"] = probabilities[:, s]
+    scores = result["scores"]
+    params = pd.DataFrame({
+        "leader": leader,
+        "follower": follower,
+        "state": np.arange(k),
+        "startprob": result["startprob"],
+        "transmat": list(result["transmat"]),
+        "mean": list(result["means"] / scale),
+        "covar": list(result["covars"].reshape(k, -1) / scale**2),
+        })
+    for column, value in scores.items():
+        params[column] = value
+    params["bars"] = len(index)
+    return states, params
+
+def _summary(params: pd.DataFrame) -> Dict[str, Any]:
+    row = params.iloc[0]
+    return {column: row[column] for column in SUMMARY_COLUMNS if column in params.columns}
+
+def label_pairs(prices: pd.DataFrame,
+                leaders: Optional[Sequence[str]] = None,
+                hidden_states: Union[int, Sequence[int]] = 3,
+                covariance_types: Union[str, Sequence[str]] = "full",
+                restarts: int = 1,
+                criterion: str = "bic",
+                sessions: bool = True,
+                scale: float = 1e4,
+                n_iter: int = 1000,
+                tol: float = 1e-4,
+                seed: int = 0,
+                store: Optional[ResultStore] = None,
+                processes: Optional[int] = None,
+                chunk: int = 4
+                ) -> pd.DataFrame:
+    '''
+    Fits a regime HMM to the returns of every leader/follower pair and labels each bar with its hidden state.
+
+    Prices are forward-filled into one shared-memory block that every worker process reads; workers
+    build each pair's features and run select_model over *hidden_states* x *covariance_types* x
+    *restarts*. Each pair's state sequence (with state probabilities) and fitted parameters are written
+    to the store as soon as its chunk returns, keyed by a digest of the prices, the pair and the
+    settings, so only a chunk's results are held in memory and a rerun skips stored pairs.
+
+    :param prices: aligned (time x tickers) prices, ie: PriceUniverse.load()
+    :param leaders: (Optional) leader tickers against every other ticker, defaults to all pairs
+    :param hidden_states: numbers of hidden states tried (one value fits that many)
+    :param covariance_types: GaussianHMM covariance types tried
+    :param restarts: random initializations per combination
+    :param criterion: "bic", "aic" or "log_likelihood", see select_model
+    :param sessions: one training sequence per trading day, with overnight returns zeroed
+    :param scale: multiplier of the returns before fitting, stored means and covariances are unscaled
+    :param n_iter: maximum EM iterations per fit
+    :param tol: EM convergence threshold on the log-likelihood gain
+    :param seed: seed of the restart seeds
+    :param store: (Optional) ResultStore for STATES_KIND and PARAMS_KIND frames, without one nothing is kept but the summary
+    :param processes: worker processes, defaults to os.cpu_count(), 1 runs in this process
+    :param chunk: pairs per task
+
+    :return: one row per pair with leader, follower, the chosen n_components and covariance_type, its
+        log_likelihood, aic, bic, bars and error (None unless the pair could not be fitted)
+
+    **Examples**
+
+    >>> prices = PriceUniverse('ticks/energy-us.txt').load(period='5d', interval='1m')
+    >>> store = ResultStore()
+    >>> label_pairs(prices, leaders=['XOM'], hidden_states=[2, 3, 4], restarts=4, store=store)
+    >>> store.load(STATES_KIND).query("follower == 'CVX'")
+    '''
+    hidden_states = [hidden_states] if isinstance(hidden_states, int) else list(hidden_states)
+    covariance_types = [covariance_types] if isinstance(covariance_types, str) else list(covariance_types)
+    options = {"hidden_states": hidden_states, "covariance_types": covariance_types, "restarts": restarts,
+               "criterion": criterion, "seed": seed, "n_iter": n_iter, "tol": tol}
+    tickers = list(prices.columns)
+    values = prices.ffill().to_numpy(dtype=np.float64)
+    lengths = session_lengths(prices.index) if sessions else np.array([len(prices)], dtype=np.int64)
+    lead, follow = pair_indices(tickers, leaders)
+    data_key = digest(prices, sessions, scale, options)
+    keys = [digest(data_key, tickers[i], tickers[j]) for i, j in zip(lead, follow)]
+    summaries: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+    for p, key in enumerate(keys):
+        stored = store.get(PARAMS_KIND, key) if store is not None else None
+        if stored is not None and store.has(STATES_KIND, key):
+            summaries[p] = _summary(stored)
+    todo = np.array([p for p, summary in enumerate(summaries) if summary is None], dtype=np.intp)
+
+    def collect(rows: np.ndarray, results: List[Dict[str, Any]]) -> None:
+        for p, result in zip(rows, results):
+            leader, follower = tickers[lead[p]], tickers[follow[p]]
+            if "error" in result:
+                summaries[p] = {"leader": leader, "follower": follower, "error": result["error"]}
+                continue
+            states, params = _frames(result, leader, follower, prices.index, scale)
+            if store is not None:
+                store.put(STATES_KIND, keys[p], states)
+                store.put(PARAMS_KIND, keys[p], params)
+            summaries[p] = _summary(params)
+
+    parts = [todo[start:start + chunk] for start in range(0, len(todo), chunk)]
+    processes = processes if processes is not None else (os.cpu_count() or 1)
+    if processes <= 1 or len(parts) <= 1:
+        for rows in parts:
+            collect(rows, _label(values, lead[rows], follow[rows], lengths, scale, options))
+    else:
+        with SharedArray(values) as shared:
+            with ProcessPoolExecutor(max_workers=min(processes, len(parts))) as pool:
+                futures = {
+                    pool.submit(_label_chunk, shared.spec, lead[rows], follow[rows], lengths, scale, options): rows
+                    for rows in parts
+                    }
+                # popped once collected, so finished results are not all held until the last chunk
+                for future in as_completed(futures):
+                    collect(futures.pop(future), future.result())
+    return pd.DataFrame(summaries, columns=list(SUMMARY_COLUMNS))
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Fit and label HMM regimes for every leader/follower pair of a ticks file.")
+    parser.add_argument("ticks", help="ticks file, one symbol per line")
+    parser.add_argument("--leaders", nargs="+", default=None, help="leader symbols, defaults to every pair")
+    parser.add_argument("--states", nargs="+", type=int, default=[3], help="hidden state counts tried")
+    parser.add_argument("--covariance", nargs="+", default=["full"], choices=["full", "diag", "spherical", "tied"])
+    parser.add_argument("--restarts", type=int, default=1)
+    parser.add_argument("--criterion", default="bic", choices=["bic", "aic", "log_likelihood"])
+    parser.add_argument("--period", default=Period.FIVE_DAY.value, choices=[p.value for p in Period])
+    parser.add_argument("--interval", default=Interval.MINUTE.value, choices=[i.value for i in Interval])
+    parser.add_argument("--timing", default=QuoteTiming.CLOSE.value, choices=[t.value for t in QuoteTiming])
+    parser.add_argument("--no-sessions", action="store_true", help="train across overnight gaps as one sequence")
+    parser.add_argument("--scale", type=float, default=1e4)
+    parser.add_argument("--iter", type=int, default=1000)
+    parser.add_argument("--tol", type=float, default=1e-4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=4)
+    parser.add_argument("--output", default=DEFAULT_RESULT_DIR, help="ResultStore directory")
+    args = parser.parse_args(argv)
+
+    universe = PriceUniverse(args.ticks)
+    prices = universe.load(period=args.period, interval=args.interval, price_timing=QuoteTiming(args.timing))
+    for tick, error in universe.failures.items():
+        print(f"failed to load {tick}: {error}", file=sys.stderr)
+    summary = label_pairs(prices, leaders=args.leaders, hidden_states=args.states, covariance_types=args.covariance,
+                          restarts=args.restarts, criterion=args.criterion, sessions=not args.no_sessions,
+                          scale=args.scale, n_iter=args.iter, tol=args.tol, seed=args.seed,
+                          store=ResultStore(args.output), processes=args.processes, chunk=args.chunk)
+    print(summary.to_string(index=False))
+    print(f"states and parameters written to {os.path.join(args.output, STATES_KIND)} and {os.path.join(args.output, PARAMS_KIND)}",
+          file=sys.stderr)
+    return 0 if len(summary) and summary["error"].isna().all() else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
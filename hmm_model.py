@@ -1,20 +1,263 @@
 # Hidden markov model for projections and hidden parameter collection
 
-import matplotlib.pyplot as plt
-import yfinance as yf
+import io
+import os
+import threading
 import pandas as pd
 import numpy as np
-import ta
 
-from hmmlearn.hmm import GaussianHMM
-from typing import Union
+from typing import Union, Optional, Dict, Any, List, Sequence, Tuple
 from numbers import Real
+from concurrent.futures import ProcessPoolExecutor
 
 import algebra
+from cache import DEFAULT_CACHE_DIR
+from store import digest
+from shared import SharedArray, ArraySpec, attach
 from instrument import Priceable
+from universe import PriceUniverse
 from static_types.quoteables import LOADABLE
 from static_types.quote_timing import QuoteTiming
 from static_types.time_range import Period, Interval
+from lazy import lazy_import
+
+plt = lazy_import("matplotlib.pyplot")
+hmm = lazy_import("hmmlearn.hmm")
+
+DEFAULT_MODEL_DIR = os.path.join(DEFAULT_CACHE_DIR, "hmm")
+
+# fitted GaussianHMM attributes persisted by ModelCache (_covars_ in its covariance_type layout)
+MODEL_PARAMS = ("startprob_", "transmat_", "means_", "_covars_")
+
+def model_params(model) -> Dict[str, np.ndarray]:
+    '''
+    Returns the fitted parameters of a GaussianHMM.
+    '''
+    return {name: np.array(getattr(model, name)) for name in MODEL_PARAMS}
+
+def set_params(model, params: Dict[str, np.ndarray]):
+    '''
+    Loads parameters into a GaussianHMM and disables random initialization, so fit() continues from them.
+    '''
+    model.startprob_ = params["startprob_"]
+    model.transmat_ = params["transmat_"]
+    model.means_ = params["means_"]
+    model.covars_ = params["_covars_"]
+    model.n_features = params["means_"].shape[1]
+    model.init_params = ""
+    return model
+
+def full_covariances(model) -> np.ndarray:
+    '''
+    Returns the (states x features x features) covariance matrices of a GaussianHMM of any covariance_type.
+    '''
+    covars = np.asarray(model._covars_)
+    eye = np.eye(model.means_.shape[1])
+    if model.covariance_type == "full":
+        return covars
+    if model.covariance_type in ("diag", "spherical"):
+        # spherical variances may be stored per state or repeated per feature
+        return covars.reshape(len(covars), -1)[:, None, :] * eye
+    return np.broadcast_to(covars, (model.n_components,) + covars.shape).copy()
+
+class ModelCache:
+    '''
+    Fitted HMM parameters on disk, keyed by a digest of the feature matrix and hyperparameters.
+
+    Every put() also records the parameters as the latest fit of a *lineage* (same tickers, bars and
+    hyperparameters, any data), which HMM.fit_priceables uses to warm-start a refit on extended data.
+
+    **Examples**
+
+    >>> cache = ModelCache('/tmp/hmm')
+    >>> cache.put(key, model_params(model), lineage='XOM-CVX-3-full')
+    >>> set_params(GaussianHMM(n_components=3), cache.get(key))
+    '''
+    def __init__(self, root: str = DEFAULT_MODEL_DIR) -> None:
+        '''
+        :param root: directory holding one .npz file per fitted model
+        '''
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, f"{name}.npz")
+
+    def _read(self, name: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return {key: data[key] for key in data.files}
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, name: str, params: Dict[str, np.ndarray]) -> None:
+        buffer = io.BytesIO()
+        np.savez(buffer, **params)
+        path = self._path(name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        return self._read(key)
+
+    def latest(self, lineage: str) -> Optional[Dict[str, np.ndarray]]:
+        return self._read(f"latest-{lineage}")
+
+    def put(self, key: str, params: Dict[str, np.ndarray], lineage: Optional[str] = None) -> None:
+        self._write(key, params)
+        if lineage is not None:
+            self._write(f"latest-{lineage}", params)
+
+def pack_sequences(sequences: Sequence[Union[np.ndarray, pd.DataFrame]]) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Copies (bars x features) sequences into one contiguous array, the layout hmmlearn trains on, and returns it with their lengths.
+
+    The array is allocated once at its final size, so memory stays linear in the total number of bars.
+    Empty sequences are dropped.
+
+    **Examples**
+
+    >>> features, lengths = pack_sequences([day1, day2, other_pair_day1])
+    >>> lengths
+    array([390, 390, 388])
+    '''
+    arrays = [np.asarray(sequence, dtype=np.float64) for sequence in sequences]
+    arrays = [array.reshape(len(array), -1) for array in arrays if len(array)]
+    if not arrays:
+        raise ValueError("No bars to pack.")
+    width = arrays[0].shape[1]
+    if any(array.shape[1] != width for array in arrays):
+        raise ValueError("Sequences must have the same number of features.")
+    lengths = np.array([len(array) for array in arrays], dtype=np.int64)
+    packed = np.empty((int(lengths.sum()), width))
+    offset = 0
+    for array in arrays:
+        packed[offset:offset + len(array)] = array
+        offset += len(array)
+    return packed, lengths
+
+def session_lengths(index: pd.Index) -> np.ndarray:
+    '''
+    Returns the number of bars of each trading day of a DatetimeIndex (one sequence for any other index).
+    '''
+    if not isinstance(index, pd.DatetimeIndex) or len(index) == 0:
+        return np.array([len(index)], dtype=np.int64)
+    dates = index.normalize()
+    starts = np.flatnonzero(dates[1:] != dates[:-1]) + 1
+    return np.diff(np.concatenate([[0], starts, [len(index)]])).astype(np.int64)
+
+def fit_pooled(sequences: Sequence[Union[np.ndarray, pd.DataFrame]],
+               n_components: int,
+               covariance_type: str = "full",
+               n_iter: int = 1000,
+               tol: float = 1e-4,
+               random_state: Optional[int] = None):
+    '''
+    Fits one GaussianHMM shared by several sequences (ie: trading days, or similar pairs) in a single EM run.
+
+    Sequences are packed with pack_sequences and passed to hmmlearn with their lengths, so no
+    transition is learned across the boundary between two sequences (an overnight gap or another pair).
+
+    **Examples**
+
+    >>> days = [frame.filter(like='Return').values for _, frame in prices.groupby(prices.index.date)]
+    >>> model = fit_pooled(days, n_components=3)
+    '''
+    features, lengths = pack_sequences(sequences)
+    model = hmm.GaussianHMM(n_components=n_components, covariance_type=covariance_type,
+                            n_iter=n_iter, tol=tol, random_state=random_state)
+    return model.fit(features, lengths)
+
+SELECTION_CRITERIA = ("bic", "aic", "log_likelihood")
+
+def _fit_candidate(features: np.ndarray, n_components: int, covariance_type: str, seed: int,
+                   n_iter: int, tol: float, lengths: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    '''Fits one GaussianHMM and scores it; a fit that fails numerically scores NaN.'''
+    model = hmm.GaussianHMM(n_components=n_components, covariance_type=covariance_type,
+                            n_iter=n_iter, tol=tol, random_state=seed)
+    scores = {"log_likelihood": np.nan, "aic": np.nan, "bic": np.nan, "iterations": 0, "converged": False, "params": None}
+    try:
+        model.fit(features, lengths)
+        scores.update(log_likelihood=model.score(features, lengths), aic=model.aic(features, lengths), bic=model.bic(features, lengths),
+                      iterations=model.monitor_.iter, converged=model.monitor_.converged, params=model_params(model))
+    except (ValueError, np.linalg.LinAlgError):
+        pass
+    return scores
+
+def _fit_candidate_shared(spec: ArraySpec, *candidate, **options) -> Dict[str, Any]:
+    return _fit_candidate(attach(spec), *candidate, **options)
+
+def select_model(features: np.ndarray,
+                 hidden_states: Sequence[int] = (2, 3, 4),
+                 covariance_types: Sequence[str] = ("full", "diag"),
+                 restarts: int = 4,
+                 criterion: str = "bic",
+                 seed: int = 0,
+                 n_iter: int = 1000,
+                 tol: float = 1e-4,
+                 processes: Optional[int] = None,
+                 lengths: Optional[np.ndarray] = None
+                 ) -> Tuple[Any, pd.DataFrame]:
+    '''
+    Fits every (hidden states, covariance type, restart) GaussianHMM and returns the best model and the scores of all.
+
+    Each restart r uses the r-th seed drawn from np.random.SeedSequence(*seed*), the same for every
+    states/covariance combination, so a selection is reproducible whatever the number of processes.
+    Candidates run in a process pool over one shared-memory copy of the features.
+
+    :param features: (bars x features) training matrix, ie: HMM.features
+    :param hidden_states: numbers of hidden states tried
+    :param covariance_types: GaussianHMM covariance types tried (full, diag, spherical, tied)
+    :param restarts: random initializations per combination
+    :param criterion: "bic" or "aic" (lowest wins) or "log_likelihood" (highest wins)
+    :param seed: seed of the restart seeds
+    :param n_iter: maximum EM iterations per fit
+    :param tol: EM convergence threshold on the log-likelihood gain
+    :param processes: worker processes, defaults to os.cpu_count(), 1 runs in this process
+    :param lengths: (Optional) lengths of the sequences packed in *features*, ie: from pack_sequences
+
+    :return: (fitted GaussianHMM, DataFrame of n_components, covariance_type, seed, log_likelihood, aic, bic,
+        iterations and converged per candidate, best first)
+
+    **Examples**
+
+    >>> model, scores = select_model(markov_mod.features, hidden_states=range(2, 6), restarts=8)
+    >>> scores.head(3)
+       n_components covariance_type        seed  log_likelihood           aic           bic  iterations  converged
+    0             3            full  2968811710    16453.105411 -32860.210822 -32689.620012          41       True
+    ...
+    '''
+    if criterion not in SELECTION_CRITERIA:
+        raise ValueError(f"Unknown criterion {criterion!r}, expected one of {SELECTION_CRITERIA}.")
+    features = np.ascontiguousarray(features, dtype=np.float64)
+    seeds = [int(s) for s in np.random.SeedSequence(seed).generate_state(restarts)]
+    candidates = [(n, cov, s) for n in hidden_states for cov in covariance_types for s in seeds]
+    options = {"n_iter": n_iter, "tol": tol, "lengths": lengths}
+    processes = processes if processes is not None else (os.cpu_count() or 1)
+    if processes <= 1 or len(candidates) <= 1:
+        results = [_fit_candidate(features, *candidate, **options) for candidate in candidates]
+    else:
+        with SharedArray(features) as shared:
+            with ProcessPoolExecutor(max_workers=min(processes, len(candidates))) as pool:
+                futures = [pool.submit(_fit_candidate_shared, shared.spec, *candidate, **options) for candidate in candidates]
+                results = [future.result() for future in futures]
+    table = pd.DataFrame(candidates, columns=["n_components", "covariance_type", "seed"])
+    for column in ("log_likelihood", "aic", "bic", "iterations", "converged"):
+        table[column] = [result[column] for result in results]
+    table = table.sort_values(criterion, ascending=criterion != "log_likelihood", na_position="last", kind="stable")
+    if table.empty or np.isnan(table[criterion].iloc[0]):
+        raise ValueError("No candidate model could be fitted to the features.")
+    best = table.index[0]
+    n_components, covariance_type, best_seed = candidates[best]
+    model = hmm.GaussianHMM(n_components=n_components, covariance_type=covariance_type,
+                            n_iter=n_iter, tol=tol, random_state=best_seed)
+    set_params(model, results[best]["params"])
+    return model, table.reset_index(drop=True)
 
 class HMM:
     '''
@@ -52,7 +295,11 @@ class HMM:
                  iter: int = 1000,
                  quote_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE, 
                  data_period: Union[Period, str] = Period.DAY, 
-                 quote_interval: Union[Interval, str] = Interval.MINUTE
+                 quote_interval: Union[Interval, str] = Interval.MINUTE,
+                 tol: float = 1e-4,
+                 random_state: Optional[int] = None,
+                 cache: Union[ModelCache, bool] = True,
+                 sessions: bool = False
                 ) -> None:
         '''
         Initiate Hidden Markov Model.
@@ -60,10 +307,14 @@ class HMM:
         :param ticks_dependent: correlated tickers of priceables as string
         :param hidden_states: number of hidden states for model
         :param covariance_type: diag or full
-        :param iter: number of iterations for learning
+        :param iter: maximum number of EM iterations, fitting stops earlier once the log-likelihood gain is below tol
         :param quote_timing: Open, Close, High, Low
         :param data_period: period for data lookback
         :param quote_interval: interval between quotes during lookback period
+        :param tol: EM convergence threshold on the log-likelihood gain
+        :param random_state: (Optional) seed of the initial parameters of cold fits
+        :param cache: ModelCache to reuse and warm-start fits, True for the default cache, False to always fit cold
+        :param sessions: train on one sequence per trading day (overnight returns zeroed) instead of one across gaps
         '''
         if hidden_states<1:
             raise ValueError(
@@ -73,22 +324,217 @@ class HMM:
         self.states_amt = hidden_states
         self.cov_type = covariance_type
         self.iter_amt = iter
+        self.tol = tol
+        self.random_state = random_state
+        self.ticks = list(ticks_dependent)
+        self.quote_timing = quote_timing
+        self.quote_interval = quote_interval
+        self.sessions = sessions
+        if cache is True:
+            self.cache = ModelCache()
+        else:
+            self.cache = cache if isinstance(cache, ModelCache) else None
 
-        priceables = [Priceable(type=LOADABLE.STOCK, name_symbol=tick) for tick in ticks_dependent]
-        price_series = [p.get_price_history(period=data_period, interval=quote_interval, price_timing=quote_timing) for p in priceables]
+        universe = PriceUniverse(ticks_dependent)
+        prices = universe.load(period=data_period, interval=quote_interval, price_timing=quote_timing)
+        universe.raise_failures()
+        price_series = [prices[tick].dropna().rename(f"{tick} {str(quote_timing)}") for tick in ticks_dependent]
         self.frame = pd.concat(price_series, axis=1)
         for i in range(len(ticks_dependent)):
             self.frame[f'Return {ticks_dependent[i]}'] = price_series[i].pct_change().fillna(0)
         
+        self.lengths = None
+        if sessions:
+            self.lengths = session_lengths(self.frame.index)
+            # first bar of each later session carries the overnight gap
+            opens = np.cumsum(self.lengths)[:-1]
+            returns = [f'Return {tick}' for tick in ticks_dependent]
+            self.frame.loc[self.frame.index[opens], returns] = 0.0
         self.features = self.frame.filter(like="Return").values
     
-    def fit_priceables(self) -> None:
-        self.model = GaussianHMM(n_components=self.states_amt, covariance_type=self.cov_type, n_iter = self.iter_amt)
-        self.model.fit(self.features)
-        self.frame['Hidden_State'] = self.model.predict(self.features)
-    
-    def infer_states(self) -> None:
-        pass
+    def hyperparameters(self) -> Dict[str, Any]:
+        return {
+            "n_components": self.states_amt,
+            "covariance_type": self.cov_type,
+            "n_iter": self.iter_amt,
+            "tol": self.tol,
+            "random_state": self.random_state,
+        }
+
+    @property
+    def lineage(self) -> str:
+        '''Key shared by fits of the same tickers, bars and hyperparameters on any data, for warm starts.'''
+        return digest(self.ticks, str(self.quote_timing), str(self.quote_interval), self.sessions, self.hyperparameters())
+
+    def _key(self) -> str:
+        if self.lengths is None:
+            return digest(self.features, self.hyperparameters())
+        return digest(self.features, self.lengths, self.hyperparameters())
+
+    def _build(self):
+        return hmm.GaussianHMM(**self.hyperparameters())
+
+    def fit_priceables(self, warm_start: bool = True, refresh: bool = False) -> None:
+        '''
+        Fits the model to the features and labels every bar with its most likely hidden state.
+
+        A fit of the same features and hyperparameters is loaded from the cache instead of refitted.
+        Otherwise, with *warm_start*, EM starts from the latest cached fit of this lineage (ie: the
+        same model before new bars arrived) and usually converges to tol in a few iterations.
+
+        :param warm_start: start from the latest cached fit of this lineage when there is one
+        :param refresh: refit even when this exact fit is cached
+
+        Sets fitted_from to "cache", "warm" or "cold".
+        '''
+        key = self._key()
+        model = self._build()
+        params = self.cache.get(key) if self.cache is not None and not refresh else None
+        if params is not None:
+            set_params(model, params)
+            self.fitted_from = "cache"
+        else:
+            previous = self.cache.latest(self.lineage) if self.cache is not None and warm_start else None
+            if previous is not None and previous["means_"].shape == (self.states_amt, self.features.shape[1]):
+                set_params(model, previous)
+                self.fitted_from = "warm"
+            else:
+                self.fitted_from = "cold"
+            model.fit(self.features, self.lengths)
+            if self.cache is not None:
+                self.cache.put(key, model_params(model), lineage=self.lineage)
+        self.use_model(model)
+
+    def select(self,
+               hidden_states: Sequence[int] = (2, 3, 4),
+               covariance_types: Sequence[str] = ("full", "diag"),
+               restarts: int = 4,
+               criterion: str = "bic",
+               seed: int = 0,
+               processes: Optional[int] = None
+               ) -> pd.DataFrame:
+        '''
+        Replaces the hand-picked hidden_states and covariance_type with the best of a multi-restart search.
+
+        Runs select_model over the features (see its parameters), keeps the winning model, labels the
+        frame with it and caches it like fit_priceables, so hidden_states, covariance_type and
+        random_state afterwards describe the chosen model.
+
+        :return: scores of every candidate, best first (also kept as selection)
+
+        **Examples**
+
+        >>> markov_mod.select(hidden_states=range(2, 6), restarts=8)
+        >>> markov_mod.states_amt, markov_mod.cov_type
+        (3, 'full')
+        '''
+        model, self.selection = select_model(self.features, hidden_states, covariance_types, restarts, criterion, seed,
+                                             n_iter=self.iter_amt, tol=self.tol, processes=processes, lengths=self.lengths)
+        self.states_amt, self.cov_type, self.random_state = model.n_components, model.covariance_type, model.random_state
+        if self.cache is not None:
+            self.cache.put(self._key(), model_params(model), lineage=self.lineage)
+        self.fitted_from = "selection"
+        self.use_model(model)
+        return self.selection
+
+    def sequences(self) -> List[np.ndarray]:
+        '''Training sequences of the features: one per session with sessions=True, else the whole matrix.'''
+        if self.lengths is None:
+            return [self.features]
+        return np.split(self.features, np.cumsum(self.lengths)[:-1])
+
+    def use_model(self, model) -> None:
+        '''
+        Labels the frame with an already fitted GaussianHMM, ie: one shared by several pairs (see fit_shared), and restarts infer_states.
+        '''
+        self.model = model
+        self.frame['Hidden_State'] = self.model.predict(self.features, self.lengths)
+        # the last smoothed posterior is the filtered distribution after the final fitted bar
+        self.reset_filter(self.model.predict_proba(self.features, self.lengths)[-1] if len(self.features) else None)
+
+    def reset_filter(self, probabilities: Optional[np.ndarray] = None) -> None:
+        '''
+        Restarts infer_states from *probabilities*, the filtered state distribution after the last bar seen.
+
+        Without *probabilities* the filter restarts from the model's start probabilities, which hmmlearn
+        defines as p(s_1): the next bar is then weighted by them directly, without a transition step.
+        '''
+        model = self.model
+        covars = full_covariances(model)
+        chol = np.linalg.cholesky(covars)
+        # whitening factors and Gaussian normalizers, so emission log-densities are one einsum per batch
+        self._whiten = np.linalg.inv(chol)
+        self._log_norm = -0.5 * covars.shape[-1] * np.log(2 * np.pi) - np.log(np.diagonal(chol, axis1=1, axis2=2)).sum(axis=1)
+        self._transmat = np.asarray(model.transmat_)
+        start = model.startprob_ if probabilities is None else probabilities
+        with np.errstate(divide='ignore'):
+            self._log_filter = np.log(np.asarray(start, dtype=np.float64))
+        self._log_filter -= np.logaddexp.reduce(self._log_filter)
+        # _log_filter already predicts the next bar's state until the first bar after a start-probability reset
+        self._first = probabilities is None
+
+    @property
+    def state_probabilities(self) -> np.ndarray:
+        '''Filtered probability of each hidden state given every bar seen so far (start probabilities before any).'''
+        return np.exp(self._log_filter)
+
+    @property
+    def state(self) -> int:
+        '''Most likely current hidden state.'''
+        return int(np.argmax(self._log_filter))
+
+    def _emission_log_prob(self, returns: np.ndarray) -> np.ndarray:
+        '''(bars x states) Gaussian log-densities of return vectors.'''
+        centered = returns[:, None, :] - self.model.means_[None]
+        whitened = np.einsum("kij,nkj->nki", self._whiten, centered)
+        return self._log_norm - 0.5 * (whitened * whitened).sum(axis=2)
+
+    def infer_states(self, returns: Union[np.ndarray, pd.Series, pd.DataFrame]) -> np.ndarray:
+        '''
+        Online forward filter: updates the hidden state probabilities with new return vectors and returns them.
+
+        Each bar costs O(states^2): p(s_t | x_1..t) is proportional to b_s(x_t) * sum_r p(s_{t-1}=r | x_1..t-1) A_rs,
+        evaluated in log space (rescaled by its maximum before the transition product) so long runs
+        never underflow. Neither the model nor past bars are revisited; call fit_priceables to refit.
+
+        :param returns: one return vector (a value per ticker, like a features row) or a (bars x tickers) batch;
+            Series and DataFrames are matched to the "Return <tick>" feature names or the ticker names
+        :return: filtered state probabilities, (states,) for one vector or (bars x states) for a batch
+
+        **Examples**
+
+        >>> markov_mod.fit_priceables()
+        >>> markov_mod.infer_states(np.array([0.0004, -0.0002])) #one new minute bar
+        array([0.01 , 0.962, 0.028])
+        >>> markov_mod.state
+        1
+        '''
+        if not hasattr(self, "_log_filter"):
+            raise RuntimeError("Fit the model with fit_priceables() before inferring states.")
+        names = [f"Return {tick}" for tick in self.ticks]
+        if isinstance(returns, pd.Series):
+            returns = returns.reindex(names if returns.index.isin(names).any() else self.ticks)
+        elif isinstance(returns, pd.DataFrame):
+            returns = returns.reindex(columns=names if returns.columns.isin(names).any() else self.ticks)
+        values = np.asarray(returns, dtype=np.float64)
+        single = values.ndim == 1
+        emissions = self._emission_log_prob(np.atleast_2d(values))
+        filtered = np.empty_like(emissions)
+        log_filter = self._log_filter
+        transmat = self._transmat
+        with np.errstate(divide='ignore'):
+            for t in range(len(emissions)):
+                if self._first:
+                    predicted = log_filter + emissions[t]
+                    self._first = False
+                else:
+                    predicted = np.log(np.exp(log_filter - log_filter.max()) @ transmat) + emissions[t]
+                top = predicted.max()
+                log_filter = predicted - (top + np.log(np.exp(predicted - top).sum()))
+                filtered[t] = log_filter
+        self._log_filter = log_filter
+        probabilities = np.exp(filtered)
+        return probabilities[0] if single else probabilities
 
     def display(self) -> None:
         '''
@@ -106,6 +552,25 @@ class HMM:
 
         
 
+def fit_shared(*models: HMM):
+    '''
+    Fits one GaussianHMM to the pooled sequences of several HMMs (ie: similar pairs, with sessions) and labels each with it.
 
+    Hyperparameters are taken from the first model; every model must have the same number of features.
 
+    **Examples**
 
+    >>> pairs = [HMM('CVX', 'XOM', hidden_states=3, sessions=True, data_period=Period.FIVE_DAY),
+    ...          HMM('COP', 'EOG', hidden_states=3, sessions=True, data_period=Period.FIVE_DAY)]
+    >>> shared = fit_shared(*pairs)
+    >>> pairs[1].frame['Hidden_State'].value_counts()
+    '''
+    if not models:
+        raise ValueError("fit_shared needs at least one model.")
+    first = models[0]
+    sequences = [sequence for model in models for sequence in model.sequences()]
+    shared = fit_pooled(sequences, first.states_amt, first.cov_type, first.iter_amt, first.tol, first.random_state)
+    for model in models:
+        model.fitted_from = "shared"
+        model.use_model(shared)
+    return shared
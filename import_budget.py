@@ -0,0 +1,59 @@
+# Import-time budget for the lightweight numeric modules #
+# usage: python import_budget.py [--runs N] #
+
+import sys
+import argparse
+import statistics
+import subprocess
+
+from typing import List, Tuple
+
+# median wall-clock seconds allowed for a cold import, by import statement
+BUDGETS = {
+    "stats": 0.25,
+    "algebra": 0.25,
+    "stats, algebra": 0.3,
+}
+
+# modules that must stay unloaded after the import (loaded on first use instead)
+DEFERRED = ("pandas", "matplotlib", "yfinance", "hmmlearn", "ta", "scipy", "sklearn", "pyarrow")
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {modules}\n"
+    "print(time.perf_counter() - start)\n"
+    "print(','.join(m for m in {deferred!r} if m in sys.modules))\n"
+)
+
+def measure(modules: str, runs: int = 5) -> Tuple[float, List[str]]:
+    '''
+    Imports *modules* in *runs* fresh interpreters.
+
+    :return: median import seconds, deferred modules that were loaded
+    '''
+    times, loaded = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(modules=modules, deferred=DEFERRED)],
+            capture_output=True, text=True, check=True
+            ).stdout.splitlines()
+        times.append(float(out[0]))
+        loaded.update(m for m in out[1].split(",") if m)
+    return statistics.median(times), sorted(loaded)
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Check cold import time of stats and algebra against a budget.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    failed = False
+    for modules, budget in BUDGETS.items():
+        seconds, loaded = measure(modules, runs=args.runs)
+        ok = seconds <= budget and not loaded
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} import {modules}: {seconds*1000:.1f} ms (budget {budget*1000:.0f} ms)"
+              + (f", eagerly loaded {loaded}" if loaded else ""))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
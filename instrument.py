@@ -1,41 +1,237 @@
-import yfinance as yf
+import time
 import pandas as pd
 import numpy as np
 
 from enum import Enum
 from typing import Optional, Union
 
+from bars import BarFrame, interval_length, trim_to_period
+from cache import BarCache, default_cache, key_part, INTERVAL_TTL, DEFAULT_TTL
+from providers import DataProvider, ProviderError, ticker_history
+from resample import resample_bars, covers, RESAMPLEABLE
+from async_fetch import AsyncFetcher
 from static_types.quoteables import LOADABLE 
 from static_types.time_range import Interval, Period
 from static_types.quote_timing import QuoteTiming
+from lazy import lazy_import
+
+yf = lazy_import("yfinance")
 
 class Instrument:
     def __init__(self, type: str, name_symbol: Optional[str]):
         self.type = type
         self.symbol = name_symbol
+        self._load = None
+        self.loaded = False
+
+    @property
+    def load(self):
+        '''
+        yf.Ticker of the instrument, constructed on first access.
+        '''
+        if self._load is None:
+            self.load_instrument_data()
+        return self._load
+
+    @load.setter
+    def load(self, ticker) -> None:
+        self._load = ticker
     
     def load_instrument_data(self) -> None:
         if self.type in LOADABLE:
             try:
                 self.load = yf.Ticker(self.symbol)
                 self.loaded = True
-            except:
-                raise Exception(
+            except Exception as e:
+                raise ProviderError(
                     "Instrument could not be loaded using internal libraries or is not priceable."  
-                )
+                ) from e
             
 class Priceable(Instrument):
-    def __init__(self, type: str, name_symbol: str):
+    def __init__(self, type: str, name_symbol: str, cache: Union[BarCache, bool] = True, provider: Optional[DataProvider] = None):
+        '''
+        :param type: stock, currency, exchange
+        :param name_symbol: ticker symbol
+        :param cache: True for the default on-disk bar cache, a BarCache instance, or False to always refetch
+        :param provider: (Optional) history source replacing yfinance, ie: FileProvider, FrameProvider
+        '''
         if type not in LOADABLE:
             raise ValueError("Expected priceable instrument type. ie: stock, option, exchange.")
         else: 
             super().__init__(type=type, name_symbol=name_symbol)
-            self.load_instrument_data()
+        if cache is True:
+            self.cache = default_cache()
+        else:
+            self.cache = cache or None
+        self.provider = provider
+        self._bars = {}
+
+    def _history(self, period: Union[Period, str], interval: Union[Interval, str] = None, delta: bool = False) -> pd.DataFrame:
+        '''
+        Returns full OHLCV history frame, served from the bar cache while fresh.
+
+        Coarser intervals are built locally from fresh 1m history when it covers the period.
+        With delta, a stale cached frame is extended with only the bars after its last timestamp.
+        '''
+        frame = self._cached(period, interval)
+        if frame is not None:
+            return frame
+        frame = self._derived(period, interval)
+        if frame is not None:
+            return frame
+        if delta and self.cache is not None:
+            stale = self.cache.get(self.symbol, period, interval, allow_stale=True)
+            if stale is not None and len(stale):
+                frame = self._delta_history(period, interval, stale)
+                if frame is not None:
+                    self._store(period, interval, frame)
+                    return frame
+        frame = self._fetch(period, interval)
+        self._store(period, interval, frame)
+        return frame
+
+    def _derived(self, period: Union[Period, str], interval: Union[Interval, str] = None) -> Optional[pd.DataFrame]:
+        '''
+        Returns bars resampled from fresh 1m history held in memory or in the bar cache, or None.
+        '''
+        period, interval = key_part(period), key_part(interval)
+        if interval not in RESAMPLEABLE:
+            return None
+        fine = None
+        for (fine_period, fine_interval) in list(self._bars):
+            if fine_interval == Interval.MINUTE.value and covers(fine_period, period):
+                bars = self._memo_bars(fine_period, fine_interval)
+                if bars is not None:
+                    fine = bars.to_frame()
+                    break
+        if fine is None and self.cache is not None:
+            for meta in self.cache.find(self.symbol, Interval.MINUTE):
+                if covers(meta["period"], period) and self.cache.is_fresh(meta):
+                    fine = self.cache.get(self.symbol, meta["period"], Interval.MINUTE)
+                    if fine is not None:
+                        break
+        if fine is None or len(fine)==0:
+            return None
+        return resample_bars(trim_to_period(fine, period), interval)
+
+    def _fetch(self, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        if self.provider is not None:
+            return self.provider.history(self.symbol, period=period, interval=interval, start=start)
+        return ticker_history(self.load, period, interval, start=start)
+
+    def _delta_history(self,
+                       period: Union[Period, str],
+                       interval: Union[Interval, str],
+                       cached: pd.DataFrame,
+                       overlap: int = 3,
+                       rtol: float = 1e-6
+                       ) -> Optional[pd.DataFrame]:
+        '''
+        Fetches the tail of a cached frame, starting *overlap* bars before its last bar, and appends it.
+
+        Completed bars present in both frames must agree on Close within rtol, otherwise history was
+        revised (ie: dividend or split adjustment) and None is returned so the caller refetches in full.
+        The last cached bar may have been in progress when stored, so it is replaced rather than checked.
+        '''
+        tail = self._fetch(period, interval, start=cached.index[-1] - overlap*interval_length(interval))
+        if tail.empty:
+            return cached
+        common = cached.index[:-1].intersection(tail.index)
+        if len(common) and not np.allclose(
+            cached.loc[common, QuoteTiming.CLOSE.value].to_numpy(dtype=np.float64),
+            tail.loc[common, QuoteTiming.CLOSE.value].to_numpy(dtype=np.float64),
+            rtol=rtol, equal_nan=True
+            ):
+            return None
+        merged = pd.concat([cached[cached.index < tail.index[0]], tail])
+        merged = merged[~merged.index.duplicated(keep='last')]
+        return trim_to_period(merged, period)
+
+    def _cached(self, period: Union[Period, str], interval: Union[Interval, str] = None) -> Optional[pd.DataFrame]:
+        if self.cache is None:
+            return None
+        return self.cache.get(self.symbol, period, interval)
+
+    def _store(self, period: Union[Period, str], interval: Union[Interval, str], frame: pd.DataFrame) -> None:
+        if self.cache is not None and not frame.empty:
+            self.cache.put(self.symbol, period, interval, frame)
+
+    def _memo_bars(self, period: Union[Period, str], interval: Union[Interval, str] = None) -> Optional[BarFrame]:
+        key = (key_part(period), key_part(interval))
+        memo = self._bars.get(key)
+        ttl = self.cache.ttl_for(interval) if self.cache is not None else INTERVAL_TTL.get(key[1], DEFAULT_TTL)
+        if memo is None or time.time() - memo[1] >= ttl:
+            return None
+        return memo[0]
+
+    def _remember_bars(self, period: Union[Period, str], interval: Union[Interval, str], frame: pd.DataFrame) -> BarFrame:
+        bars = BarFrame(frame, symbol=self.symbol)
+        self._bars[(key_part(period), key_part(interval))] = (bars, time.time())
+        return bars
+
+    def get_bars(self, period: Union[Period, str], interval: Union[Interval, str] = None, refresh: bool = False, delta: bool = False) -> BarFrame:
+        '''
+        Returns OHLCV history as a BarFrame. The history is fetched once per (period, interval) and
+        reused by get_price_history/get_volume_history for every quote timing until its TTL passes.
+
+        :param period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
+        :param interval: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1d, 5d, 1wk, 1mo, 3mo
+        :param refresh: force a new fetch through the bar cache
+        :param delta: refresh a stale cached history by fetching only the bars after its last timestamp (requires the bar cache)
+
+        **Examples**
+
+        >>> cvx = Priceable(type='stock', name_symbol='CVX')
+        >>> bars = cvx.get_bars(period='1mo', interval='1d')
+        >>> ranges = bars.high - bars.low
+        >>> weights = bars.volume / bars.volume.sum()
+
+        >>> cvx.get_bars(period='1d', interval='1m', delta=True) #polling: appends the bars since the last call
+
+        >>> minute = cvx.get_bars(period='5d', interval='1m')
+        >>> hourly = cvx.get_bars(period='5d', interval='1h') #resampled from the 1m bars, no fetch
+        '''
+        bars = None if refresh else self._memo_bars(period, interval)
+        if bars is None:
+            bars = self._remember_bars(period, interval, self._history(period=period, interval=interval, delta=delta))
+        return bars
+
+    async def aget_bars(self,
+                        period: Union[Period, str],
+                        interval: Union[Interval, str] = None,
+                        fetcher: Optional[AsyncFetcher] = None,
+                        refresh: bool = False
+                        ) -> BarFrame:
+        '''
+        Async get_bars. Cache misses are fetched through an AsyncFetcher, so many priceables can share one
+        concurrency limit, rate limiter and retry policy.
+
+        :param period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
+        :param interval: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1d, 5d, 1wk, 1mo, 3mo
+        :param fetcher: (Optional) shared fetcher, defaults to a fetcher over this priceable's provider
+        :param refresh: skip the in-memory memo
+
+        **Examples**
+
+        >>> fetcher = AsyncFetcher(max_in_flight=8, rate=4)
+        >>> priceables = [Priceable(type=LOADABLE.STOCK, name_symbol=tick) for tick in ('XOM', 'CVX', 'SHEL')]
+        >>> bars = await asyncio.gather(*(p.aget_bars(period='1d', interval='1m', fetcher=fetcher) for p in priceables))
+        '''
+        bars = None if refresh else self._memo_bars(period, interval)
+        if bars is not None:
+            return bars
+        frame = self._cached(period, interval)
+        if frame is None:
+            fetcher = fetcher if fetcher is not None else AsyncFetcher(self.provider)
+            frame = await fetcher.fetch(self.symbol, period, interval)
+            self._store(period, interval, frame)
+        return self._remember_bars(period, interval, frame)
         
     def get_price_history(self, 
                           period: Union[Period, str], 
                           interval: Union[Interval, str] = None, 
-                          price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE
+                          price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
+                          delta: bool = False
                          ) -> pd.Series:
         '''
         Returns price history as time series.
@@ -43,6 +239,7 @@ class Priceable(Instrument):
         :param price_timing: Open, Close, High, Low
         :param period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
         :param interval: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1d, 5d, 1wk, 1mo, 3mo
+        :param delta: refresh a stale cached history with only its missing tail bars
 
         **Usage**
 
@@ -67,20 +264,16 @@ class Priceable(Instrument):
         2025-08-08 00:00:00-04:00    220.830002
         Name: Open, Length: 63, dtype: float64
         '''
-        if interval==None:
-            s = self.load.history(period = period)[price_timing].astype(np.float64)
-            s.name = f"{self.symbol} {str(price_timing)}"
-            return s
-        s = self.load.history(period = period, interval = interval)[price_timing].astype(np.float64)
-        s.name = f"{self.symbol} {str(price_timing)}"
-        return s
+        # BarFrame serves read-only views of its shared block, callers get their own writable series
+        return self.get_bars(period = period, interval = interval, delta = delta).series(price_timing, name=f"{self.symbol} {str(price_timing)}").copy()
 
-    def get_volume_history(self, period: Union[Period, str], interval: Union[Interval, str] = None) -> pd.Series:
+    def get_volume_history(self, period: Union[Period, str], interval: Union[Interval, str] = None, delta: bool = False) -> pd.Series:
         '''
         Returns volume history as time series.
 
         :param period: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max
         :param interval: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1d, 5d, 1wk, 1mo, 3mo
+        :param delta: refresh a stale cached history with only its missing tail bars
 
         **Usage**
 
@@ -104,11 +297,9 @@ class Priceable(Instrument):
         2025-08-06 00:00:00-04:00    108483100
         2025-08-07 00:00:00-04:00     90224800
         2025-08-08 00:00:00-04:00    113696100
-        Name: Volume, Length: 63, dtype: int64
+        Name: Volume, Length: 63, dtype: float64
         '''
-        if interval==None:
-            return self.load.history(period = period)['Volume']
-        return self.load.history(period = period, interval = interval)['Volume'].astype(np.float64)
+        return self.get_bars(period = period, interval = interval, delta = delta).volume.copy()
 
 
 
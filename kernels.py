@@ -0,0 +1,269 @@
+# ndarray kernels behind the algebra module #
+# numpy only, so they run on raw arrays and on pandas values alike #
+
+import numpy as np
+
+def diff(values: np.ndarray) -> np.ndarray:
+    '''
+    Returns consecutive differences values[i] - values[i-1] along axis 0, length n-1.
+
+    **Examples**
+
+    >>> diff(np.array([10, 15, 12, 18]))
+    array([ 5, -3,  6])
+    '''
+    values = np.asarray(values)
+    return values[1:] - values[:-1]
+
+def diff_signs(values: np.ndarray) -> np.ndarray:
+    '''
+    Returns the sign of consecutive differences along axis 0, length n-1: 1 for an increase, -1 for a decrease, tie or NaN.
+
+    **Examples**
+
+    >>> diff_signs(np.array([5, 7, 6, 6, 9]))
+    array([ 1, -1, -1,  1])
+    '''
+    return np.where(diff(values) > 0, 1, -1).astype(np.int64)
+
+def step_signs(values: np.ndarray) -> np.ndarray:
+    '''
+    Returns diff_signs aligned to the input along axis 0, length n, with 0 in the first row.
+
+    **Examples**
+
+    >>> step_signs(np.array([5, 7, 6, 6, 9]))
+    array([ 0,  1, -1, -1,  1])
+    >>> step_signs(np.array([[5, 1], [7, 1], [6, 2]]))
+    array([[ 0,  0],
+           [ 1, -1],
+           [-1,  1]])
+    '''
+    values = np.asarray(values)
+    out = np.zeros(values.shape, dtype=np.int64)
+    if len(values) > 1:
+        out[1:] = diff_signs(values)
+    return out
+
+def add_prefix(primary: np.ndarray, secondary: np.ndarray) -> np.ndarray:
+    '''
+    Adds secondary to the first len(secondary) elements of primary, in place.
+
+    If secondary is longer than primary, the overlapping prefix is added and an IndexError is raised.
+
+    **Examples**
+
+    >>> p = np.array([1, 2, 3, 4])
+    >>> add_prefix(p, np.array([10, 20, 30]))
+    array([11, 22, 33,  4])
+    '''
+    secondary = np.asarray(secondary)
+    n = min(len(primary), len(secondary))
+    primary[:n] += secondary[:n]
+    if len(secondary) > len(primary):
+        raise IndexError(f"Secondary of length {len(secondary)} does not fit primary of length {len(primary)}.")
+    return primary
+
+def _output(values: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    if out is None:
+        return np.empty(values.shape, dtype=np.float64)
+    if out.shape != values.shape or out.dtype != np.float64:
+        raise ValueError(f"Output buffer must be float64 of shape {values.shape}.")
+    return out
+
+def _center(values: np.ndarray) -> np.ndarray:
+    '''Per-column mean of finite values (0 for empty columns), subtracted before prefix sums to limit cancellation.'''
+    finite = np.isfinite(values)
+    count = finite.sum(axis=0)
+    total = np.where(finite, values, 0.0).sum(axis=0)
+    return np.divide(total, count, out=np.zeros_like(total, dtype=np.float64), where=count > 0)
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    '''Cumulative sums along time with a leading zero row, so window sums are prefix[t+1] - prefix[t+1-w].'''
+    prefix = np.zeros((len(values) + 1,) + values.shape[1:], dtype=np.float64)
+    np.cumsum(values, axis=0, out=prefix[1:])
+    return prefix
+
+def _window_nan(values: np.ndarray, window: int) -> np.ndarray:
+    '''Mask of full windows (rows window-1..T-1) that contain a missing value: NaN or +-inf, as pandas rolling.'''
+    bad = _prefix((~np.isfinite(values)).astype(np.float64))
+    return (bad[window:] - bad[:-window]) > 0
+
+def _finite_centered(values: np.ndarray, center: np.ndarray) -> np.ndarray:
+    '''values - center with missing values (NaN, +-inf) as 0, so they never reach the prefix sums.'''
+    with np.errstate(invalid='ignore'):
+        return np.where(np.isfinite(values), values - center, 0.0)
+
+def mean(values: np.ndarray) -> np.ndarray:
+    '''
+    Returns the mean of non-NaN values along axis 0, NaN where nothing is left (pandas mean()).
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    total = np.where(present, values, 0.0).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.divide(total, count)
+
+def pct_change(values: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Returns values[t]/values[t-1] - 1 along axis 0, NaN in the first row.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    out = _output(values, out)
+    if len(values):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(values[1:], values[:-1], out=out[1:])
+        out[1:] -= 1
+        out[0] = np.nan
+    return out
+
+def rolling_mean(values: np.ndarray, window: int, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Returns the trailing mean over *window* rows along axis 0 for 1-D or (time x columns) input.
+
+    Rows before the first full window, and windows containing NaN or +-inf, are NaN (pandas rolling(window).mean()).
+    *out* may be the input array itself.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1:
+        raise ValueError("Rolling window must be at least 1.")
+    out = _output(values, out)
+    if len(values) < window:
+        out[...] = np.nan
+        return out
+    center = _center(values)
+    nan = _window_nan(values, window)
+    prefix = _prefix(_finite_centered(values, center))
+    full = out[window-1:]
+    np.subtract(prefix[window:], prefix[:-window], out=full)
+    full /= window
+    full += center
+    full[nan] = np.nan
+    out[:window-1] = np.nan
+    return out
+
+def rolling_var(values: np.ndarray, window: int, ddof: int = 1, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Returns the trailing variance over *window* rows along axis 0 for 1-D or (time x columns) input.
+
+    Matches pandas rolling(window).var(ddof), including NaN for windows containing NaN or +-inf. *out* may be the input array itself.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1:
+        raise ValueError("Rolling window must be at least 1.")
+    out = _output(values, out)
+    if len(values) < window or window - ddof <= 0:
+        out[...] = np.nan
+        return out
+    centered = _finite_centered(values, _center(values))
+    nan = _window_nan(values, window)
+    first = _prefix(centered)
+    second = _prefix(centered * centered)
+    sums = first[window:] - first[:-window]
+    full = out[window-1:]
+    np.subtract(second[window:], second[:-window], out=full)
+    full -= sums * sums / window
+    full /= (window - ddof)
+    np.maximum(full, 0.0, out=full)
+    full[nan] = np.nan
+    out[:window-1] = np.nan
+    return out
+
+def rolling_volatility(prices: np.ndarray, window: int, periods: int = 252, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Returns annualized rolling volatility of simple returns: rolling std of pct_change times sqrt(periods).
+
+    A zero price makes the next return infinite, which only blanks the windows containing it.
+    '''
+    returns = pct_change(prices, out=out)
+    out = rolling_var(returns, window, out=returns)
+    np.sqrt(out, out=out)
+    out *= np.sqrt(periods)
+    return out
+
+def first_valid(values: np.ndarray) -> np.ndarray:
+    '''
+    Returns the first non-NaN value of each column (NaN for all-NaN columns).
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if len(values)==0:
+        return np.full(values.shape[1:], np.nan)
+    rows = np.argmax(~np.isnan(values), axis=0)
+    return np.take_along_axis(values, np.expand_dims(rows, 0), axis=0)[0]
+
+def scale(values: np.ndarray, initial: float = 100, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Returns values / first valid value * initial, per column.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    out = _output(values, out)
+    base = first_valid(values)
+    np.divide(values, base, out=out)
+    out *= initial
+    return out
+
+def diff_filled(values: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    '''
+    Returns consecutive differences along axis 0 aligned to the input, with 0 in the first row and in place of NaN.
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    out = _output(values, out)
+    if len(values):
+        np.subtract(values[1:], values[:-1], out=out[1:])
+        out[0] = 0.0
+        out[np.isnan(out)] = 0.0
+    return out
+
+def regression_slope(sxx: np.ndarray, syy: np.ndarray, sxy: np.ndarray, method: str = "ols") -> np.ndarray:
+    '''
+    Returns the slope of y on x from centered sums of squares and cross products, elementwise.
+
+    "ols" is sxy / sxx. "tls" is the orthogonal slope (d + sqrt(d^2 + 4 sxy^2)) / (2 sxy) with d = syy - sxx,
+    taken in its conjugate form 2 sxy / (sqrt(d^2 + 4 sxy^2) - d) where d < 0, so a nearly flat fit
+    (|sxy| much smaller than |d|) keeps full precision instead of cancelling to 0.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if method == "ols":
+            return sxy / sxx
+        d = syy - sxx
+        root = np.sqrt(d * d + 4 * sxy * sxy)
+        return np.where(d >= 0, (d + root) / (2 * sxy), 2 * sxy / (root - d))
+
+def rolling_regression(x: np.ndarray, y: np.ndarray, window: int, method: str = "ols"):
+    '''
+    Returns trailing-window (slope, intercept) of y = intercept + slope * x along axis 0, per column.
+
+    Window sums of x, y, x^2, y^2 and xy come from prefix sums, so every window costs O(1) per column.
+    *method* "ols" regresses y on x; "tls" is total least squares (orthogonal regression), symmetric in
+    x and y. Rows before the first full window, and windows with a NaN or +-inf in x or y, are NaN.
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.shape != y.shape:
+        raise ValueError(f"x of shape {x.shape} and y of shape {y.shape} must match.")
+    if window < 2:
+        raise ValueError("Regression window must be at least 2.")
+    if method not in ("ols", "tls"):
+        raise ValueError(f"Unknown regression method {method!r}, expected 'ols' or 'tls'.")
+    slope = np.full(x.shape, np.nan)
+    intercept = np.full(x.shape, np.nan)
+    if len(x) < window:
+        return slope, intercept
+    bad = ~(np.isfinite(x) & np.isfinite(y))
+    cx, cy = _center(np.where(bad, np.nan, x)), _center(np.where(bad, np.nan, y))
+    xc = np.where(bad, 0.0, x - cx)
+    yc = np.where(bad, 0.0, y - cy)
+    nan = _window_nan(np.where(bad, np.nan, 0.0), window)
+    def window_sum(values: np.ndarray) -> np.ndarray:
+        prefix = _prefix(values)
+        return prefix[window:] - prefix[:-window]
+    sx, sy = window_sum(xc), window_sum(yc)
+    sxx = window_sum(xc * xc) - sx * sx / window
+    syy = window_sum(yc * yc) - sy * sy / window
+    sxy = window_sum(xc * yc) - sx * sy / window
+    b = regression_slope(sxx, syy, sxy, method)
+    a = (sy / window + cy) - b * (sx / window + cx)
+    b[nan], a[nan] = np.nan, np.nan
+    slope[window-1:], intercept[window-1:] = b, a
+    return slope, intercept
@@ -0,0 +1,44 @@
+# Deferred module imports for heavy dependencies (matplotlib, yfinance, hmmlearn, pandas) #
+
+import importlib
+
+from types import ModuleType
+
+class LazyModule:
+    '''
+    Module proxy that imports the real module on first attribute access.
+
+    **Examples**
+
+    >>> plt = lazy_import("matplotlib.pyplot") #nothing imported yet
+    >>> plt.plot([1, 2, 3]) #matplotlib.pyplot is imported here
+    '''
+    def __init__(self, name: str) -> None:
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+def lazy_import(name: str) -> LazyModule:
+    '''
+    Returns a proxy for module *name* that is imported on first use.
+    '''
+    return LazyModule(name)
@@ -0,0 +1,164 @@
+# Lead-lag scanner: cross-correlation of leader and follower returns over a range of lags #
+# one real FFT per ticker, one spectrum product and inverse FFT per pair: O(T log T) whatever the lag range #
+
+import numpy as np
+import pandas as pd
+
+from typing import Union, Optional, Sequence, Tuple
+
+import kernels
+from scanner import pair_indices
+from universe import PriceUniverse
+from providers import DataProvider
+from static_types.quote_timing import QuoteTiming
+from static_types.time_range import Interval, Period
+
+def fft_length(n: int) -> int:
+    '''
+    Returns the smallest 2^a * 3^b * 5^c >= n, a length numpy's FFT handles efficiently.
+    '''
+    best = 1 << max(int(n - 1).bit_length(), 0)
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            size = power35
+            while size < n:
+                size *= 2
+            best = min(best, size)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+def standardized_returns(prices: pd.DataFrame, log: bool = True, sessions: bool = True) -> np.ndarray:
+    '''
+    Returns (time x tickers) returns scaled to zero mean and unit variance, with NaN (missing bars) as 0.
+
+    :param log: log returns, else simple returns
+    :param sessions: drop returns across a date change (overnight gaps) of an intraday index
+    '''
+    values = prices.ffill().to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(values), axis=0, prepend=np.nan) if log else kernels.pct_change(values)
+    if sessions and isinstance(prices.index, pd.DatetimeIndex) and len(prices.index) > 1:
+        dates = prices.index.normalize()
+        returns[1:][dates[1:] != dates[:-1]] = np.nan
+    returns[~np.isfinite(returns)] = np.nan
+    center = np.nanmean(returns, axis=0) if len(returns) else 0.0
+    scale = np.nanstd(returns, axis=0) if len(returns) else 1.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = (returns - center) / scale
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+class LeadLagScanner:
+    '''
+    Measures how many bars followers trail their leaders by.
+
+    For a pair (L, F) the cross-correlation at lag k is corr(r_L(t), r_F(t+k)) of standardized returns,
+    so a positive peak lag means the follower reacts k bars after the leader (negative: F leads L).
+    Return spectra are computed once per ticker; each pair costs one spectrum product and one inverse
+    real FFT of length ~T + max_lag, evaluated for a chunk of pairs at a time.
+
+    **Examples**
+
+    >>> scanner = LeadLagScanner.from_ticks('ticks/tech-nasdaq-sp.txt', period=Period.FIVE_DAY, max_lag=15)
+    >>> scanner.scan(leaders=['NVDA', 'MSFT'], top=3)
+      leader follower  lag      corr     corr0    zscore
+    0   NVDA      AMD    1  0.214420  0.561532  8.466617
+    ...
+    >>> scanner.ccf('NVDA', 'AMD') #full cross-correlation, indexed by lag
+    '''
+    def __init__(self,
+                 prices: pd.DataFrame,
+                 max_lag: int = 30,
+                 log: bool = True,
+                 sessions: bool = True
+                 ) -> None:
+        '''
+        :param prices: aligned (time x tickers) prices, ie: PriceUniverse.load()
+        :param max_lag: lags -max_lag..max_lag bars are scanned
+        :param log: use log returns, else simple returns
+        :param sessions: drop overnight returns of intraday bars
+        '''
+        if max_lag < 0:
+            raise ValueError("max_lag must be non-negative.")
+        self.tickers = list(prices.columns)
+        self.max_lag = max_lag
+        self.returns = standardized_returns(prices, log=log, sessions=sessions)
+        self.size = fft_length(len(self.returns) + max_lag)
+        self.spectra = np.fft.rfft(self.returns, n=self.size, axis=0)
+        self.norms = np.sqrt((self.returns * self.returns).sum(axis=0))
+        self.lags = np.arange(-max_lag, max_lag + 1)
+
+    @classmethod
+    def from_ticks(cls,
+                   ticks: Union[str, Sequence[str]],
+                   period: Union[Period, str] = Period.FIVE_DAY,
+                   interval: Union[Interval, str] = Interval.MINUTE,
+                   price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
+                   provider: Optional[DataProvider] = None,
+                   **kwargs
+                   ) -> "LeadLagScanner":
+        '''
+        Loads a ticks file (or ticker list) through PriceUniverse and builds a scanner over it.
+        '''
+        universe = PriceUniverse(ticks, provider=provider)
+        scanner = cls(universe.load(period=period, interval=interval, price_timing=price_timing), **kwargs)
+        scanner.failures = universe.failures
+        return scanner
+
+    def _correlations(self, leaders: np.ndarray, followers: np.ndarray) -> np.ndarray:
+        '''(lags x pairs) cross-correlations of a chunk of pairs.'''
+        cross = np.fft.irfft(np.conj(self.spectra[:, leaders]) * self.spectra[:, followers], n=self.size, axis=0)
+        # circular lags: k >= 0 at row k, k < 0 at row size + k (zero padding keeps them from wrapping)
+        rows = self.lags % self.size
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return cross[rows] / (self.norms[leaders] * self.norms[followers])
+
+    def ccf(self, leader: str, follower: str) -> pd.Series:
+        '''
+        Returns the cross-correlation corr(r_L(t), r_F(t+lag)) of one pair, indexed by lag.
+        '''
+        i, j = self.tickers.index(leader), self.tickers.index(follower)
+        values = self._correlations(np.array([i]), np.array([j]))[:, 0]
+        return pd.Series(values, index=pd.Index(self.lags, name="lag"), name=f"{leader}->{follower}")
+
+    def scan(self,
+             leaders: Optional[Sequence[str]] = None,
+             top: Optional[int] = None,
+             chunk_bytes: int = 64 * 1024**2
+             ) -> pd.DataFrame:
+        '''
+        Returns the peak lag and its strength for every pair, strongest first.
+
+        :param leaders: (Optional) leader tickers to scan against every other ticker, defaults to all pairs
+        :param top: (Optional) number of rows returned, None for every pair
+        :param chunk_bytes: approximate memory cap of one chunk's spectra and correlations
+
+        :return: DataFrame with columns leader, follower, lag (peak |corr| lag), corr (correlation at that lag),
+            corr0 (contemporaneous correlation) and zscore (corr * sqrt(T), ~N(0,1) for unrelated returns)
+        '''
+        lead, follow = pair_indices(self.tickers, leaders)
+        chunk = max(1, int(chunk_bytes // (8 * 3 * self.size)))
+        lag, corr, corr0 = (np.empty(len(lead), dtype=np.int64), np.empty(len(lead)), np.empty(len(lead)))
+        zero = self.max_lag
+        for start in range(0, len(lead), chunk):
+            part = slice(start, start + chunk)
+            correlations = self._correlations(lead[part], follow[part])
+            peak = np.argmax(np.nan_to_num(np.abs(correlations), nan=-1.0), axis=0)
+            lag[part] = self.lags[peak]
+            corr[part] = np.take_along_axis(correlations, peak[None], axis=0)[0]
+            corr0[part] = correlations[zero]
+        tickers = np.array(self.tickers, dtype=object)
+        table = pd.DataFrame({
+            "leader": tickers[lead],
+            "follower": tickers[follow],
+            "lag": lag,
+            "corr": corr,
+            "corr0": corr0,
+            "zscore": corr * np.sqrt(len(self.returns)),
+            })
+        table = table.sort_values("zscore", key=np.abs, ascending=False, na_position="last", kind="stable")
+        if top is not None:
+            table = table.head(top)
+        return table.reset_index(drop=True)
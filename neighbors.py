@@ -0,0 +1,303 @@
+# Top-k comovement neighbour index over normalized return vectors #
+# exact blocked products for moderate universes, random-projection sketches for thousands of symbols #
+
+import numpy as np
+import pandas as pd
+
+from typing import Union, Optional, Sequence
+
+from universe import PriceUniverse
+from providers import DataProvider
+from static_types.quote_timing import QuoteTiming
+from static_types.time_range import Interval, Period
+
+class ComovementIndex:
+    '''
+    Answers "which tickers co-move most with X" without building the dense correlation matrix.
+
+    Returns are kept per ticker (optionally only the last *window* bars). Centered, unit-norm return
+    vectors make the correlation of two tickers a dot product, so an exact query costs O(T*N) and
+    query_all() walks the universe in row blocks of the correlation matrix, keeping only each row's
+    top k (memory O(block*N) instead of O(N^2)).
+
+    The approximate mode projects every vector onto *dims* random Gaussian directions
+    (Johnson-Lindenstrauss), where dot products estimate correlations at O(dims) instead of O(T) cost.
+    The best *candidates* x k tickers by sketch are then re-ranked with exact correlations.
+
+    New bars are appended with update(), which also keeps each ticker's count, sum and sum of squares
+    over the window (O(N) per bar, recomputed exactly once per window of bars). Exact queries center and
+    scale only the rows they ask for from those sums, so an update never forces a rebuild of the whole
+    normalized matrix; normalized() and the sketch are rebuilt lazily when asked for. save()/load()
+    persist the returns with np.savez.
+
+    **Examples**
+
+    >>> index = ComovementIndex(PriceUniverse('ticks/energy-us.txt').load(period='5d', interval='1m'), window=1950)
+    >>> index.query('XOM', k=3)
+    neighbor
+    CVX     0.781233
+    COP     0.702190
+    EOG     0.688754
+    Name: XOM, dtype: float64
+    >>> index.update(latest_prices) #one row (Series) or several (DataFrame) of new bars
+    >>> index.query('XOM', k=3, approximate=True)
+    >>> index.save('/tmp/energy.npz')
+    '''
+    def __init__(self,
+                 prices: pd.DataFrame,
+                 window: Optional[int] = None,
+                 dims: int = 128,
+                 candidates: int = 5,
+                 seed: int = 0
+                 ) -> None:
+        '''
+        :param prices: aligned (time x tickers) prices, ie: PriceUniverse.load()
+        :param window: (Optional) number of most recent returns kept, defaults to all
+        :param dims: random projection dimensions of the approximate mode
+        :param candidates: approximate queries re-rank candidates * k tickers exactly
+        :param seed: seed of the random projection
+        '''
+        self.tickers = list(prices.columns)
+        self.window = window
+        self.dims = dims
+        self.candidates = candidates
+        self.seed = seed
+        self._position = {tick: i for i, tick in enumerate(self.tickers)}
+        # ticker-major returns with missing values (NaN, +-inf) as 0, and their mask
+        self._values = np.empty((len(self.tickers), 0))
+        self._missing = np.empty((len(self.tickers), 0), dtype=bool)
+        self._rows = 0
+        self._count = np.zeros(len(self.tickers), dtype=np.int64)
+        self._sum = np.zeros(len(self.tickers))
+        self._sumsq = np.zeros(len(self.tickers))
+        self._last = np.full(len(self.tickers), np.nan)
+        self._normalized = None
+        self._sketch = None
+        self.update(prices)
+
+    @classmethod
+    def from_ticks(cls,
+                   ticks: Union[str, Sequence[str]],
+                   period: Union[Period, str] = Period.FIVE_DAY,
+                   interval: Union[Interval, str] = Interval.MINUTE,
+                   price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
+                   provider: Optional[DataProvider] = None,
+                   **kwargs
+                   ) -> "ComovementIndex":
+        '''
+        Loads a ticks file (or ticker list) through PriceUniverse and indexes it.
+        '''
+        universe = PriceUniverse(ticks, provider=provider)
+        index = cls(universe.load(period=period, interval=interval, price_timing=price_timing), **kwargs)
+        index.failures = universe.failures
+        return index
+
+    @property
+    def returns(self) -> np.ndarray:
+        '''(time x tickers) returns currently indexed, oldest first, NaN where missing.'''
+        return np.where(self._missing[:, :self._rows], np.nan, self._values[:, :self._rows]).T
+
+    def update(self, prices: Union[pd.DataFrame, pd.Series, np.ndarray]) -> None:
+        '''
+        Appends new bars (rows of prices in ticker order, or frames/Series labelled by ticker).
+
+        A ticker without a price in a bar keeps its last price, so its return for that bar is 0.
+        '''
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame().T
+        if isinstance(prices, pd.DataFrame):
+            prices = prices.reindex(columns=self.tickers)
+        values = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+        if values.shape[1] != len(self.tickers):
+            raise ValueError(f"Expected {len(self.tickers)} prices per bar, got {values.shape[1]}.")
+        if len(values)==0:
+            return
+        filled = pd.DataFrame(np.vstack([self._last, values])).ffill().to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = filled[1:] / filled[:-1] - 1
+        self._last = filled[-1]
+        self._append(returns)
+        self._normalized = None
+        self._sketch = None
+
+    def _span(self) -> slice:
+        '''Buffer columns of the window.'''
+        return slice(0 if self.window is None else max(0, self._rows - self.window), self._rows)
+
+    def _accumulate(self, columns: slice, sign: int) -> None:
+        values = self._values[:, columns]
+        self._count += sign * (~self._missing[:, columns]).sum(axis=1)
+        self._sum += sign * values.sum(axis=1)
+        self._sumsq += sign * np.einsum("nt,nt->n", values, values)
+
+    def _resum(self) -> None:
+        self._count[:], self._sum[:], self._sumsq[:] = 0, 0.0, 0.0
+        self._accumulate(self._span(), 1)
+
+    def _append(self, returns: np.ndarray) -> None:
+        returns = np.asarray(returns, dtype=np.float64).T
+        bars = returns.shape[1]
+        rows = self._rows + bars
+        if rows > self._values.shape[1]:
+            capacity = max(rows, 2 * self._values.shape[1], 64)
+            for name in ("_values", "_missing"):
+                grown = np.empty((len(self.tickers), capacity), dtype=getattr(self, name).dtype)
+                grown[:, :self._rows] = getattr(self, name)[:, :self._rows]
+                setattr(self, name, grown)
+        missing = ~np.isfinite(returns)
+        self._missing[:, self._rows:rows] = missing
+        self._values[:, self._rows:rows] = np.where(missing, 0.0, returns)
+        leaving = self._span()
+        self._rows = rows
+        if self.window is not None and self._rows > 2 * self.window:
+            # compact occasionally so trimming the window stays amortized O(1) per bar, and resum
+            # exactly at the same time so added and removed bars never drift the sums
+            for buffer in (self._values, self._missing):
+                buffer[:, :self.window] = buffer[:, self._rows - self.window:self._rows].copy()
+            self._rows = self.window
+            self._resum()
+        elif self.window is not None and bars >= self.window:
+            self._resum()
+        else:
+            self._accumulate(slice(rows - bars, rows), 1)
+            self._accumulate(slice(leaving.start, self._span().start), -1)
+
+    def _moments(self):
+        '''Per-ticker window mean of finite returns (0 if none) and norm of the centered returns.'''
+        mean = np.divide(self._sum, self._count, out=np.zeros(len(self.tickers)), where=self._count > 0)
+        return mean, np.sqrt(np.maximum(self._sumsq - self._sum * mean, 0.0))
+
+    def _centered(self, positions: np.ndarray, mean: np.ndarray) -> np.ndarray:
+        '''Window returns of tickers at *positions* (any shape) minus their mean, 0 where missing.'''
+        span = self._span()
+        return self._values[positions, span] - mean[positions][..., None] * ~self._missing[positions, span]
+
+    def _normalized_rows(self, positions: np.ndarray) -> np.ndarray:
+        mean, norm = self._moments()
+        scale = np.divide(1.0, norm[positions], out=np.zeros(np.shape(positions)), where=norm[positions] > 0)
+        return self._centered(positions, mean) * scale[..., None]
+
+    def _correlations(self, rows: np.ndarray) -> np.ndarray:
+        '''
+        (rows x tickers) exact correlations, one product of the centered rows with the raw window.
+
+        For centered v_i, v_i . v_j = v_i . x_j - m_j (sum(v_i) - v_i . u_j), u_j the missing mask of j,
+        which only needs the masks of tickers with missing values in the window.
+        '''
+        mean, norm = self._moments()
+        span = self._span()
+        centered = self._centered(rows, mean)
+        products = centered @ self._values[:, span].T
+        products -= np.outer(centered.sum(axis=1), mean)
+        gaps = np.flatnonzero(self._count < span.stop - span.start)
+        if len(gaps):
+            products[:, gaps] += (centered @ self._missing[gaps, span].T) * mean[gaps]
+        scale = np.divide(1.0, norm, out=np.zeros(len(norm)), where=norm > 0)
+        return products * scale[rows][:, None] * scale
+
+    def normalized(self) -> np.ndarray:
+        '''
+        Returns (tickers x time) centered, unit-norm returns over the window: corr(i, j) = row i . row j.
+        '''
+        if self._normalized is None:
+            self._normalized = self._normalized_rows(np.arange(len(self.tickers)))
+        return self._normalized
+
+    def sketch(self) -> np.ndarray:
+        '''
+        Returns the (tickers x dims) random projection of normalized returns; row dot products estimate correlations.
+        '''
+        if self._sketch is None:
+            z = self.normalized()
+            planes = np.random.default_rng(self.seed).standard_normal((z.shape[1], self.dims)) / np.sqrt(self.dims)
+            self._sketch = z @ planes
+        return self._sketch
+
+    def correlations(self, symbol: str) -> pd.Series:
+        '''
+        Returns the exact correlation of *symbol* with every indexed ticker.
+        '''
+        return pd.Series(self._correlations(np.array([self._position[symbol]]))[0], index=self.tickers, name=symbol)
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        '''Column positions of the k highest scores of each row, highest first.'''
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return np.empty((len(scores), 0), dtype=np.intp)
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(part, order, axis=1)
+
+    def _neighbors(self, rows: np.ndarray, k: int, approximate: bool):
+        '''Top-k (neighbor positions, exact correlations) of a block of tickers, themselves excluded.'''
+        local = np.arange(len(rows))
+        if not approximate:
+            corr = self._correlations(rows)
+            corr[local, rows] = -np.inf
+            top = self._top(corr, k)
+            return top, np.take_along_axis(corr, top, axis=1)
+        sketch = self.sketch()
+        estimate = sketch[rows] @ sketch.T
+        estimate[local, rows] = -np.inf
+        pool = self._top(estimate, self.candidates * k)
+        exact = np.einsum("bt,bct->bc", self._normalized_rows(rows), self._normalized_rows(pool))
+        exact[pool == rows[:, None]] = -np.inf
+        top = self._top(exact, k)
+        return np.take_along_axis(pool, top, axis=1), np.take_along_axis(exact, top, axis=1)
+
+    def query(self, symbol: str, k: int = 10, approximate: bool = False) -> pd.Series:
+        '''
+        Returns the k tickers most correlated with *symbol* (itself excluded), highest first.
+
+        :param approximate: rank by the random-projection sketch, re-ranking candidates * k tickers exactly
+        '''
+        top, corr = self._neighbors(np.array([self._position[symbol]]), k, approximate)
+        tickers = np.array(self.tickers, dtype=object)
+        return pd.Series(corr[0], index=pd.Index(tickers[top[0]], name="neighbor"), name=symbol)
+
+    def query_all(self, k: int = 10, approximate: bool = False, block_bytes: int = 64 * 1024**2) -> pd.DataFrame:
+        '''
+        Returns the top-k neighbours of every ticker as (symbol, rank, neighbor, corr) rows.
+
+        :param block_bytes: approximate memory cap of one block of correlation (or sketch) rows
+        '''
+        n = len(self.tickers)
+        k = min(k, n - 1)
+        width = max(n, self.candidates * k * (self._span().stop - self._span().start) if approximate else n)
+        block = max(1, int(block_bytes // (8 * width)))
+        neighbors = np.empty((n, k), dtype=np.intp)
+        values = np.empty((n, k))
+        for start in range(0, n, block):
+            rows = np.arange(start, min(start + block, n))
+            neighbors[rows], values[rows] = self._neighbors(rows, k, approximate)
+        tickers = np.array(self.tickers, dtype=object)
+        return pd.DataFrame({
+            "symbol": np.repeat(tickers, k),
+            "rank": np.tile(np.arange(1, k + 1), n),
+            "neighbor": tickers[neighbors.ravel()],
+            "corr": values.ravel(),
+            })
+
+    def save(self, path: str) -> None:
+        '''
+        Writes the index (returns, last prices and settings) to an .npz file.
+        '''
+        np.savez(path,
+                 tickers=np.array(self.tickers, dtype=str),
+                 returns=self.returns,
+                 last=self._last,
+                 settings=np.array([-1 if self.window is None else self.window, self.dims, self.candidates, self.seed]))
+
+    @classmethod
+    def load(cls, path: str) -> "ComovementIndex":
+        '''
+        Reads an index written by save(); the sketch is rebuilt on the first approximate query.
+        '''
+        with np.load(path, allow_pickle=False) as data:
+            window, dims, candidates, seed = (int(v) for v in data["settings"])
+            index = cls(pd.DataFrame(columns=list(data["tickers"]), dtype=np.float64),
+                        window=None if window < 0 else window, dims=dims, candidates=candidates, seed=seed)
+            index._append(data["returns"])
+            index._last = data["last"]
+        return index
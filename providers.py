@@ -0,0 +1,236 @@
+# Pluggable history data sources for priceables #
+# yfinance is the default, local files and in-memory fixtures replace it for offline runs #
+
+import os
+import time
+import random
+import asyncio
+import threading
+import pandas as pd
+
+from typing import Dict, Optional, Union
+
+from bars import trim_to_period
+from static_types.time_range import Interval, Period
+from lazy import lazy_import
+
+yf = lazy_import("yfinance")
+
+# timezone of the exchange, the one yfinance stamps US bars in
+EXCHANGE_TZ = "America/New_York"
+
+class ProviderError(Exception):
+    '''Raised when a data provider cannot return history for a request.'''
+
+class SymbolNotFoundError(ProviderError, LookupError):
+    '''Raised when a data provider has no history for a symbol.'''
+
+class RateLimitError(ProviderError):
+    '''Raised when a data provider throttles requests. Retried with backoff by async_fetch.AsyncFetcher.'''
+    def __init__(self, message: str = "Rate limited by data provider.", retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def select_bars(frame: pd.DataFrame, period: Union[Period, str], start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    '''
+    Returns the bars of a full local history a provider request covers: bars from *start* onwards, or the trailing period.
+    '''
+    if start is not None:
+        return frame[frame.index >= start]
+    return trim_to_period(frame, period)
+
+def ticker_history(ticker, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    '''
+    Returns yf.Ticker.history of a period, or of every bar from *start* onwards, with yfinance throttling raised as RateLimitError.
+    '''
+    try:
+        from yfinance.exceptions import YFRateLimitError
+    except ImportError:
+        YFRateLimitError = RateLimitError
+    try:
+        if start is not None:
+            return ticker.history(start = start, interval = interval or Interval.DAY.value)
+        if interval==None:
+            return ticker.history(period = period)
+        return ticker.history(period = period, interval = interval)
+    except YFRateLimitError as e:
+        raise RateLimitError(str(e)) from e
+
+class DataProvider:
+    '''
+    Base history source. Subclasses return the OHLCV history frame of one symbol, in the same
+    layout as yf.Ticker.history (DatetimeIndex, Open/High/Low/Close/Volume columns).
+
+    When *start* is given the period is ignored and every bar from *start* onwards is returned.
+    '''
+    def history(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def market_cap(self, symbol: str) -> float:
+        '''
+        Returns the current market capitalization of a symbol, used for cap-weighted sector indices.
+        '''
+        raise ProviderError(f"{type(self).__name__} does not provide market caps.")
+
+class YFinanceProvider(DataProvider):
+    '''
+    Default provider backed by yf.Ticker.history.
+    '''
+    def history(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        frame = ticker_history(yf.Ticker(symbol), period, interval, start=start)
+        if frame.empty and start is None:
+            raise SymbolNotFoundError(f"No history returned for {symbol}.")
+        return frame
+
+    def market_cap(self, symbol: str) -> float:
+        try:
+            cap = yf.Ticker(symbol).fast_info["marketCap"]
+        except KeyError as e:
+            raise SymbolNotFoundError(f"No market cap returned for {symbol}.") from e
+        if cap is None or not cap > 0:
+            raise SymbolNotFoundError(f"No market cap returned for {symbol}.")
+        return float(cap)
+
+class FrameProvider(DataProvider):
+    '''
+    In-memory provider serving fixture frames, trimmed to the requested period.
+
+    **Examples**
+
+    >>> provider = FrameProvider({'XOM': xom_frame, 'CVX': cvx_frame})
+    >>> Priceable(type=LOADABLE.STOCK, name_symbol='XOM', provider=provider, cache=False).get_price_history(period='5d')
+    '''
+    def __init__(self, frames: Dict[str, pd.DataFrame]) -> None:
+        self.frames = frames
+
+    def history(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        if symbol not in self.frames:
+            raise SymbolNotFoundError(f"No fixture frame for {symbol}.")
+        return select_bars(self.frames[symbol], period, start)
+
+class FileProvider(DataProvider):
+    '''
+    Provider reading one history file per symbol from a directory.
+
+    Files are looked up as <root>/<interval>/<SYMBOL>.parquet, then <root>/<SYMBOL>.parquet, with .csv
+    accepted in place of .parquet. CSV files need the timestamp in their first column: timestamps with a
+    UTC offset are converted to *tz*, naive ones are taken to be in *tz* already.
+
+    **Examples**
+
+    >>> provider = FileProvider('data/bars')
+    >>> PriceUniverse('ticks/energy-us.txt', provider=provider).load(period='1mo', interval='1d')
+    '''
+    def __init__(self, root: str, tz: str = EXCHANGE_TZ) -> None:
+        '''
+        :param root: directory holding the history files
+        :param tz: exchange timezone of CSV timestamps
+        '''
+        self.root = root
+        self.tz = tz
+
+    def _path(self, symbol: str, interval: Union[Interval, str, None]) -> Optional[str]:
+        interval = interval.value if isinstance(interval, Interval) else interval
+        folders = [os.path.join(self.root, interval), self.root] if interval else [self.root]
+        for folder in folders:
+            for ext in (".parquet", ".csv"):
+                path = os.path.join(folder, symbol + ext)
+                if os.path.exists(path):
+                    return path
+        return None
+
+    def history(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        path = self._path(symbol, interval)
+        if path is None:
+            raise SymbolNotFoundError(f"No history file for {symbol} under {self.root}.")
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path, index_col=0)
+            try:
+                index = pd.DatetimeIndex(pd.to_datetime(frame.index))
+            except ValueError:
+                # offsets differ across a DST change
+                index = pd.to_datetime(frame.index, utc=True)
+            frame.index = index.tz_localize(self.tz) if index.tz is None else index.tz_convert(self.tz)
+        return select_bars(frame.sort_index(), period, start)
+
+class FakeProvider(FrameProvider):
+    '''
+    Fixture provider that injects latency, throttling and failures, for exercising the fetch pipeline offline.
+
+    history() blocks with time.sleep, ahistory() awaits asyncio.sleep. Each symbol draws from its own
+    generator seeded from *seed* and the symbol, so runs are repeatable whatever order worker threads or
+    tasks request symbols in; the counters are guarded by a lock, so history() is safe from worker threads.
+
+    **Examples**
+
+    >>> provider = FakeProvider(frames, latency=0.05, throttle_rate=0.2, error_rate=0.05, seed=7)
+    >>> AsyncFetcher(provider, max_in_flight=16, rate=50).run(list(frames), period='1d', interval='1m')
+    '''
+    def __init__(self,
+                 frames: Dict[str, pd.DataFrame],
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 throttle_rate: float = 0.0,
+                 error_rate: float = 0.0,
+                 retry_after: Optional[float] = None,
+                 seed: Optional[int] = None
+                 ) -> None:
+        '''
+        :param frames: fixture history frame per symbol
+        :param latency: base latency of each request in seconds
+        :param jitter: uniform extra latency in seconds
+        :param throttle_rate: probability a request raises RateLimitError
+        :param error_rate: probability a request raises ProviderError
+        :param retry_after: retry_after hint attached to injected RateLimitErrors
+        :param seed: seed of the injection draws, None for unseeded draws
+        '''
+        super().__init__(frames)
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rngs: Dict[str, random.Random] = {}
+        self._lock = threading.Lock()
+
+    def _enter(self, symbol: str) -> float:
+        '''Counts a request in flight and returns its latency, or raises the injected error.'''
+        with self._lock:
+            self.calls += 1
+            rng = self._rngs.get(symbol)
+            if rng is None:
+                rng = self._rngs[symbol] = random.Random(None if self.seed is None else f"{self.seed}:{symbol}")
+            draw, extra = rng.random(), rng.random()
+            if draw < self.throttle_rate:
+                raise RateLimitError("Injected throttle.", retry_after=self.retry_after)
+            if draw < self.throttle_rate + self.error_rate:
+                raise ProviderError("Injected provider failure.")
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return self.latency + self.jitter * extra
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def history(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        delay = self._enter(symbol)
+        try:
+            time.sleep(delay)
+            return super().history(symbol, period, interval, start=start)
+        finally:
+            self._exit()
+
+    async def ahistory(self, symbol: str, period: Union[Period, str], interval: Union[Interval, str] = None, start: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        delay = self._enter(symbol)
+        try:
+            await asyncio.sleep(delay)
+            return super().history(symbol, period, interval, start=start)
+        finally:
+            self._exit()
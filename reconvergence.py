@@ -0,0 +1,214 @@
+# Reconvergence probability of leader/follower spreads as a function of the divergence bias D #
+# P(|s(t+1)| < |s(t)|  given  |s(t)| > D), for a whole grid of D in one histogram pass #
+
+import os
+import warnings
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Real
+from typing import Union, Optional, Sequence, Tuple, List
+
+from shared import SharedArray, ArraySpec, attach
+from store import ResultStore, digest
+
+RESULT_KIND = "reconvergence"
+
+def events(spread: np.ndarray, thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Bins every bar of a (time x pairs) spread block against a sorted grid of thresholds.
+
+    :return: (time-1 x pairs) key = pair*(G+1) + number of thresholds exceeded by |s(t)|, and whether
+        |s(t+1)| < |s(t)|. Bars with a NaN on either side exceed no threshold.
+    '''
+    magnitude = np.abs(np.asarray(spread, dtype=np.float64))
+    now, after = magnitude[:-1], magnitude[1:]
+    with np.errstate(invalid='ignore'):
+        valid = ~(np.isnan(now) | np.isnan(after))
+        reconverged = valid & (after < now)
+    exceeded = np.searchsorted(thresholds, np.where(valid, now, -np.inf), side='left')
+    pairs = magnitude.shape[1]
+    key = exceeded + np.arange(pairs) * (len(thresholds) + 1)
+    return key, reconverged
+
+def tally(key: np.ndarray,
+          reconverged: np.ndarray,
+          pairs: int,
+          grid: int,
+          weights: Optional[np.ndarray] = None
+          ) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Counts diverging bars and reconvergences of every pair above every threshold.
+
+    :param weights: (Optional) per-bar weights (bootstrap resample counts), shared by all pairs
+
+    :return: (pairs x G) diverging-bar counts and reconvergence counts
+    '''
+    flat = key.ravel()
+    w = np.ones(key.shape) if weights is None else np.broadcast_to(np.asarray(weights, dtype=np.float64)[:, None], key.shape)
+    size = pairs * (grid + 1)
+    total = np.bincount(flat, weights=w.ravel(), minlength=size).reshape(pairs, grid + 1)
+    hits = np.bincount(flat, weights=(w * reconverged).ravel(), minlength=size).reshape(pairs, grid + 1)
+    # bars exceeding threshold k are those whose bin is above k: suffix sums over bins k+1..G
+    above = lambda counts: np.cumsum(counts[:, ::-1], axis=1)[:, ::-1][:, 1:]
+    return above(total), above(hits)
+
+def block_weights(n: int, block: int, rng: np.random.Generator) -> np.ndarray:
+    '''
+    Returns moving-block bootstrap resample counts of n bars (blocks keep intraday autocorrelation).
+    '''
+    block = max(1, min(block, n))
+    starts = rng.integers(0, n - block + 1, size=-(-n // block))
+    rows = (starts[:, None] + np.arange(block)).ravel()[:n]
+    return np.bincount(rows, minlength=n).astype(np.float64)
+
+def _replicates(key: np.ndarray,
+                reconverged: np.ndarray,
+                grid: int,
+                block: int,
+                seeds: Sequence[np.random.SeedSequence]
+                ) -> np.ndarray:
+    pairs = key.shape[1]
+    out = np.empty((len(seeds), pairs, grid), dtype=np.float32)
+    for i, seed in enumerate(seeds):
+        weights = block_weights(len(key), block, np.random.default_rng(seed))
+        total, hits = tally(key, reconverged, pairs, grid, weights)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[i] = hits / total
+    return out
+
+def _bootstrap_chunk(key: ArraySpec, reconverged: ArraySpec, grid: int, block: int, seeds: Sequence[np.random.SeedSequence]) -> np.ndarray:
+    return _replicates(attach(key), attach(reconverged), grid, block, seeds)
+
+class ReconvergenceEstimator:
+    '''
+    Estimates the README's reconvergence probability for many pairs over a grid of divergence biases D.
+
+    For each pair and D, among bars with |s(t)| > D it reports the fraction where |s(t+1)| < |s(t)|.
+    All thresholds are tallied at once: each bar is binned by how many thresholds it exceeds (one
+    searchsorted over the sorted grid), a bincount per (pair, bin) and a suffix sum give every count.
+    Confidence intervals come from a moving-block bootstrap whose replicates run in a process pool
+    over shared-memory inputs; resample weights depend only on the seed and bar count, so a pair's
+    result does not depend on which other pairs are estimated with it.
+
+    With a ResultStore, every pair is stored under a digest of its spread and the estimator settings,
+    and later runs only compute pairs that are not stored yet.
+
+    **Examples**
+
+    >>> spreads = divergence.pair_spreads(prices) #(time x pairs) of phi_L - phi_F
+    >>> estimator = ReconvergenceEstimator(thresholds=np.linspace(0.25, 5, 20), n_boot=500, store=ResultStore())
+    >>> estimator.estimate(spreads)
+       leader follower     D  events  reconverged  probability     lower     upper
+    0     XOM      CVX  0.25   801.0        431.0     0.538077  0.506527  0.570175
+    ...
+    '''
+    def __init__(self,
+                 thresholds: Sequence[Real],
+                 n_boot: int = 1000,
+                 block: int = 30,
+                 confidence: float = 0.95,
+                 seed: int = 0,
+                 processes: Optional[int] = None,
+                 store: Optional[ResultStore] = None,
+                 max_bytes: int = 256 * 1024**2
+                 ) -> None:
+        '''
+        :param thresholds: grid of divergence biases D > 0
+        :param n_boot: bootstrap replicates, 0 for point estimates only
+        :param block: bootstrap block length in bars
+        :param confidence: two-sided confidence level of lower/upper
+        :param seed: root seed, replicates are reproducible across runs and process counts
+        :param processes: worker processes, defaults to os.cpu_count(), 1 runs in this process
+        :param store: (Optional) ResultStore to reuse and save per-pair results
+        :param max_bytes: memory cap of one batch of pairs' bootstrap replicates
+        '''
+        self.thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+        if len(self.thresholds)==0 or self.thresholds[0] <= 0:
+            raise ValueError("Thresholds must be a non-empty grid of positive values.")
+        self.n_boot = n_boot
+        self.block = block
+        self.confidence = confidence
+        self.seed = seed
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        self.store = store
+        self.max_bytes = max_bytes
+
+    def key(self, pair, spread: np.ndarray) -> str:
+        return digest(pair, spread, self.thresholds, self.n_boot, self.block, self.confidence, self.seed)
+
+    def _bootstrap(self, key: np.ndarray, reconverged: np.ndarray) -> np.ndarray:
+        seeds = np.random.SeedSequence(self.seed).spawn(self.n_boot)
+        grid = len(self.thresholds)
+        workers = min(self.processes, self.n_boot)
+        if workers <= 1:
+            return _replicates(key, reconverged, grid, self.block, seeds)
+        parts = [list(part) for part in np.array_split(np.array(seeds, dtype=object), workers)]
+        with SharedArray(key) as key_shared, SharedArray(reconverged) as reconverged_shared:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(_bootstrap_chunk, key_shared.spec, reconverged_shared.spec, grid, self.block, part)
+                    for part in parts
+                    ]
+                return np.concatenate([future.result() for future in futures])
+
+    def _estimate(self, spread: np.ndarray) -> np.ndarray:
+        '''(pairs x G x 5) events, reconverged, probability, lower, upper.'''
+        key, reconverged = events(spread, self.thresholds)
+        pairs, grid = spread.shape[1], len(self.thresholds)
+        total, hits = tally(key, reconverged, pairs, grid)
+        out = np.full((pairs, grid, 5), np.nan)
+        out[..., 0], out[..., 1] = total, hits
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[..., 2] = hits / total
+        if self.n_boot > 0 and len(key):
+            replicates = self._bootstrap(key, reconverged)
+            tail = (1 - self.confidence) / 2 * 100
+            with warnings.catch_warnings():
+                # all-NaN slices (no diverging bar above D) stay NaN
+                warnings.simplefilter("ignore", RuntimeWarning)
+                out[..., 3], out[..., 4] = np.nanpercentile(replicates, [tail, 100 - tail], axis=0)
+        return out
+
+    def _frame(self, pair, values: np.ndarray) -> pd.DataFrame:
+        frame = pd.DataFrame(values, columns=["events", "reconverged", "probability", "lower", "upper"])
+        frame.insert(0, "D", self.thresholds)
+        if isinstance(pair, tuple) and len(pair)==2:
+            frame.insert(0, "follower", pair[1])
+            frame.insert(0, "leader", pair[0])
+        else:
+            frame.insert(0, "pair", pair)
+        return frame
+
+    def estimate(self, spread: Union[pd.Series, pd.DataFrame, np.ndarray]) -> pd.DataFrame:
+        '''
+        Returns reconvergence probabilities of every pair at every threshold, one row per (pair, D).
+
+        :param spread: a Series (one pair), or a (time x pairs) DataFrame / array of spreads phi_L - phi_F,
+            ie: divergence.pair_spreads(prices). (leader, follower) column labels become leader/follower columns.
+        '''
+        if isinstance(spread, pd.DataFrame):
+            names, values = list(spread.columns), spread.to_numpy(dtype=np.float64)
+        elif isinstance(spread, pd.Series):
+            names, values = [spread.name], spread.to_numpy(dtype=np.float64)[:, None]
+        else:
+            values = np.asarray(spread, dtype=np.float64)
+            values = values[:, None] if values.ndim==1 else values
+            names = list(range(values.shape[1]))
+
+        keys = [self.key(name, np.ascontiguousarray(values[:, i])) for i, name in enumerate(names)]
+        frames: List[Optional[pd.DataFrame]] = [
+            self.store.get(RESULT_KIND, key) if self.store is not None else None for key in keys
+            ]
+        missing = np.array([i for i, frame in enumerate(frames) if frame is None], dtype=np.intp)
+        per_pair = max(1, self.n_boot) * len(self.thresholds) * 4
+        batch = max(1, int(self.max_bytes // per_pair))
+        for start in range(0, len(missing), batch):
+            columns = missing[start:start + batch]
+            result = self._estimate(values[:, columns])
+            for j, i in enumerate(columns):
+                frames[i] = self._frame(names[i], result[j])
+                if self.store is not None:
+                    self.store.put(RESULT_KIND, keys[i], frames[i])
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -0,0 +1,88 @@
+# Local OHLCV resampling of fine (1m) bars into coarser intervals #
+
+import pandas as pd
+import numpy as np
+
+from typing import Union, Optional
+
+from bars import interval_length
+from static_types.time_range import Interval
+
+# OHLCV aggregation per column, extra yfinance columns (Dividends, Stock Splits) are summed
+AGGREGATION = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+}
+
+# intervals that can be built from 1m bars
+RESAMPLEABLE = ('2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d')
+
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+
+def resample_bars(frame: pd.DataFrame,
+                  interval: Union[Interval, str],
+                  session_open: pd.Timedelta = SESSION_OPEN
+                  ) -> pd.DataFrame:
+    '''
+    Aggregates fine OHLCV bars into coarser bars without crossing sessions.
+
+    Intraday buckets are anchored at each session's open (so 1h bars start 9:30, 10:30, ... like yfinance)
+    and the last bucket of a session is cut at the close. Daily bars are stamped at midnight of the session date.
+    Open/High/Low/Close/Volume aggregate as first/max/min/last/sum.
+
+    :param frame: OHLCV frame with a tz-aware DatetimeIndex in exchange time, ie: 1m history
+    :param interval: 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d
+    :param session_open: session open as an offset from midnight
+
+    :return: A resampled OHLCV frame. Daily volume is the sum of intraday bars and can differ slightly from provider daily bars.
+
+    **Examples**
+
+    >>> minute = Priceable(type='stock', name_symbol='XOM').get_bars(period='5d', interval='1m').to_frame()
+    >>> resample_bars(minute, '1h').head(2)
+                                     Open        High         Low       Close     Volume
+    Datetime
+    2025-08-18 09:30:00-04:00  108.419998  108.610001  107.889999  108.010002  2178329.0
+    2025-08-18 10:30:00-04:00  108.010002  108.160004  107.750000  107.870003  1304710.0
+    '''
+    interval = interval.value if isinstance(interval, Interval) else str(interval)
+    if interval not in RESAMPLEABLE:
+        raise ValueError(f"Interval {interval} cannot be built from fine bars. Expected one of {RESAMPLEABLE}.")
+    if len(frame)==0:
+        return frame.copy()
+    index = frame.index.as_unit('ns')
+    sessions = index.normalize()
+    if interval=='1d':
+        labels = sessions
+    else:
+        step = interval_length(interval).value
+        anchor = (sessions + session_open).asi8
+        labels = pd.to_datetime(anchor + ((index.asi8 - anchor) // step) * step, utc=index.tz is not None)
+        if index.tz is not None:
+            labels = labels.tz_convert(index.tz)
+    how = {column: AGGREGATION.get(column, 'sum') for column in frame.columns}
+    out = frame.groupby(labels, sort=True).agg(how)
+    out.index.name = index.name
+    return out
+
+# approximate trading sessions per period, used to compare lookbacks
+PERIOD_SESSIONS = {
+    '1d': 1,
+    '5d': 5,
+    '1mo': 21,
+    '3mo': 63,
+    '6mo': 126,
+    '1y': 252,
+    '2y': 504,
+    '5y': 1260,
+    '10y': 2520,
+}
+
+def covers(fine_period: str, period: str) -> bool:
+    '''
+    Returns whether history over *fine_period* contains the lookback of *period* (both yfinance period strings).
+    '''
+    return PERIOD_SESSIONS.get(fine_period, 0) >= PERIOD_SESSIONS.get(period, np.inf)
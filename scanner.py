@@ -0,0 +1,182 @@
+# Sector-wide leader/follower divergence scanner #
+# ranks every pair of a universe by its current scaled-price spread |phi_L - phi_F| #
+
+import os
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union, Optional, Sequence, Tuple
+
+import algebra
+import kernels
+from shared import SharedArray, ArraySpec, attach
+from universe import PriceUniverse
+from providers import DataProvider
+from static_types.quote_timing import QuoteTiming
+from static_types.time_range import Interval, Period
+
+METRICS = ("spread", "abs_spread", "mean_abs", "max_abs", "zscore")
+
+def spread_metrics(scaled: np.ndarray,
+                   leaders: np.ndarray,
+                   followers: np.ndarray,
+                   lookback: Optional[int] = None,
+                   hedge_window: Optional[int] = None,
+                   hedge_method: str = "ols"
+                   ) -> np.ndarray:
+    '''
+    Computes divergence metrics of many pairs from a (time x tickers) block of scaled prices in one batched pass.
+
+    :param scaled: scaled prices, one column per ticker
+    :param leaders: column index of each pair's leader
+    :param followers: column index of each pair's follower
+    :param lookback: (Optional) number of most recent bars the metrics cover, defaults to all
+    :param hedge_window: (Optional) rolling hedge-ratio window, the spread is then the residual
+        phi_L - a - r * phi_F (see hedge.pair_hedges) instead of phi_L - phi_F
+    :param hedge_method: "ols" or "tls"
+
+    :return: (pairs x 5) array of METRICS: last signed spread, its absolute value, mean and max
+        absolute spread over the lookback, and the z-score of the last spread against the lookback.
+    '''
+    lead, follow = scaled[:, leaders], scaled[:, followers]
+    if hedge_window is None:
+        spread = lead - follow
+    else:
+        ratio, intercept = kernels.rolling_regression(follow, lead, hedge_window, hedge_method)
+        spread = lead - intercept - ratio * follow
+    if lookback is not None:
+        spread = spread[-lookback:]
+    last = spread[-1]
+    absolute = np.abs(spread)
+    out = np.empty((len(leaders), len(METRICS)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:, 0] = last
+        out[:, 1] = np.abs(last)
+        out[:, 2] = np.nanmean(absolute, axis=0) if len(spread) else np.nan
+        out[:, 3] = np.nanmax(absolute, axis=0) if len(spread) else np.nan
+        out[:, 4] = (last - np.nanmean(spread, axis=0)) / np.nanstd(spread, axis=0, ddof=1)
+    return out
+
+def pair_indices(tickers: Sequence[str], leaders: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Returns (leader, follower) column indices of pairs of *tickers*: each given leader against every
+    other ticker, or every unordered pair with the earlier ticker (larger, in ticks-file order) as leader.
+    '''
+    n = len(tickers)
+    if leaders is None:
+        return np.triu_indices(n, 1)
+    position = {tick: i for i, tick in enumerate(tickers)}
+    missing = [tick for tick in leaders if tick not in position]
+    if missing:
+        raise ValueError(f"Leaders not in universe: {missing}")
+    rows = np.array([position[tick] for tick in leaders], dtype=np.intp)
+    lead = np.repeat(rows, n)
+    follow = np.tile(np.arange(n), len(rows))
+    keep = lead != follow
+    return lead[keep], follow[keep]
+
+def _scan_chunk(spec: ArraySpec, leaders: np.ndarray, followers: np.ndarray, **options) -> np.ndarray:
+    return spread_metrics(attach(spec), leaders, followers, **options)
+
+class DivergenceScanner:
+    '''
+    Scans every leader/follower pair of a universe for divergence of index-scaled prices.
+
+    Prices are forward-filled (so a ticker without a print in the latest bar keeps its last price) and
+    scaled with algebra.scale once for the whole universe. Pairs are then evaluated in chunks of
+    columns taken from the scaled matrix, so memory stays bounded by *chunk_bytes*. With more than one
+    chunk and process, chunks are spread over a process pool that reads the matrix from shared memory.
+
+    **Examples**
+
+    >>> scanner = DivergenceScanner.from_ticks('ticks/energy-us.txt', period=Period.DAY, interval=Interval.MINUTE)
+    >>> scanner.scan(top=5)
+      leader follower     spread  abs_spread  mean_abs   max_abs    zscore
+    0    XOM     SLNG  -9.412310    9.412310  4.019245  9.530198 -2.811244
+    ...
+    >>> scanner.scan(leaders=['XOM', 'CVX'], top=10) #leaders against every other ticker
+    >>> DivergenceScanner(prices, hedge_window=120).scan() #rank hedge-ratio residuals instead of raw spreads
+    '''
+    def __init__(self,
+                 prices: pd.DataFrame,
+                 scale_start: float = 100,
+                 lookback: Optional[int] = None,
+                 hedge_window: Optional[int] = None,
+                 hedge_method: str = "ols"
+                 ) -> None:
+        '''
+        :param prices: aligned (time x tickers) prices, ie: PriceUniverse.load()
+        :param scale_start: value of phi(t_0)
+        :param lookback: (Optional) number of most recent bars used for mean/max/z-score, defaults to all
+        :param hedge_window: (Optional) rank the rolling hedge-ratio residual spread over this window
+        :param hedge_method: "ols" or "tls" hedge-ratio regression
+        '''
+        self.prices = prices.ffill()
+        self.tickers = list(prices.columns)
+        self.scale_start = scale_start
+        self.scaled = algebra.scale(self.prices.to_numpy(dtype=np.float64), initial=scale_start)
+        self.lookback = lookback
+        self.hedge_window = hedge_window
+        self.hedge_method = hedge_method
+
+    @classmethod
+    def from_ticks(cls,
+                   ticks: Union[str, Sequence[str]],
+                   period: Union[Period, str] = Period.DAY,
+                   interval: Union[Interval, str] = Interval.MINUTE,
+                   price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
+                   provider: Optional[DataProvider] = None,
+                   **kwargs
+                   ) -> "DivergenceScanner":
+        '''
+        Loads a ticks file (or ticker list) through PriceUniverse and builds a scanner over it.
+        '''
+        universe = PriceUniverse(ticks, provider=provider)
+        scanner = cls(universe.load(period=period, interval=interval, price_timing=price_timing), **kwargs)
+        scanner.failures = universe.failures
+        return scanner
+
+    def pairs(self, leaders: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Returns (leader, follower) column indices, see pair_indices.
+        '''
+        return pair_indices(self.tickers, leaders)
+
+    def scan(self,
+             leaders: Optional[Sequence[str]] = None,
+             top: Optional[int] = 50,
+             processes: Optional[int] = None,
+             chunk_bytes: int = 64 * 1024**2
+             ) -> pd.DataFrame:
+        '''
+        Returns pairs ranked by current absolute spread, largest first.
+
+        :param leaders: (Optional) leader tickers to scan against every other ticker, defaults to all pairs
+        :param top: (Optional) number of rows returned, None for every pair
+        :param processes: worker processes, defaults to os.cpu_count(), 1 runs in this process
+        :param chunk_bytes: approximate memory cap of one chunk's spread block
+        '''
+        lead, follow = self.pairs(leaders)
+        # the hedge regression needs the whole history, plain spreads only the lookback
+        block = self.scaled if self.lookback is None or self.hedge_window is not None else self.scaled[-self.lookback:]
+        options = {"lookback": self.lookback, "hedge_window": self.hedge_window, "hedge_method": self.hedge_method}
+        chunk = max(1, int(chunk_bytes // (8 * (2 if self.hedge_window is None else 8) * max(len(block), 1))))
+        bounds = [(start, min(start + chunk, len(lead))) for start in range(0, len(lead), chunk)]
+        processes = processes if processes is not None else (os.cpu_count() or 1)
+        if processes <= 1 or len(bounds) <= 1:
+            metrics = [spread_metrics(block, lead[a:b], follow[a:b], **options) for a, b in bounds]
+        else:
+            with SharedArray(block) as shared:
+                with ProcessPoolExecutor(max_workers=min(processes, len(bounds))) as pool:
+                    futures = [pool.submit(_scan_chunk, shared.spec, lead[a:b], follow[a:b], **options) for a, b in bounds]
+                    metrics = [future.result() for future in futures]
+        metrics = np.concatenate(metrics) if metrics else np.empty((0, len(METRICS)))
+        tickers = np.array(self.tickers, dtype=object)
+        table = pd.DataFrame(metrics, columns=list(METRICS))
+        table.insert(0, "follower", tickers[follow])
+        table.insert(0, "leader", tickers[lead])
+        table = table.sort_values("abs_spread", ascending=False, na_position="last", kind="stable")
+        if top is not None:
+            table = table.head(top)
+        return table.reset_index(drop=True)
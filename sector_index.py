@@ -0,0 +1,224 @@
+# Synthetic sector index built from constituent prices #
+# replaces the sector ETF download for any ticks file; cap weights come from a small on-disk cache #
+
+import os
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+from numbers import Real
+from typing import Union, Optional, Sequence, Mapping, Dict
+
+import algebra
+import kernels
+from cache import DEFAULT_CACHE_DIR
+from providers import DataProvider, YFinanceProvider, ProviderError
+from universe import PriceUniverse
+from static_types.quote_timing import QuoteTiming
+from static_types.time_range import Interval, Period
+
+WEIGHTINGS = ("cap", "equal")
+
+class MarketCapCache:
+    '''
+    JSON file of market caps by symbol, refreshed from a provider once an entry is older than *ttl*.
+
+    Stale entries are still served when the provider fails, so cap-weighted indices work offline
+    once every constituent has been seen.
+
+    **Examples**
+
+    >>> caps = MarketCapCache()
+    >>> caps.get(['XOM', 'CVX'])
+    XOM    4.714e+11
+    CVX    2.699e+11
+    dtype: float64
+    '''
+    def __init__(self,
+                 path: str = os.path.join(DEFAULT_CACHE_DIR, "market_caps.json"),
+                 ttl: float = 24 * 60 * 60,
+                 provider: Optional[DataProvider] = None
+                 ) -> None:
+        '''
+        :param path: JSON file holding {symbol: {"cap": float, "fetched_at": epoch seconds}}
+        :param ttl: seconds before a cached cap is refreshed
+        :param provider: (Optional) DataProvider implementing market_cap, defaults to YFinanceProvider
+        '''
+        self.path = path
+        self.ttl = ttl
+        self.provider = provider if provider is not None else YFinanceProvider()
+        self._lock = threading.RLock()
+        self._caps = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, float]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._caps, f)
+        os.replace(tmp, self.path)
+
+    def put(self, caps: Mapping[str, Real]) -> None:
+        '''Stores caps, ie: from another data source.'''
+        now = time.time()
+        with self._lock:
+            self._caps.update({symbol: {"cap": float(cap), "fetched_at": now} for symbol, cap in caps.items()})
+            self._write()
+
+    def get(self, symbols: Sequence[str], refresh: bool = False) -> pd.Series:
+        '''
+        Returns market caps of *symbols*, fetching missing or stale ones.
+
+        :raises ProviderError: when a symbol has no cap cached and the provider cannot supply one
+        '''
+        now = time.time()
+        missing = []
+        with self._lock:
+            fetched = False
+            for symbol in symbols:
+                entry = self._caps.get(symbol)
+                if entry is not None and not refresh and now - entry["fetched_at"] < self.ttl:
+                    continue
+                try:
+                    self._caps[symbol] = {"cap": self.provider.market_cap(symbol), "fetched_at": now}
+                    fetched = True
+                except Exception:
+                    if entry is None:
+                        missing.append(symbol)
+            if fetched:
+                self._write()
+            if missing:
+                raise ProviderError(f"No market cap available for {missing}.")
+            return pd.Series({symbol: self._caps[symbol]["cap"] for symbol in symbols}, dtype=np.float64)
+
+class SectorIndex:
+    '''
+    Cap- or equal-weighted price index of constituents that are already loaded.
+
+    The index is a buy-and-hold basket fixed at the first bar: with weights w_i summing to 1,
+    I(t) = base * sum_i w_i * P_i(t) / P_i(t_0), a weighted sum of algebra.scale'd prices computed
+    in one vectorized pass. A constituent is flat at its first price until it first trades and keeps
+    its last price across missing bars. update() extends the index by one bar in O(constituents).
+
+    Market caps are today's, so cap weights are not taken from them directly (that would weight the
+    basket at t_0 by later prices). Shares are backed out as cap_i / P_i(last) and valued at the entry
+    prices instead: w_i is proportional to cap_i * P_i(t_0) / P_i(last), the caps as they stood at t_0.
+
+    **Examples**
+
+    >>> prices = PriceUniverse('ticks/energy-us.txt').load(period='1d', interval='1m')
+    >>> energy = SectorIndex(prices, weights='cap')
+    >>> energy.values.tail(1)
+    2025-08-18 15:59:00-04:00    100.4121
+    Name: Sector Index, dtype: float64
+    >>> energy.update(latest_prices, time=now) #Series of new prices by ticker
+    100.4389
+    >>> SectorIndex(prices, weights={'XOM': 0.5, 'CVX': 0.3, 'COP': 0.2}) #custom basket
+    '''
+    def __init__(self,
+                 prices: pd.DataFrame,
+                 weights: Union[str, Mapping[str, Real], pd.Series] = "cap",
+                 base: Real = 100,
+                 caps: Optional[MarketCapCache] = None,
+                 name: str = "Sector Index"
+                 ) -> None:
+        '''
+        :param prices: aligned (time x tickers) constituent prices, ie: PriceUniverse.load()
+        :param weights: "cap" (market caps from *caps*, taken back to the first bar), "equal", or weights by ticker (normalized to sum to 1)
+        :param base: index value at the first bar
+        :param caps: (Optional) MarketCapCache for cap weights, defaults to one at the default cache path
+        :param name: name of the values series
+        '''
+        self.base = base
+        self.name = name
+        self.weights = self._weights(list(prices.columns), weights, caps)
+        prices = prices[self.weights.index]
+        values = prices.to_numpy(dtype=np.float64)
+        filled = pd.DataFrame(values).ffill().to_numpy()
+        scaled = np.nan_to_num(algebra.scale(filled, initial=1), nan=1.0)
+        # first valid price of each constituent (the basket's entry price) and latest price, for update()
+        self._start = kernels.first_valid(values)
+        self._last = filled[-1] if len(filled) else np.full(len(self.weights), np.nan)
+        if isinstance(weights, str) and weights == "cap":
+            with np.errstate(invalid='ignore', divide='ignore'):
+                growth = self._start / self._last
+            # a constituent without prices stays flat in the basket, so its cap is kept as is
+            backdated = self.weights * np.where(np.isfinite(growth) & (growth > 0), growth, 1.0)
+            self.weights = (backdated / backdated.sum()).rename("weight")
+        self._w = self.weights.to_numpy()
+        self._values = pd.Series(base * (scaled @ self._w), index=prices.index, name=name)
+        self._times, self._appended = [], []
+
+    @staticmethod
+    def _weights(tickers: Sequence[str], weights, caps: Optional[MarketCapCache]) -> pd.Series:
+        if isinstance(weights, str):
+            if weights not in WEIGHTINGS:
+                raise ValueError(f"Unknown weighting {weights!r}, expected one of {WEIGHTINGS} or a mapping.")
+            if weights == "equal":
+                raw = pd.Series(1.0, index=tickers)
+            else:
+                raw = (caps if caps is not None else MarketCapCache()).get(tickers)
+        else:
+            raw = pd.Series(weights, dtype=np.float64)
+            unknown = [tick for tick in raw.index if tick not in tickers]
+            if unknown:
+                raise ValueError(f"Weighted tickers not in prices: {unknown}")
+        raw = raw[raw > 0]
+        if raw.empty:
+            raise ValueError("Sector index needs at least one positive weight.")
+        return (raw / raw.sum()).rename("weight")
+
+    @classmethod
+    def from_ticks(cls,
+                   ticks: Union[str, Sequence[str]],
+                   period: Union[Period, str] = Period.DAY,
+                   interval: Union[Interval, str] = Interval.MINUTE,
+                   price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
+                   provider: Optional[DataProvider] = None,
+                   **kwargs
+                   ) -> "SectorIndex":
+        '''
+        Loads a ticks file (or ticker list) through PriceUniverse and builds its index.
+        '''
+        universe = PriceUniverse(ticks, provider=provider)
+        index = cls(universe.load(period=period, interval=interval, price_timing=price_timing), **kwargs)
+        index.failures = universe.failures
+        return index
+
+    def update(self, prices: Union[pd.Series, np.ndarray], time=None) -> float:
+        '''
+        Adds one bar of constituent prices (a Series by ticker, or an array in weights order) and returns the index value.
+
+        :param time: (Optional) bar label appended to values, defaults to the next integer position
+        '''
+        if isinstance(prices, pd.Series):
+            prices = prices.reindex(self.weights.index)
+        row = np.asarray(prices, dtype=np.float64)
+        self._last = np.where(np.isnan(row), self._last, row)
+        fresh = np.isnan(self._start) & ~np.isnan(self._last)
+        self._start[fresh] = self._last[fresh]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled = np.where(np.isnan(self._last), 1.0, self._last / self._start)
+        value = float(self.base * (scaled @ self._w))
+        self._times.append(len(self._values) + len(self._times) if time is None else time)
+        self._appended.append(value)
+        return value
+
+    @property
+    def values(self) -> pd.Series:
+        '''Index values of every bar so far (bars added by update() are appended on first access).'''
+        if self._appended:
+            added = pd.Series(self._appended, index=self._times, name=self.name)
+            self._values = pd.concat([self._values, added]) if len(self._values) else added
+            self._times, self._appended = [], []
+        return self._values
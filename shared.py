@@ -0,0 +1,57 @@
+# Shared-memory ndarrays for process-pool workers #
+# the parent places a matrix once, workers attach by name instead of receiving pickled copies #
+
+import numpy as np
+
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+class SharedArray:
+    '''
+    Copies an ndarray into a shared memory block that lives until close() (or the end of a with block).
+
+    Pass *spec* to worker processes and read the array there with attach(spec).
+
+    **Examples**
+
+    >>> with SharedArray(prices) as shared:
+    ...     with ProcessPoolExecutor() as pool:
+    ...         results = list(pool.map(worker, [shared.spec]*4, chunks))
+    '''
+    def __init__(self, array: np.ndarray) -> None:
+        array = np.ascontiguousarray(array)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.array = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)
+        self.array[...] = array
+        self.spec: ArraySpec = (self.shm.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        self.array = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# attachments held by this (worker) process, by block name
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+def attach(spec: ArraySpec) -> np.ndarray:
+    '''
+    Returns a read-only view of a SharedArray from inside a worker process.
+
+    Attachments are reused across tasks of the same worker. Pool workers share the parent's resource
+    tracker, so the block is still unlinked exactly once, by SharedArray.close() in the creating process.
+    '''
+    name, shape, dtype = spec
+    if name not in _attached:
+        shm = shared_memory.SharedMemory(name=name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        array.flags.writeable = False
+        _attached[name] = (shm, array)
+    return _attached[name][1]
@@ -1,9 +1,14 @@
-import pandas as pd
+from __future__ import annotations
+
 import numpy as np
 
-from typing import Union
+from typing import Union, Optional, Tuple
 from numbers import Real 
 
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
 def covariance(x: Union[pd.Series, np.ndarray], y: Union[pd.Series, np.ndarray]) -> Real:
     '''
     Returns the covariance between two series of data as real.
@@ -100,3 +105,286 @@ def variance(x: Union[pd.Series, np.ndarray]) -> Real:
     '''
     return np.var(x)
 
+
+class StreamingCovariance:
+    '''
+    Incrementally updated covariance/correlation matrix of N series (ie: the returns of a sector universe).
+
+    Each new observation vector is a rank-one update of the running mean and co-moment matrix, O(N^2) per
+    bar instead of the O(N^2 T) of recomputing cov_matrix. Three weighting modes:
+        - cumulative (default): every observation counts equally, matches cov_matrix of all data seen
+        - window: only the last *window* observations count, expired ones are removed by a downdate
+        - decay: exponentially weighted (EWMA), weight decay^k for an observation k bars old
+
+    Observations containing NaN or +-inf are skipped (window mode keeps the last *window* valid ones).
+
+    :param decay: (Optional) EWMA decay factor in (0, 1), ie: 0.94
+    :param window: (Optional) number of most recent observations kept
+    :param ddof: delta degrees of freedom for the cumulative and window modes (1 matches np.cov)
+
+    **Examples**
+
+    >>> returns = PriceUniverse('ticks/energy-us.txt').load(period='5d', interval='1m').pct_change().dropna()
+    >>> engine = StreamingCovariance(window=390)
+    >>> engine.update_batch(returns.values[:-1])
+    >>> engine.update(returns.values[-1]) #next minute bar
+    >>> engine.corr().shape
+    (243, 243)
+    '''
+    def __init__(self, decay: Optional[float] = None, window: Optional[int] = None, ddof: int = 1) -> None:
+        if decay is not None and window is not None:
+            raise ValueError("Choose either an EWMA decay or a fixed window, not both.")
+        if decay is not None and not 0 < decay < 1:
+            raise ValueError("Decay must be in (0, 1).")
+        if window is not None and window < 2:
+            raise ValueError("Window must hold at least 2 observations.")
+        self.decay = decay
+        self.window = window
+        self.ddof = ddof
+        self.reset()
+
+    def reset(self) -> None:
+        self.weight = 0.0
+        self.mean = None
+        self.comoment = None
+        self.skipped = 0
+        self._buffer = None
+        self._pos = 0
+        self._added = 0
+
+    @property
+    def count(self) -> float:
+        '''Number of observations currently in the estimate (effective weight in decay mode).'''
+        return self.weight
+
+    def _start(self, n: int) -> None:
+        self.mean = np.zeros(n)
+        self.comoment = np.zeros((n, n))
+        if self.window is not None:
+            self._buffer = np.full((self.window, n), np.nan)
+
+    def _add(self, x: np.ndarray) -> None:
+        if self.decay is not None:
+            self.weight = self.decay*self.weight + 1.0
+            self.comoment *= self.decay
+        else:
+            self.weight += 1.0
+        delta = x - self.mean
+        self.mean += delta/self.weight
+        self.comoment += np.outer(delta, x - self.mean)
+
+    def _remove(self, x: np.ndarray) -> None:
+        if self.weight <= 1:
+            self.weight = 0.0
+            self.mean[:] = 0.0
+            self.comoment[:] = 0.0
+            return
+        self.weight -= 1.0
+        delta = x - self.mean
+        self.mean -= delta/self.weight
+        self.comoment -= np.outer(delta, x - self.mean)
+
+    def _resync(self) -> None:
+        rows = self._buffer[np.isfinite(self._buffer).all(axis=1)]
+        self.weight = float(len(rows))
+        self.mean = rows.mean(axis=0) if len(rows) else np.zeros(self._buffer.shape[1])
+        centered = rows - self.mean
+        self.comoment = centered.T @ centered
+
+    def update(self, x: Union[pd.Series, np.ndarray]) -> None:
+        '''
+        Adds one observation vector (one value per series).
+        '''
+        x = np.asarray(x, dtype=np.float64).ravel()
+        if self.mean is None:
+            self._start(len(x))
+        if not np.isfinite(x).all():
+            self.skipped += 1
+            return
+        if self.window is not None:
+            old = self._buffer[self._pos].copy()
+            self._buffer[self._pos] = x
+            self._pos = (self._pos + 1) % self.window
+            if np.isfinite(old).all():
+                self._remove(old)
+            self._add(x)
+            self._added += 1
+            if self._added % self.window == 0:
+                self._resync()
+            return
+        self._add(x)
+
+    def update_batch(self, X: Union[pd.DataFrame, np.ndarray]) -> None:
+        '''
+        Adds a (time x series) block of observations. Cumulative and decay modes merge the block's
+        moments in one matrix product, window mode keeps only the most recent rows.
+        '''
+        X = np.asarray(X, dtype=np.float64)
+        if len(X)==0:
+            return
+        if self.mean is None:
+            self._start(X.shape[1])
+        valid = np.isfinite(X).all(axis=1)
+        self.skipped += int((~valid).sum())
+        X = X[valid]
+        if len(X)==0:
+            return
+        if self.window is not None:
+            if len(X) >= self.window:
+                self._buffer[:] = X[-self.window:]
+                self._pos = 0
+                self._added = 0
+                self._resync()
+            else:
+                for x in X:
+                    self.update(x)
+            return
+        if self.decay is not None:
+            weights = self.decay ** np.arange(len(X) - 1, -1, -1, dtype=np.float64)
+            prior = self.decay ** len(X)
+        else:
+            weights = np.ones(len(X))
+            prior = 1.0
+        batch_weight = weights.sum()
+        batch_mean = weights @ X / batch_weight
+        centered = X - batch_mean
+        batch_comoment = (centered * weights[:, None]).T @ centered
+        old_weight = prior * self.weight
+        total = old_weight + batch_weight
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * batch_weight / total
+        self.comoment = prior * self.comoment + batch_comoment + np.outer(delta, delta) * old_weight * batch_weight / total
+        self.weight = total
+
+    def cov(self) -> np.ndarray:
+        '''
+        Returns the current covariance matrix (weighted population covariance in decay mode).
+        '''
+        if self.mean is None:
+            raise ValueError("No observations added.")
+        if self.decay is not None:
+            return self.comoment / self.weight
+        if self.weight - self.ddof <= 0:
+            return np.full(self.comoment.shape, np.nan)
+        return self.comoment / (self.weight - self.ddof)
+
+    def corr(self) -> np.ndarray:
+        '''
+        Returns the current correlation matrix, computed on demand from cov().
+        '''
+        cov = self.cov()
+        std = np.sqrt(np.diag(cov))
+        return cov/np.outer(std, std)
+
+def pair_index(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Returns the (i, j) column indices, i < j, of the N(N-1)/2 upper-triangle pairs of n series, in row-major order.
+
+    **Examples**
+
+    >>> pair_index(3)
+    (array([0, 0, 1]), array([1, 2, 2]))
+    '''
+    return np.triu_indices(n, 1)
+
+def rolling_correlation_matrix(x: Union[pd.DataFrame, np.ndarray],
+                               window: int,
+                               upper: bool = False,
+                               path: Optional[str] = None,
+                               dtype: type = np.float64,
+                               chunk_bytes: int = 256 * 1024**2
+                               ) -> np.ndarray:
+    '''
+    Returns rolling-window Pearson correlation of every pair of columns, for every time step.
+
+    Window sums of x, x^2 and every pairwise product x_i x_j (i < j) are carried from step to step (adding the
+    new row, removing the one leaving the window), so each step costs O(N^2) regardless of the window. The full
+    matrix mirrors the upper triangle. Time is processed in chunks sized by *chunk_bytes* alone, so intermediate
+    memory stays bounded for any window, and the result can be written to a .npy memory map instead of RAM.
+    Data is centered per column before summing, and the running sums are recomputed exactly once per window of
+    steps, to limit cancellation and drift.
+
+    Rows before the first full window, and pairs with a NaN or +-inf in either series inside the window, are NaN.
+
+    :param x: (time x tickers) frame or array of returns
+    :param window: number of observations per correlation
+    :param upper: return only the upper triangle, shape (T, N(N-1)/2) ordered as pair_index, instead of (T, N, N)
+    :param path: (Optional) .npy file to write the result to as a memory map
+    :param dtype: output dtype, float32 halves the output size
+    :param chunk_bytes: approximate cap of intermediate memory per chunk
+
+    **Examples**
+
+    >>> returns = PriceUniverse('ticks/energy-us.txt').load(period='1y', interval='1d').pct_change()
+    >>> corr = rolling_correlation_matrix(returns, window=21, upper=True, path='energy_corr.npy', dtype=np.float32)
+    >>> corr.shape
+    (251, 29403)
+    >>> i, j = pair_index(returns.shape[1])
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim != 2:
+        raise ValueError("Expected a (time x tickers) 2-D input.")
+    if window < 2:
+        raise ValueError("Correlation window must hold at least 2 observations.")
+    steps, n = x.shape
+    pi, pj = pair_index(n)
+    shape = (steps, len(pi)) if upper else (steps, n, n)
+    if path is not None:
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    else:
+        out = np.empty(shape, dtype=dtype)
+    out[:min(window - 1, steps)] = np.nan
+
+    finite = np.isfinite(x)
+    count = finite.sum(axis=0)
+    center = np.divide(np.where(finite, x, 0.0).sum(axis=0), count, out=np.zeros(n), where=count > 0)
+    with np.errstate(invalid='ignore'):
+        xc = np.where(finite, x - center, 0.0)
+    nans = (~finite).astype(np.int64)
+
+    def moments(a: int, b: int):
+        '''Pairwise products, values, squares and NaN flags of rows [a, b), rows before 0 count as zeros.'''
+        block, flags = xc[max(a, 0):b], nans[max(a, 0):b]
+        if a < 0:
+            block = np.vstack([np.zeros((-a, n)), block])
+            flags = np.vstack([np.zeros((-a, n), dtype=np.int64), flags])
+        return block[:, pi] * block[:, pj], block, block * block, flags
+
+    def window_sums(end: int):
+        '''Exact sums of moments over the *window* rows before *end*, taken in chunks.'''
+        totals = [np.zeros(len(pi)), np.zeros(n), np.zeros(n), np.zeros(n, dtype=np.int64)]
+        for a in range(end - window, end, chunk):
+            for total, part in zip(totals, moments(a, min(end, a + chunk))):
+                total += part.sum(axis=0)
+        return totals
+
+    # window sums run across chunks: each row adds its moments and removes those of the row leaving the
+    # window, so a step costs O(N^2) whatever the window; they are recomputed exactly once per window of rows
+    chunk = max(1, int(chunk_bytes // (8 * 6 * max(len(pi), 1))))
+    state, synced = None, 0
+    for start in range(window - 1, steps, chunk):
+        stop = min(steps, start + chunk)
+        if state is None or start - synced >= window:
+            state, synced = window_sums(start), start
+        added, removed = moments(start, stop), moments(start - window, stop - window)
+        sxy, sx, sxx, missing = (
+            total + np.cumsum(new - old, axis=0) for total, new, old in zip(state, added, removed)
+            )
+        state = [sxy[-1], sx[-1], sxx[-1], missing[-1]]
+        bad = missing > 0
+
+        var = np.maximum(sxx - sx * sx / window, 0.0)
+        cov = sxy - sx[:, pi] * sx[:, pj] / window
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.sqrt(var[:, pi] * var[:, pj])
+        corr[bad[:, pi] | bad[:, pj]] = np.nan
+        if upper:
+            out[start:stop] = corr
+        else:
+            out[start:stop, pi, pj] = corr
+            out[start:stop, pj, pi] = corr
+            diagonal = np.where((var > 0) & ~bad, 1.0, np.nan)
+            out[start:stop, np.arange(n), np.arange(n)] = diagonal
+    if path is not None:
+        out.flush()
+    return out
@@ -0,0 +1,106 @@
+# Persistent store of per-pair analysis results #
+# one parquet file per (kind, key), keys are content hashes so reruns reuse finished work #
+
+import os
+import glob
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from typing import Optional, List, Any
+
+from cache import DEFAULT_CACHE_DIR
+
+DEFAULT_RESULT_DIR = os.environ.get(
+    "COMOVEMENT_RESULT_DIR",
+    os.path.join(DEFAULT_CACHE_DIR, "results")
+    )
+
+def digest(*parts: Any) -> str:
+    '''
+    Returns a stable hex key of arrays, frames and plain values, ie: a spread, its pair and estimator settings.
+
+    **Examples**
+
+    >>> digest(('XOM', 'CVX'), spread.to_numpy(), [0.5, 1.0, 2.0], 1000)
+    '5f0c6c3e1b2a9d47a6e1c0f3'
+    '''
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.Series, pd.DataFrame)):
+            h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            h.update(str((part.shape, part.dtype.str)).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(repr(part).encode())
+        h.update(b"|")
+    return h.hexdigest()[:24]
+
+class ResultStore:
+    '''
+    Directory of result frames grouped by kind (ie: 'reconvergence', 'backtest').
+
+    Writes are atomic (temporary file then rename), so concurrent workers and interrupted runs never
+    leave a partial result behind, and a run can skip every key that is already stored.
+
+    **Examples**
+
+    >>> store = ResultStore('/tmp/results')
+    >>> key = digest(pair, spread.to_numpy(), thresholds)
+    >>> if not store.has('reconvergence', key):
+    ...     store.put('reconvergence', key, frame)
+    >>> store.load('reconvergence') #every stored frame of a kind, concatenated
+    '''
+    def __init__(self, root: str = DEFAULT_RESULT_DIR) -> None:
+        '''
+        :param root: directory holding one sub-directory of parquet files per kind
+        '''
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, kind, f"{key}.parquet")
+
+    def has(self, kind: str, key: str) -> bool:
+        return os.path.exists(self.path(kind, key))
+
+    def get(self, kind: str, key: str) -> Optional[pd.DataFrame]:
+        '''
+        Returns a stored frame, or None when the key is missing or unreadable.
+        '''
+        path = self.path(kind, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, kind: str, key: str, frame: pd.DataFrame) -> None:
+        path = self.path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        frame.to_parquet(tmp)
+        os.replace(tmp, path)
+
+    def keys(self, kind: str) -> List[str]:
+        return sorted(os.path.basename(path)[:-len(".parquet")] for path in glob.glob(self.path(kind, "*")))
+
+    def load(self, kind: str) -> pd.DataFrame:
+        '''
+        Returns every stored frame of a kind concatenated, in key order (empty frame if none).
+        '''
+        frames = [frame for frame in (self.get(kind, key) for key in self.keys(kind)) if frame is not None]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def remove(self, kind: str, key: Optional[str] = None) -> None:
+        '''
+        Deletes one stored frame, or every frame of a kind when key is None.
+        '''
+        for k in ([key] if key is not None else self.keys(kind)):
+            try:
+                os.remove(self.path(kind, k))
+            except FileNotFoundError:
+                pass
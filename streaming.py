@@ -0,0 +1,289 @@
+# O(1)-per-bar streaming counterparts of the algebra rolling functions #
+# state is kept per ticker, so one accumulator can follow a whole universe bar by bar #
+
+import numpy as np
+
+from typing import Union
+
+import kernels
+
+Bar = Union[float, np.ndarray]
+
+class _RollingWindow:
+    '''
+    Ring buffer of the last *window* values (scalars, or one row of values per ticker).
+
+    Empty slots hold NaN, so like pandas rolling(window) a statistic is NaN until the window is full
+    and while it holds a NaN. Infinite values (ie: the return after a zero price) are stored as NaN. Running state is rebuilt exactly from the buffer each time it wraps,
+    which bounds floating-point drift at O(1) amortized cost.
+    '''
+    def __init__(self, window: int, returns: bool = False) -> None:
+        if window<1:
+            raise ValueError("Rolling window must be at least 1.")
+        self.window = window
+        self.returns = returns
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer = None
+        self._pos = 0
+        self._last = None
+        self._scalar = True
+
+    def _start(self, x: np.ndarray) -> None:
+        self._scalar = np.ndim(x)==0
+        self._buffer = np.full((self.window,) + np.shape(x), np.nan)
+        self._pos = 0
+        self._resync()
+
+    def _to_return(self, x: np.ndarray) -> np.ndarray:
+        last, self._last = self._last, x
+        if last is None:
+            return np.full(np.shape(x), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return x / last - 1
+
+    def _to_returns(self, xs: np.ndarray) -> np.ndarray:
+        out = np.empty(xs.shape, dtype=np.float64)
+        out[0] = self._to_return(xs[0])
+        if len(xs)>1:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                np.divide(xs[1:], xs[:-1], out=out[1:])
+            out[1:] -= 1
+        self._last = xs[-1]
+        return out
+
+    def history(self) -> np.ndarray:
+        '''
+        Returns the window contents, oldest first (NaN for slots not yet filled).
+        '''
+        if self._buffer is None:
+            return np.empty((0,))
+        return np.roll(self._buffer, -self._pos, axis=0)
+
+    def update(self, x: Bar) -> Bar:
+        '''
+        Adds one bar (a scalar, or one value per ticker) and returns the updated statistic.
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        if self.returns:
+            x = self._to_return(x)
+        x = np.where(np.isfinite(x), x, np.nan)
+        if self._buffer is None:
+            self._start(x)
+        old = self._buffer[self._pos].copy()
+        self._buffer[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        self._step(x, old)
+        if self._pos==0:
+            self._resync()
+        value = self._value()
+        return float(value) if self._scalar else value
+
+    def update_batch(self, xs: np.ndarray) -> np.ndarray:
+        '''
+        Adds a batch of bars (rows) and returns the statistic after each of them, in one vectorized pass.
+        '''
+        xs = np.asarray(xs, dtype=np.float64)
+        if len(xs)==0:
+            return np.empty(xs.shape)
+        if self.returns:
+            xs = self._to_returns(xs)
+        xs = np.where(np.isfinite(xs), xs, np.nan)
+        if self._buffer is None:
+            self._start(xs[0])
+        values = np.concatenate([self.history(), xs])
+        out = self._batch(values)[self.window:]
+        self._buffer = values[-self.window:].copy()
+        self._pos = 0
+        self._resync()
+        return out
+
+    def _step(self, x: np.ndarray, old: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def _resync(self) -> None:
+        raise NotImplementedError
+
+    def _value(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def _batch(self, values: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+class RollingMean(_RollingWindow):
+    '''
+    Streaming algebra.rolling_avg: trailing mean of the last *window* values.
+
+    **Examples**
+
+    >>> ma = RollingMean(window=3)
+    >>> [ma.update(x) for x in [1, 2, 3, 4]]
+    [nan, nan, 2.0, 3.0]
+    >>> sector_ma = RollingMean(window=30)
+    >>> sector_ma.update(prices.iloc[-1].to_numpy()) #one minute bar for every ticker
+    '''
+    def __init__(self, window: int = 7) -> None:
+        super().__init__(window)
+
+    def _resync(self) -> None:
+        finite = ~np.isnan(self._buffer)
+        self._sum = np.where(finite, self._buffer, 0.0).sum(axis=0)
+        self._nans = self.window - finite.sum(axis=0)
+
+    def _step(self, x: np.ndarray, old: np.ndarray) -> None:
+        new_nan, old_nan = np.isnan(x), np.isnan(old)
+        self._sum = self._sum + np.where(new_nan, 0.0, x) - np.where(old_nan, 0.0, old)
+        self._nans = self._nans + new_nan.astype(np.int64) - old_nan.astype(np.int64)
+
+    def _value(self) -> np.ndarray:
+        return np.where(self._nans > 0, np.nan, self._sum / self.window)
+
+    def _batch(self, values: np.ndarray) -> np.ndarray:
+        return kernels.rolling_mean(values, self.window)
+
+class RollingVariance(_RollingWindow):
+    '''
+    Streaming algebra.rolling_var: windowed Welford variance.
+
+    Each bar removes the value leaving the window and adds the new one to a running (count, mean, M2),
+    so an update is O(1) per ticker and numerically stable.
+
+    :param window: number of values in the window
+    :param ddof: delta degrees of freedom, 1 for sample variance as in pandas
+    :param returns: feed prices and take the variance of their simple returns (as algebra.rolling_var does)
+
+    **Examples**
+
+    >>> var = RollingVariance(window=21)
+    >>> for price in close_prices:
+    ...     current = var.update(price)
+    >>> np.isclose(current, algebra.rolling_var(close_prices, window=21).iloc[-1])
+    True
+    '''
+    def __init__(self, window: int = 21, ddof: int = 1, returns: bool = True) -> None:
+        self.ddof = ddof
+        super().__init__(window, returns=returns)
+
+    def _resync(self) -> None:
+        finite = ~np.isnan(self._buffer)
+        self._count = finite.sum(axis=0)
+        total = np.where(finite, self._buffer, 0.0).sum(axis=0)
+        self._mean = np.divide(total, self._count, out=np.zeros(np.shape(total)), where=self._count > 0)
+        centered = np.where(finite, self._buffer - self._mean, 0.0)
+        self._m2 = (centered * centered).sum(axis=0)
+        self._nans = self.window - self._count
+
+    def _step(self, x: np.ndarray, old: np.ndarray) -> None:
+        removing, adding = ~np.isnan(old), ~np.isnan(x)
+        old, x = np.where(removing, old, 0.0), np.where(adding, x, 0.0)
+        count = self._count - removing
+        delta = np.where(removing, old - self._mean, 0.0)
+        mean = np.where(removing, self._mean - delta / np.maximum(count, 1), self._mean)
+        mean = np.where(count > 0, mean, 0.0)
+        m2 = np.where(count > 0, self._m2 - delta * (old - mean), 0.0)
+        count = count + adding
+        delta = np.where(adding, x - mean, 0.0)
+        mean = mean + delta / np.maximum(count, 1)
+        m2 = m2 + delta * (x - mean)
+        self._count, self._mean, self._m2 = count, mean, np.maximum(m2, 0.0)
+        self._nans = self.window - count
+
+    def _value(self) -> np.ndarray:
+        if self.window - self.ddof <= 0:
+            return np.full(np.shape(self._m2), np.nan)
+        return np.where(self._nans > 0, np.nan, self._m2 / (self.window - self.ddof))
+
+    def _batch(self, values: np.ndarray) -> np.ndarray:
+        return kernels.rolling_var(values, self.window, ddof=self.ddof)
+
+class RollingVolatility(RollingVariance):
+    '''
+    Streaming algebra.rolling_volatility: annualized rolling std of simple returns, fed with prices.
+
+    **Examples**
+
+    >>> vol = RollingVolatility(window=21)
+    >>> vol.update_batch(history.to_numpy()) #warm up on stored bars
+    >>> vol.update(latest_prices) #then O(1) per new bar
+    '''
+    def __init__(self, window: int = 21, periods: int = 252) -> None:
+        self.periods = periods
+        super().__init__(window, ddof=1, returns=True)
+
+    def _value(self) -> np.ndarray:
+        return np.sqrt(super()._value()) * np.sqrt(self.periods)
+
+    def _batch(self, values: np.ndarray) -> np.ndarray:
+        return np.sqrt(super()._batch(values)) * np.sqrt(self.periods)
+
+class RollingHedgeRatio(_RollingWindow):
+    '''
+    Streaming hedge.rolling_hedge: trailing-window slope r of leader = a + r * follower, per pair.
+
+    Each bar is a (leader, follower) pair of prices, or of price arrays for many pairs. Running sums of
+    both legs, their squares and cross product are shifted by the window mean at every resync, so an
+    update is O(1) per pair without the cancellation of raw sums.
+
+    **Examples**
+
+    >>> hedge = RollingHedgeRatio(window=60, method='tls')
+    >>> hedge.update_batch(np.stack([xom_scaled, cvx_scaled], axis=1)) #warm up, rows of (leader, follower)
+    >>> r = hedge.update((xom_now, cvx_now))
+    >>> spread = xom_now - hedge.intercept - r * cvx_now
+    '''
+    def __init__(self, window: int = 60, method: str = "ols") -> None:
+        if window<2:
+            raise ValueError("Regression window must be at least 2.")
+        if method not in ("ols", "tls"):
+            raise ValueError(f"Unknown regression method {method!r}, expected 'ols' or 'tls'.")
+        self.method = method
+        super().__init__(window)
+
+    def _start(self, x: np.ndarray) -> None:
+        super()._start(x)
+        self._scalar = np.ndim(x)==1
+
+    def _legs(self, values: np.ndarray):
+        '''Shifted (follower, leader) legs, zeroed where either is NaN, and that NaN mask.'''
+        leader = values[:, 0] if values.ndim == self._buffer.ndim else values[0]
+        follower = values[:, 1] if values.ndim == self._buffer.ndim else values[1]
+        bad = np.isnan(leader) | np.isnan(follower)
+        return np.where(bad, 0.0, follower - self._shift[1]), np.where(bad, 0.0, leader - self._shift[0]), bad
+
+    def _resync(self) -> None:
+        self._shift = np.nan_to_num(kernels._center(np.where(np.isnan(self._buffer).any(axis=1, keepdims=True), np.nan, self._buffer)))
+        x, y, bad = self._legs(self._buffer)
+        self._sums = np.stack([x.sum(axis=0), y.sum(axis=0), (x*x).sum(axis=0), (y*y).sum(axis=0), (x*y).sum(axis=0)])
+        self._nans = bad.sum(axis=0)
+
+    def _step(self, x: np.ndarray, old: np.ndarray) -> None:
+        new_x, new_y, new_bad = self._legs(x)
+        old_x, old_y, old_bad = self._legs(old)
+        self._sums = self._sums \
+            + np.stack([new_x, new_y, new_x*new_x, new_y*new_y, new_x*new_y]) \
+            - np.stack([old_x, old_y, old_x*old_x, old_y*old_y, old_x*old_y])
+        self._nans = self._nans + new_bad.astype(np.int64) - old_bad.astype(np.int64)
+
+    def _fit(self):
+        sx, sy, sxx, syy, sxy = self._sums
+        n = self.window
+        sxx, syy, sxy = sxx - sx*sx/n, syy - sy*sy/n, sxy - sx*sy/n
+        slope = kernels.regression_slope(sxx, syy, sxy, self.method)
+        intercept = (sy/n + self._shift[0]) - slope * (sx/n + self._shift[1])
+        full = self._nans == 0
+        return np.where(full, slope, np.nan), np.where(full, intercept, np.nan)
+
+    def _value(self) -> np.ndarray:
+        return self._fit()[0]
+
+    @property
+    def intercept(self) -> Bar:
+        '''Intercept a of the current window (NaN until the window is full).'''
+        if self._buffer is None:
+            return np.nan
+        value = self._fit()[1]
+        return float(value) if self._scalar else value
+
+    def _batch(self, values: np.ndarray) -> np.ndarray:
+        return kernels.rolling_regression(values[:, 1], values[:, 0], self.window, self.method)[0]
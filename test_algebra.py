@@ -0,0 +1,61 @@
+# Vectorized algebra helpers against the element-by-element definitions they replaced #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import algebra
+
+def _series(rows: int = 50, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    values = np.round(100 + np.cumsum(rng.standard_normal(rows)), 1)
+    values[[10, 11]] = values[9]
+    return pd.Series(values, index=pd.date_range("2025-01-01", periods=rows))
+
+def test_add_matches_elementwise_addition():
+    primary, secondary = _series(), _series(seed=1).iloc[:30]
+    expected = primary.copy()
+    for i, value in enumerate(secondary.to_numpy()):
+        expected.iloc[i] += value
+    result = algebra.add(primary, secondary)
+    pd.testing.assert_series_equal(result, expected)
+    assert result is primary
+    # like the loop, a longer secondary fills the primary and then raises
+    primary = np.zeros(50)
+    with pytest.raises(IndexError):
+        algebra.add(primary, np.arange(80.0))
+    np.testing.assert_array_equal(primary, np.arange(50.0))
+
+def test_signs_and_differences_match_loops():
+    series = _series()
+    values = series.to_numpy()
+    signs = [1 if values[i] - values[i - 1] > 0 else -1 for i in range(1, len(values))]
+    diffs = [values[i] - values[i - 1] for i in range(1, len(values))]
+    assert algebra.value_signs_diff(series) == signs
+    np.testing.assert_allclose(algebra.value_diff(series), diffs)
+    pd.testing.assert_series_equal(algebra.value_signs_series(series), pd.Series([0] + signs, index=series.index), check_dtype=False)
+    pd.testing.assert_series_equal(algebra.value_diff_series(series), series.diff().fillna(0).astype(np.float64))
+    np.testing.assert_array_equal(algebra.value_signs_series(values), [0] + signs)
+
+def test_normalize_and_scale_match_pandas():
+    frame = pd.DataFrame({"a": _series().to_numpy(), "b": _series(seed=2).to_numpy()})
+    pd.testing.assert_frame_equal(algebra.normalize(frame), frame.apply(lambda x: (x - x.min()) / (x.max() - x.min())))
+    series = frame["a"]
+    pd.testing.assert_series_equal(algebra.normalize(series), (series - series.min()) / (series.max() - series.min()))
+    pd.testing.assert_series_equal(algebra.scale(series), series / series.iloc[0] * 100)
+    pd.testing.assert_frame_equal(algebra.scale(frame, initial=1), frame / frame.iloc[0])
+
+def test_sign_and_difference_helpers_run_per_column_on_wide_input():
+    frame = pd.DataFrame({"a": _series().to_numpy(), "b": _series(seed=1).to_numpy(), "c": _series(seed=2).to_numpy()})
+    frame.iloc[5, 1] = np.nan
+    values = frame.to_numpy()
+    columns = [values[:, j] for j in range(values.shape[1])]
+    signs = np.column_stack([algebra.value_signs_series(column) for column in columns])
+    np.testing.assert_array_equal(algebra.value_signs_series(values), signs)
+    pd.testing.assert_frame_equal(algebra.value_signs_series(frame), pd.DataFrame(signs, index=frame.index, columns=frame.columns))
+    np.testing.assert_array_equal(algebra.value_signs_diff(frame), np.column_stack([algebra.value_signs_diff(column) for column in columns]))
+    np.testing.assert_allclose(algebra.value_diff(values), np.column_stack([algebra.value_diff(column) for column in columns]))
+    np.testing.assert_allclose(algebra.avg(values), [pd.Series(column).mean() for column in columns])
+    pd.testing.assert_series_equal(algebra.avg(frame), frame.mean())
+    assert algebra.avg(columns[1]) == pd.Series(columns[1]).mean()
+    assert np.isnan(algebra.avg(np.full((3, 2), np.nan))).all()
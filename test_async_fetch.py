@@ -0,0 +1,73 @@
+# Async fetch pipeline against a fixture provider with injected latency, throttling and failures #
+
+import time
+import asyncio
+import numpy as np
+import pandas as pd
+
+from async_fetch import AsyncFetcher, TokenBucket
+from providers import FakeProvider, ProviderError, RateLimitError
+from universe import PriceUniverse
+
+SYMBOLS = [f"T{i:02d}" for i in range(20)]
+
+def _frames(symbols=SYMBOLS, rows: int = 10) -> dict:
+    index = pd.date_range("2025-08-18 09:30", periods=rows, freq="min", tz="America/New_York")
+    return {symbol: pd.DataFrame({"Open": i + 1.0, "High": i + 1.0, "Low": i + 1.0, "Close": i + np.arange(1.0, rows + 1),
+                                  "Volume": 100.0}, index=index)
+            for i, symbol in enumerate(symbols)}
+
+def test_requests_in_flight_are_bounded():
+    provider = FakeProvider(_frames(), latency=0.02)
+    frames, errors = AsyncFetcher(provider, max_in_flight=4, rate=None).run(SYMBOLS, period="1d", interval="1m")
+    assert not errors and list(frames) == SYMBOLS
+    assert provider.max_in_flight == 4
+    pd.testing.assert_frame_equal(frames["T03"], _frames()["T03"])
+
+def test_throttled_requests_are_retried_and_failures_surface():
+    provider = FakeProvider(_frames(), throttle_rate=0.3, error_rate=0.1, seed=3)
+    fetcher = AsyncFetcher(provider, rate=None, max_retries=50, base_delay=0.001, seed=0)
+    frames, errors = fetcher.run(SYMBOLS, period="1d", interval="1m")
+    assert len(frames) + len(errors) == len(SYMBOLS) and errors
+    assert all(isinstance(error, ProviderError) and not isinstance(error, RateLimitError) for error in errors.values())
+    assert fetcher.retries > 0 and provider.calls == len(SYMBOLS) + fetcher.retries
+
+def test_backoff_is_capped_and_honours_retry_after():
+    fetcher = AsyncFetcher(FakeProvider({}), base_delay=0.5, max_delay=2.0, seed=0)
+    delays = [fetcher.backoff(attempt, RateLimitError()) for attempt in range(10) for _ in range(20)]
+    assert max(delays) <= 2.0 and min(delays) >= 0.0
+    assert fetcher.backoff(0, RateLimitError(retry_after=3.0)) >= 3.0
+
+def test_timeout_cancels_outstanding_requests():
+    provider = FakeProvider(_frames(), latency=5.0)
+    start = time.monotonic()
+    frames, errors = AsyncFetcher(provider, rate=None).run(SYMBOLS[:4], period="1d", interval="1m", timeout=0.05)
+    assert time.monotonic() - start < 1.0
+    assert not frames and all(isinstance(error, TimeoutError) for error in errors.values())
+    assert provider.in_flight == 0
+
+def test_token_bucket_paces_requests():
+    async def acquire_all(bucket: TokenBucket, n: int) -> float:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(n):
+            await bucket.acquire()
+        return loop.time() - start
+    assert asyncio.run(acquire_all(TokenBucket(rate=100, capacity=1), 11)) >= 0.09
+    assert asyncio.run(acquire_all(TokenBucket(rate=1, capacity=5), 5)) < 0.5
+
+def test_universe_aload_matches_load():
+    provider = FakeProvider(_frames(), latency=0.001)
+    universe = PriceUniverse(SYMBOLS[:5] + ["MISSING"], provider=provider, cache=False)
+    expected = universe.load(period="1d", interval="1m")
+    loaded = asyncio.run(universe.aload(period="1d", interval="1m", fetcher=AsyncFetcher(provider, rate=None)))
+    pd.testing.assert_frame_equal(loaded, expected)
+    assert list(universe.failures) == ["MISSING"]
+
+def test_fetcher_and_bucket_are_reusable_across_event_loops():
+    provider = FakeProvider(_frames(), latency=0.01)
+    fetcher = AsyncFetcher(provider, max_in_flight=2, rate=1000, burst=4)
+    for _ in range(2):
+        frames, errors = asyncio.run(fetcher.fetch_many(SYMBOLS[:6], period="1d", interval="1m"))
+        assert not errors and list(frames) == SYMBOLS[:6]
+    assert provider.max_in_flight == 2
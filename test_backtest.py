@@ -0,0 +1,102 @@
+# Vectorized backtests against a bar-by-bar loop, and sweeps inline, pooled and resumed #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest
+from backtest import positions, simulate, summarize, sweep, parameter_grid, METRICS, RESULT_KIND
+from store import ResultStore
+
+@pytest.fixture
+def prices(make_prices) -> pd.DataFrame:
+    # legs share a random walk, so spreads stay small enough to trade
+    return make_prices(rows=500, tickers=4, vol=0.004, common=0.01, missing=0.01)
+
+def _direct_positions(spread: np.ndarray, entry: float, exit: float, stop=None) -> np.ndarray:
+    out, position, blocked = [], 0, False
+    for s in spread:
+        if not np.isnan(s):
+            if stop is not None and abs(s) > stop:
+                position, blocked = 0, True
+            elif abs(s) <= exit:
+                position, blocked = 0, False
+            elif not blocked and s > entry:
+                position = -1
+            elif not blocked and s < -entry:
+                position = 1
+        out.append(position)
+    return np.array(out)
+
+@pytest.mark.parametrize("exit, stop", [(0.0, None), (0.5, None), (0.5, 3.0)])
+def test_positions_match_a_direct_state_machine(exit, stop):
+    rng = np.random.default_rng(1)
+    spread = np.cumsum(rng.standard_normal((400, 3)), axis=0) * 0.5
+    spread[rng.random(spread.shape) < 0.05] = np.nan
+    result = positions(spread, entry=2.0, exit=exit, stop=stop)
+    for column in range(spread.shape[1]):
+        np.testing.assert_array_equal(result[:, column], _direct_positions(spread[:, column], 2.0, exit, stop))
+    np.testing.assert_array_equal(result[:, 1], positions(spread[:, 1], entry=2.0, exit=exit, stop=stop))
+
+def test_simulate_and_summarize_match_a_direct_loop(prices):
+    prices = prices.ffill().bfill()
+    leader, follower = prices["XOM"].to_numpy(), prices["CVX"].to_numpy()
+    cost = 0.001
+    result = simulate(leader, follower, entry=1.0, exit=0.2, cost=cost)
+    spread = 100 * leader / leader[0] - 100 * follower / follower[0]
+    np.testing.assert_allclose(result["spread"], spread)
+    position = _direct_positions(spread, 1.0, 0.2)
+    np.testing.assert_array_equal(result["position"], position)
+
+    pnl, trades, held = np.zeros(len(spread)), [], 0
+    for t in range(len(spread)):
+        gross = held * (leader[t] / leader[t - 1] - follower[t] / follower[t - 1]) if t else 0.0
+        changed = position[t] != held
+        exit_cost, entry_cost = (2 * cost * abs(held), 2 * cost * abs(position[t])) if changed else (0.0, 0.0)
+        pnl[t] = gross - exit_cost - entry_cost
+        if held:
+            trades[-1][0] += gross - exit_cost
+            trades[-1][1] += 1
+        if changed and position[t]:
+            trades.append([-entry_cost, 0])
+        held = position[t]
+    np.testing.assert_allclose(result["pnl"], pnl, atol=1e-15)
+    np.testing.assert_allclose(result["equity"], np.cumsum(pnl), atol=1e-12)
+
+    metrics = dict(zip(METRICS, summarize(result, periods=252)[0]))
+    equity = np.cumsum(pnl)
+    assert metrics["trades"] == len(trades)
+    assert metrics["total_return"] == pytest.approx(equity[-1])
+    assert metrics["sharpe"] == pytest.approx(pnl.mean() / pnl.std(ddof=1) * np.sqrt(252))
+    assert metrics["max_drawdown"] == pytest.approx((np.maximum.accumulate(np.maximum(equity, 0)) - equity).max())
+    assert metrics["win_rate"] == pytest.approx(np.mean([trade > 0 for trade, _ in trades]))
+    assert metrics["avg_hold"] == pytest.approx(np.mean([hold for _, hold in trades]))
+    assert metrics["exposure"] == pytest.approx(np.mean(np.concatenate([[0], position[:-1]]) != 0))
+
+def test_parameter_grid_fills_defaults_and_rejects_unknown_names():
+    combos = parameter_grid({"entry": [1, 2], "exit": [0, 0.5]})
+    assert len(combos) == 4 and combos[1] == {"entry": 1, "exit": 0.5, "stop": None, "cost": 0.0, "hedge_window": None}
+    with pytest.raises(ValueError):
+        parameter_grid({"threshold": [1]})
+
+GRID = {"entry": [0.5, 1.0], "exit": [0.0, 0.75], "hedge_window": [None, 30]}
+
+def test_sweep_pool_matches_inline_and_resumes(tmp_path, monkeypatch, prices):
+    inline = sweep(prices, GRID, processes=1)
+    assert len(inline) == 6 * 8
+    invalid = inline[inline["exit"] >= inline["entry"]]
+    assert len(invalid) and invalid[list(METRICS)].isna().all().all()
+    row = inline.query("leader == 'CVX' and follower == 'EOG' and entry == 1.0 and exit == 0.0 and hedge_window == 30")
+    filled = prices.ffill()
+    expected = summarize(simulate(filled["CVX"].to_numpy(), filled["EOG"].to_numpy(), entry=1.0, exit=0.0, hedge_window=30))
+    np.testing.assert_allclose(row[list(METRICS)].to_numpy(), expected)
+
+    store = ResultStore(str(tmp_path))
+    pooled = sweep(prices, GRID, store=store, processes=2, chunk=2)
+    pd.testing.assert_frame_equal(pooled, inline)
+    assert len(store.keys(RESULT_KIND)) == 6
+
+    def rerun(*args, **kwargs):
+        raise AssertionError("stored pairs must not be backtested again")
+    monkeypatch.setattr(backtest, "_sweep", rerun)
+    pd.testing.assert_frame_equal(sweep(prices, GRID, store=store, processes=1), inline)
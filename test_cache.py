@@ -0,0 +1,127 @@
+# BarCache round trips, freshness, LRU eviction and the shared default instance #
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import cache
+from cache import BarCache
+
+def _frame(rows: int = 50, start: str = "2025-08-18 09:30") -> pd.DataFrame:
+    index = pd.date_range(start, periods=rows, freq="min", tz="America/New_York")
+    close = 100 + np.arange(rows, dtype=np.float64)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.full(rows, 1000.0)}, index=index)
+
+def _index_file(root) -> dict:
+    with open(os.path.join(root, BarCache.INDEX_FILE)) as f:
+        return json.load(f)
+
+def test_round_trip_and_metadata(tmp_path):
+    bars = BarCache(root=str(tmp_path))
+    frame = _frame()
+    bars.put("XOM", "1d", "1m", frame)
+    pd.testing.assert_frame_equal(bars.get("XOM", "1d", "1m"), frame, check_freq=False)
+    assert bars.get("XOM", "5d", "1m") is None
+    meta = bars.entry("XOM", "1d", "1m")
+    assert meta["last_bar"] == frame.index[-1].isoformat()
+    assert BarCache(root=str(tmp_path)).get("XOM", "1d", "1m") is not None
+
+def test_stale_entries_need_allow_stale(tmp_path):
+    bars = BarCache(root=str(tmp_path), ttl={"1m": 60})
+    bars.put("XOM", "1d", "1m", _frame(), fetched_at=time.time() - 120)
+    assert bars.get("XOM", "1d", "1m") is None
+    assert bars.get("XOM", "1d", "1m", allow_stale=True) is not None
+
+def test_reads_do_not_rewrite_the_index(tmp_path, monkeypatch):
+    bars = BarCache(root=str(tmp_path))
+    bars.put("XOM", "1d", "1m", _frame())
+    writes = []
+    original = bars._write_index
+    monkeypatch.setattr(bars, "_write_index", lambda: (writes.append(1), original()))
+    for _ in range(20):
+        assert bars.get("XOM", "1d", "1m") is not None
+    assert writes == []
+    accessed = bars.entry("XOM", "1d", "1m")["accessed_at"]
+    assert _index_file(tmp_path)["XOM|1d|1m"]["accessed_at"] < accessed
+    bars.flush()
+    assert writes == [1]
+    assert _index_file(tmp_path)["XOM|1d|1m"]["accessed_at"] == accessed
+
+def test_reads_flush_access_times_on_a_throttle(tmp_path):
+    bars = BarCache(root=str(tmp_path), access_flush=0)
+    bars.put("XOM", "1d", "1m", _frame())
+    bars.get("XOM", "1d", "1m")
+    assert _index_file(tmp_path)["XOM|1d|1m"]["accessed_at"] == bars.entry("XOM", "1d", "1m")["accessed_at"]
+
+def test_lru_eviction_uses_in_memory_access_times(tmp_path):
+    bars = BarCache(root=str(tmp_path))
+    for symbol in ("XOM", "CVX", "COP"):
+        bars.put(symbol, "1d", "1m", _frame())
+        time.sleep(0.01)
+    size = bars.entry("XOM", "1d", "1m")["bytes"]
+    bars.get("XOM", "1d", "1m")
+    bars.max_bytes = 3 * size
+    bars.put("EOG", "1d", "1m", _frame())
+    assert bars.entry("CVX", "1d", "1m") is None
+    assert all(bars.entry(symbol, "1d", "1m") is not None for symbol in ("XOM", "COP", "EOG"))
+    assert not os.path.exists(os.path.join(tmp_path, bars._file_name("CVX|1d|1m")))
+
+def test_default_cache_is_created_once_across_threads(tmp_path, monkeypatch):
+    created = []
+
+    class SlowCache(BarCache):
+        def __init__(self) -> None:
+            created.append(self)
+            time.sleep(0.05)
+            super().__init__(root=str(tmp_path))
+
+    monkeypatch.setattr(cache, "BarCache", SlowCache)
+    monkeypatch.setattr(cache, "_default_cache", None)
+    start = threading.Barrier(8)
+    results = []
+
+    def load() -> None:
+        start.wait()
+        results.append(cache.default_cache())
+
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(result is created[0] for result in results)
+
+def test_parquet_io_runs_outside_the_lock(tmp_path, monkeypatch):
+    bars = BarCache(root=str(tmp_path))
+    bars.put("XOM", "1d", "1m", _frame())
+    seen = []
+    read_parquet = pd.read_parquet
+
+    def read(path):
+        # a lookup from another thread must not wait for this read
+        probe = threading.Thread(target=lambda: seen.append(bars.entry("CVX", "1d", "1m")))
+        probe.start()
+        probe.join(timeout=2)
+        seen.append(probe.is_alive())
+        return read_parquet(path)
+
+    monkeypatch.setattr(cache.pd, "read_parquet", read)
+    assert bars.get("XOM", "1d", "1m") is not None
+    assert seen == [None, False]
+
+def test_caches_sharing_a_root_keep_each_others_entries(tmp_path):
+    first, second = BarCache(root=str(tmp_path)), BarCache(root=str(tmp_path))
+    first.put("XOM", "1d", "1m", _frame())
+    second.put("CVX", "1d", "1m", _frame())
+    first.put("COP", "1d", "1m", _frame())
+    assert set(_index_file(tmp_path)) == {"XOM|1d|1m", "CVX|1d|1m", "COP|1d|1m"}
+    second.invalidate("XOM")
+    first.put("EOG", "1d", "1m", _frame())
+    assert set(_index_file(tmp_path)) == {"CVX|1d|1m", "COP|1d|1m", "EOG|1d|1m"}
+    assert first.get("CVX", "1d", "1m") is not None
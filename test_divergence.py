@@ -0,0 +1,71 @@
+# Vectorized divergence episodes against a direct loop, and the streaming tracker against the batch #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from divergence import episodes, pair_spreads, detect, EpisodeTracker, EPISODE_COLUMNS
+
+def _spreads(rows: int = 500, pairs: int = 3, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    spreads = np.cumsum(rng.standard_normal((rows, pairs)), axis=0) * 0.3
+    spreads[rng.random(spreads.shape) < 0.03] = np.nan
+    spreads[-5:, 0] = 10.0
+    return spreads
+
+def _direct(spread: np.ndarray, threshold: float) -> list:
+    found, current = [], None
+    for t, s in enumerate(spread):
+        if not abs(s) > threshold:
+            if current is not None:
+                found.append(current)
+            current = None
+            continue
+        if current is None:
+            current = {"start": t, "peak": -np.inf, "duration": 0, "area": 0.0}
+        current["end"] = t
+        if abs(s) > current["peak"]:
+            current.update(peak=abs(s), peak_time=t, side=int(np.sign(s)))
+        current["duration"] += 1
+        current["area"] += abs(s) - threshold
+    if current is not None:
+        found.append(dict(current, open=True))
+    return [dict({"open": False}, **episode) for episode in found]
+
+def test_episodes_match_a_direct_loop():
+    spreads = _spreads()
+    table = episodes(spreads, threshold=1.0)
+    assert list(table.columns) == list(EPISODE_COLUMNS)
+    for pair in range(spreads.shape[1]):
+        expected = pd.DataFrame(_direct(spreads[:, pair], 1.0))
+        found = table[table["pair"] == pair].reset_index(drop=True)
+        assert len(found) == len(expected) > 0
+        for column in EPISODE_COLUMNS[1:]:
+            np.testing.assert_allclose(found[column].astype(float), expected[column].astype(float), err_msg=column)
+    assert table.query("pair == 0")["open"].iloc[-1]
+
+def test_labels_and_detect():
+    rng = np.random.default_rng(2)
+    index = pd.date_range("2025-08-18 09:30", periods=200, freq="min")
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.standard_normal((200, 3)) * 0.01, axis=0)), index=index,
+                          columns=["XOM", "CVX", "COP"])
+    spreads = pair_spreads(prices)
+    scaled = prices / prices.iloc[0] * 100
+    np.testing.assert_allclose(spreads[("XOM", "COP")], scaled["XOM"] - scaled["COP"])
+    table = detect(prices, threshold=1.0)
+    by_pair = episodes(spreads[("XOM", "COP")], threshold=1.0)
+    found = table.query("leader == 'XOM' and follower == 'COP'").reset_index(drop=True)
+    pd.testing.assert_series_equal(found["start"], by_pair["start"])
+    assert found["start"].isin(index).all() and (by_pair["pair"] == ("XOM", "COP")).all()
+    with pytest.raises(ValueError):
+        episodes(spreads, threshold=0)
+
+def test_tracker_matches_batch_episodes():
+    spreads = _spreads()
+    tracker = EpisodeTracker(threshold=1.0)
+    closed = [tracker.update(row) for row in spreads]
+    streamed = pd.concat([frame for frame in closed if len(frame)] + [tracker.open_episodes()], ignore_index=True)
+    streamed = streamed.sort_values(["pair", "start"], kind="stable").reset_index(drop=True)
+    expected = episodes(spreads, threshold=1.0)
+    for column in EPISODE_COLUMNS:
+        np.testing.assert_allclose(streamed[column].astype(float), expected[column].astype(float), err_msg=column)
@@ -0,0 +1,97 @@
+# Rolling OLS/TLS hedge ratios against pandas and per-window SVD, batched and streamed #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import algebra
+from hedge import rolling_hedge, pair_hedges
+from streaming import RollingHedgeRatio
+
+def _legs(rows: int = 300, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    follower = 100 + np.cumsum(rng.standard_normal(rows))
+    leader = 5 + 0.8 * follower + rng.standard_normal(rows)
+    follower[[40, 41, 200]] = np.nan
+    leader[120] = np.inf
+    return pd.Series(leader), pd.Series(follower)
+
+def _direct_tls(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    for t in range(window - 1, len(x)):
+        xs, ys = x[t - window + 1:t + 1], y[t - window + 1:t + 1]
+        if np.isfinite(xs).all() and np.isfinite(ys).all():
+            centered = np.column_stack([xs - xs.mean(), ys - ys.mean()])
+            direction = np.linalg.svd(centered, full_matrices=False)[2][0]
+            out[t] = direction[1] / direction[0]
+    return out
+
+def test_ols_matches_pandas_rolling_moments():
+    leader, follower = _legs()
+    result = rolling_hedge(leader, follower, window=30)
+    clean = pd.DataFrame({"y": leader, "x": follower}).replace([np.inf, -np.inf], np.nan)
+    rolling = clean.rolling(30)
+    slope = rolling.cov()["y"].xs("x", level=1) / rolling.var()["x"]
+    intercept = rolling.mean()["y"] - slope * rolling.mean()["x"]
+    np.testing.assert_allclose(result["ratio"], slope, rtol=1e-8, equal_nan=True)
+    np.testing.assert_allclose(result["intercept"], intercept, rtol=1e-8, equal_nan=True)
+    np.testing.assert_allclose(result["spread"], leader - intercept - slope * follower, rtol=1e-8, atol=1e-9, equal_nan=True)
+    assert np.isnan(result["ratio"][120:150]).all() and np.isfinite(result["ratio"][150])
+
+def test_tls_matches_svd_and_is_symmetric():
+    leader, follower = _legs()
+    ratio = rolling_hedge(leader, follower, window=30, method="tls")["ratio"].to_numpy()
+    np.testing.assert_allclose(ratio, _direct_tls(follower.to_numpy(), leader.to_numpy(), 30), rtol=1e-8, equal_nan=True)
+    inverse = rolling_hedge(follower, leader, window=30, method="tls")["ratio"].to_numpy()
+    np.testing.assert_allclose(ratio * inverse, np.where(np.isnan(ratio), np.nan, 1.0), rtol=1e-8, equal_nan=True)
+
+def test_lag_applies_the_previous_estimate():
+    leader, follower = _legs()
+    current = rolling_hedge(leader, follower, window=30)
+    lagged = rolling_hedge(leader, follower, window=30, lag=1)
+    expected = leader - current["intercept"].shift(1) - current["ratio"].shift(1) * follower
+    np.testing.assert_allclose(lagged["spread"], expected, equal_nan=True)
+    pd.testing.assert_frame_equal(lagged[["ratio", "intercept"]], current[["ratio", "intercept"]])
+
+def test_pair_hedges_match_single_pairs():
+    rng = np.random.default_rng(1)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.standard_normal((200, 3)) * 0.01, axis=0)), columns=["XOM", "CVX", "COP"])
+    ratios, spreads = pair_hedges(prices, window=40, method="tls", lag=1)
+    assert list(ratios.columns) == [("XOM", "CVX"), ("XOM", "COP"), ("CVX", "COP")]
+    scaled = algebra.scale(prices, initial=100)
+    single = rolling_hedge(scaled["CVX"], scaled["COP"], window=40, method="tls", lag=1)
+    np.testing.assert_allclose(ratios[("CVX", "COP")], single["ratio"], equal_nan=True)
+    np.testing.assert_allclose(spreads[("CVX", "COP")], single["spread"], equal_nan=True)
+
+def test_pair_hedges_chunk_pairs_without_changing_results():
+    rng = np.random.default_rng(2)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.standard_normal((150, 5)) * 0.01, axis=0)), columns=list("ABCDE"))
+    prices.iloc[30, 2] = np.nan
+    whole = pair_hedges(prices, window=20, method="tls", lag=1)
+    # one pair per chunk
+    chunked = pair_hedges(prices, window=20, method="tls", lag=1, chunk_bytes=1)
+    for expected, result in zip(whole, chunked):
+        pd.testing.assert_frame_equal(result, expected)
+
+def test_tls_keeps_precision_for_nearly_flat_fits():
+    rng = np.random.default_rng(3)
+    follower = pd.Series(100 + np.cumsum(rng.standard_normal(200)))
+    leader = pd.Series(50 + 1e-7 * follower + 1e-9 * rng.standard_normal(200))
+    ratio = rolling_hedge(leader, follower, window=30, method="tls")["ratio"].to_numpy()
+    expected = _direct_tls(follower.to_numpy(), leader.to_numpy(), 30)
+    assert np.all(np.abs(expected[29:]) > 1e-8)
+    np.testing.assert_allclose(ratio, expected, rtol=1e-6, equal_nan=True)
+    hedge = RollingHedgeRatio(window=30, method="tls")
+    np.testing.assert_allclose([hedge.update(bar) for bar in zip(leader, follower)], expected, rtol=1e-6, equal_nan=True)
+
+@pytest.mark.parametrize("method", ["ols", "tls"])
+def test_streaming_hedge_ratio_matches_batch(method):
+    leader, follower = _legs()
+    expected = rolling_hedge(leader, follower, window=30, method=method)
+    hedge = RollingHedgeRatio(window=30, method=method)
+    ratios, intercepts = [], []
+    for bar in zip(leader, follower):
+        ratios.append(hedge.update(bar))
+        intercepts.append(hedge.intercept)
+    np.testing.assert_allclose(ratios, expected["ratio"], rtol=1e-8, equal_nan=True)
+    np.testing.assert_allclose(intercepts, expected["intercept"], rtol=1e-8, equal_nan=True)
@@ -0,0 +1,76 @@
+# Batch pair labelling must match a direct select_model fit, inline or pooled, and resume from its store #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("hmmlearn")
+
+import hmm_batch
+from hmm_model import select_model, session_lengths
+from providers import FrameProvider
+from store import ResultStore
+from universe import PriceUniverse
+
+@pytest.fixture
+def prices(make_prices) -> pd.DataFrame:
+    # quiet and volatile regimes of 50 bars over two sessions
+    regimes = np.repeat(np.random.default_rng(0).integers(0, 2, 13), 50)[:600]
+    prices = make_prices(rows=600, tickers=("AAA", "BBB", "CCC"), seed=1, vol=np.array([0.0005, 0.003])[regimes, None], days=2)
+    prices.iloc[10:15, 2] = np.nan
+    return prices
+
+OPTIONS = {"hidden_states": [2, 3], "covariance_types": "diag", "restarts": 2, "seed": 3}
+
+def test_pair_features_zero_gaps_and_session_opens(prices):
+    values = prices.ffill().to_numpy()
+    lengths = session_lengths(prices.index)
+    features = hmm_batch.pair_features(values, 0, 2, np.array([0, lengths[0]]))
+    expected = prices.ffill().pct_change(fill_method=None)[["AAA", "CCC"]].fillna(0.0).to_numpy() * 1e4
+    expected[lengths[0]] = 0.0
+    np.testing.assert_allclose(features, expected)
+
+def test_label_pairs_matches_a_direct_selection(tmp_path, prices):
+    store = ResultStore(str(tmp_path))
+    summary = hmm_batch.label_pairs(prices, leaders=["AAA"], store=store, processes=1, **OPTIONS)
+    assert list(summary["follower"]) == ["BBB", "CCC"] and summary["error"].isna().all()
+
+    lengths = session_lengths(prices.index)
+    features = hmm_batch.pair_features(prices.ffill().to_numpy(), 0, 2, np.array([0, lengths[0]]))
+    model, table = select_model(features, [2, 3], ["diag"], 2, seed=3, processes=1, lengths=lengths)
+    row = summary.iloc[1]
+    assert row["n_components"] == model.n_components and row["bars"] == len(prices)
+    assert row["bic"] == pytest.approx(table["bic"].iloc[0])
+    states = store.load(hmm_batch.STATES_KIND).query("follower == 'CCC'")
+    np.testing.assert_array_equal(states["state"], model.predict(features, lengths))
+    np.testing.assert_allclose(states[[f"p{s}" for s in range(model.n_components)]],
+                               model.predict_proba(features, lengths), atol=1e-6)
+    params = store.load(hmm_batch.PARAMS_KIND).query("follower == 'CCC'")
+    np.testing.assert_allclose(np.stack(params["mean"]), model.means_ / 1e4)
+
+def test_label_pairs_pool_matches_inline_and_resumes(tmp_path, monkeypatch, prices):
+    inline = hmm_batch.label_pairs(prices, processes=1, **OPTIONS)
+    store = ResultStore(str(tmp_path))
+    pooled = hmm_batch.label_pairs(prices, store=store, processes=2, chunk=1, **OPTIONS)
+    pd.testing.assert_frame_equal(inline, pooled)
+    assert len(store.keys(hmm_batch.STATES_KIND)) == len(store.keys(hmm_batch.PARAMS_KIND)) == 3
+
+    def refit(*args, **kwargs):
+        raise AssertionError("stored pairs must not be refitted")
+    monkeypatch.setattr(hmm_batch, "_label", refit)
+    resumed = hmm_batch.label_pairs(prices, store=store, processes=1, **OPTIONS)
+    pd.testing.assert_frame_equal(resumed, inline)
+
+def test_main_fails_when_any_pair_fails(tmp_path, monkeypatch, prices, make_bars):
+    frames = make_bars(prices, volume=100.0)
+    monkeypatch.setattr(hmm_batch, "PriceUniverse", lambda ticks: PriceUniverse(ticks, provider=FrameProvider(frames), cache=False))
+    ticks = tmp_path / "ticks.txt"
+    ticks.write_text("AAA\nBBB\nCCC\n")
+    argv = [str(ticks), "--states", "2", "--covariance", "diag", "--processes", "1", "--output", str(tmp_path / "results")]
+    assert hmm_batch.main(argv) == 0
+
+    label = hmm_batch._label
+    def fail_first(values, lead, follow, *args):
+        return [{"error": "ValueError()"}] + label(values, lead[1:], follow[1:], *args)
+    monkeypatch.setattr(hmm_batch, "_label", fail_first)
+    assert hmm_batch.main(argv + ["--seed", "1"]) == 1
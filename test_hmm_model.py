@@ -0,0 +1,164 @@
+# HMM fitting, caching and online filtering against hmmlearn references #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("hmmlearn")
+
+import hmm_model
+from hmm_model import HMM
+from providers import FrameProvider
+from universe import PriceUniverse
+
+TICKS = ("AAA", "BBB")
+
+@pytest.fixture
+def make_frames(make_prices, make_bars):
+    def make(rows: int = 390, seed: int = 0, days: int = 1) -> dict:
+        # regimes of 30 bars: calm, rallying with more volatility, selling off with the most
+        regimes = np.repeat(np.random.default_rng(seed).integers(0, 3, rows // 30 + 1), 30)[:rows]
+        # noise drawn from its own stream, apart from the regimes
+        prices = make_prices(rows=rows, tickers=TICKS, seed=seed + 1, drift=np.array([0.0, 0.02, -0.02])[regimes, None],
+                             vol=np.array([0.01, 0.04, 0.08])[regimes, None], days=days)
+        return make_bars(prices)
+    return make
+
+@pytest.fixture
+def make_hmm(monkeypatch):
+    def make(frames: dict, **kwargs) -> HMM:
+        monkeypatch.setattr(hmm_model, "PriceUniverse",
+                            lambda ticks: PriceUniverse(ticks, provider=FrameProvider(frames), cache=False))
+        options = {"hidden_states": 3, "random_state": 0, "cache": False, "data_period": "5d"}
+        options.update(kwargs)
+        return HMM(*TICKS, **options)
+    return make
+
+def _posterior(model, features: np.ndarray, lengths=None) -> np.ndarray:
+    return model.predict_proba(features, lengths)[-1]
+
+@pytest.mark.parametrize("covariance_type", ["full", "diag", "spherical", "tied"])
+def test_infer_states_continues_the_fitted_history(make_hmm, covariance_type, make_frames):
+    full = make_hmm(make_frames(rows=420), covariance_type=covariance_type)
+    markov = make_hmm({tick: frame.iloc[:360] for tick, frame in make_frames(rows=420).items()}, covariance_type=covariance_type)
+    markov.fit_priceables()
+    new = full.features[360:]
+    filtered = markov.infer_states(new[:20])
+    for k in (1, 5, 20):
+        np.testing.assert_allclose(filtered[k - 1], _posterior(markov.model, full.features[:360 + k]), atol=1e-10)
+    for k in range(21, len(new) + 1):
+        markov.infer_states(new[k - 1])
+    np.testing.assert_allclose(markov.state_probabilities, _posterior(markov.model, full.features), atol=1e-10)
+
+def test_reset_filter_starts_from_start_probabilities(make_hmm, make_frames):
+    markov = make_hmm(make_frames())
+    markov.fit_priceables()
+    features = markov.features
+    markov.reset_filter()
+    np.testing.assert_allclose(markov.state_probabilities, markov.model.startprob_, atol=1e-12)
+    first = markov.infer_states(features[0])
+    np.testing.assert_allclose(first, _posterior(markov.model, features[:1]), atol=1e-10)
+    rest = markov.infer_states(features[1:50])
+    for k in (2, 10, 50):
+        np.testing.assert_allclose(rest[k - 2], _posterior(markov.model, features[:k]), atol=1e-10)
+
+def test_infer_states_accepts_labelled_rows(make_hmm, make_frames):
+    markov = make_hmm(make_frames())
+    markov.fit_priceables()
+    row = markov.features[-1]
+    markov.reset_filter()
+    by_feature = markov.infer_states(pd.Series(row, index=[f"Return {tick}" for tick in TICKS]))
+    markov.reset_filter()
+    by_ticker = markov.infer_states(pd.DataFrame([row[::-1]], columns=TICKS[::-1]))[0]
+    np.testing.assert_allclose(by_feature, by_ticker)
+    assert markov.state == int(np.argmax(by_ticker))
+
+def test_model_cache_reuses_and_warm_starts_fits(make_hmm, tmp_path, make_frames):
+    cache = hmm_model.ModelCache(str(tmp_path))
+    frames = make_frames(rows=1200)
+    head = {tick: frame.iloc[:1000] for tick, frame in frames.items()}
+    first = make_hmm(head, cache=cache)
+    first.fit_priceables()
+    assert first.fitted_from == "cold"
+    again = make_hmm(head, cache=cache)
+    again.fit_priceables()
+    assert again.fitted_from == "cache"
+    np.testing.assert_array_equal(again.model.means_, first.model.means_)
+    np.testing.assert_array_equal(again.frame["Hidden_State"], first.frame["Hidden_State"])
+
+    extended = make_hmm(frames, cache=cache)
+    extended.fit_priceables()
+    cold = make_hmm(frames, cache=False)
+    cold.fit_priceables()
+    assert extended.fitted_from == "warm"
+    assert extended.model.monitor_.iter < cold.model.monitor_.iter
+    assert extended.model.score(extended.features) >= cold.model.score(cold.features) - 1.0
+
+def test_model_cache_keys_include_hyperparameters(make_hmm, tmp_path, make_frames):
+    cache = hmm_model.ModelCache(str(tmp_path))
+    make_hmm(make_frames(), cache=cache).fit_priceables()
+    other = make_hmm(make_frames(), cache=cache, hidden_states=2)
+    other.fit_priceables()
+    assert other.fitted_from == "cold"
+    refreshed = make_hmm(make_frames(), cache=cache)
+    refreshed.fit_priceables(refresh=True, warm_start=False)
+    assert refreshed.fitted_from == "cold"
+
+@pytest.fixture
+def features(make_frames) -> np.ndarray:
+    closes = np.column_stack([frame["Close"] for frame in make_frames(rows=1200).values()])
+    return np.diff(np.log(closes), axis=0) * 100
+
+def test_select_model_is_reproducible_across_processes(features):
+    options = {"hidden_states": (2, 3, 4), "covariance_types": ("diag",), "restarts": 2, "seed": 7}
+    inline, inline_table = hmm_model.select_model(features, processes=1, **options)
+    pooled, pooled_table = hmm_model.select_model(features, processes=2, **options)
+    pd.testing.assert_frame_equal(inline_table, pooled_table)
+    np.testing.assert_array_equal(inline.means_, pooled.means_)
+    assert inline_table["bic"].is_monotonic_increasing
+    assert inline.n_components == 3
+
+def test_select_model_returns_the_best_candidate_fit(features):
+    from hmmlearn import hmm
+    model, table = hmm_model.select_model(features, hidden_states=(3,), covariance_types=("full", "diag"), restarts=2,
+                                          criterion="log_likelihood", processes=1)
+    best = table.iloc[0]
+    assert best["log_likelihood"] == table["log_likelihood"].max()
+    direct = hmm.GaussianHMM(n_components=3, covariance_type=best["covariance_type"], n_iter=1000, tol=1e-4,
+                             random_state=int(best["seed"])).fit(features)
+    np.testing.assert_allclose(model.means_, direct.means_)
+    np.testing.assert_allclose(model.score(features), best["log_likelihood"])
+    with pytest.raises(ValueError):
+        hmm_model.select_model(features, criterion="likelihood")
+
+def test_pack_sequences_and_session_lengths(make_frames):
+    days = [np.arange(6.0).reshape(3, 2), np.empty((0, 2)), pd.DataFrame(np.ones((2, 2)))]
+    packed, lengths = hmm_model.pack_sequences(days)
+    np.testing.assert_array_equal(lengths, [3, 2])
+    np.testing.assert_array_equal(packed, np.vstack([days[0], np.ones((2, 2))]))
+    with pytest.raises(ValueError):
+        hmm_model.pack_sequences([np.ones((2, 2)), np.ones((2, 3))])
+    index = make_frames(rows=30, days=3)["AAA"].index
+    np.testing.assert_array_equal(hmm_model.session_lengths(index), [10, 10, 10])
+    np.testing.assert_array_equal(hmm_model.session_lengths(pd.RangeIndex(5)), [5])
+
+def test_fit_pooled_matches_hmmlearn_with_lengths(features):
+    from hmmlearn import hmm
+    days = np.split(features, [400, 790])
+    pooled = hmm_model.fit_pooled(days, n_components=3, random_state=0)
+    direct = hmm.GaussianHMM(n_components=3, covariance_type="full", n_iter=1000, tol=1e-4, random_state=0).fit(features, [400, 390, len(features) - 790])
+    np.testing.assert_allclose(pooled.means_, direct.means_)
+    np.testing.assert_allclose(pooled.transmat_, direct.transmat_)
+
+def test_sessions_zero_overnight_returns_and_share_a_model(make_hmm, make_frames):
+    frames = make_frames(rows=1200, days=3)
+    markov = make_hmm(frames, sessions=True)
+    np.testing.assert_array_equal(markov.lengths, [400, 400, 400])
+    np.testing.assert_array_equal(markov.features[[0, 400, 800]], 0.0)
+    assert [len(day) for day in markov.sequences()] == [400, 400, 400]
+    other = make_hmm({tick: make_frames(rows=1200, seed=1, days=3)[tick] for tick in TICKS}, sessions=True)
+    shared = hmm_model.fit_shared(markov, other)
+    assert markov.model is shared and other.model is shared and other.fitted_from == "shared"
+    expected = hmm_model.fit_pooled(markov.sequences() + other.sequences(), 3, random_state=0)
+    np.testing.assert_allclose(shared.means_, expected.means_)
+    np.testing.assert_array_equal(other.frame["Hidden_State"], shared.predict(other.features, other.lengths))
@@ -0,0 +1,28 @@
+# Heavy dependencies stay unloaded until first use #
+
+import sys
+import subprocess
+
+import import_budget
+from lazy import lazy_import
+
+def _loaded_after(statement: str) -> list:
+    probe = f"import sys\n{statement}\nprint(','.join(m for m in {import_budget.DEFERRED!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout.strip()
+    return [module for module in out.split(",") if module]
+
+def test_numeric_modules_defer_heavy_imports():
+    for modules in import_budget.BUDGETS:
+        assert import_budget.measure(modules, runs=1)[1] == []
+
+def test_model_modules_defer_plotting_and_fitting_libraries():
+    # these modules use pandas at import time (pandas itself may load pyarrow)
+    heavy = {"matplotlib", "yfinance", "hmmlearn", "ta", "scipy", "sklearn"}
+    for module in ("instrument", "universe", "hmm_model", "analytics"):
+        assert heavy.isdisjoint(_loaded_after(f"import {module}")), module
+
+def test_lazy_module_imports_on_first_use():
+    assert _loaded_after("from lazy import lazy_import\nplt = lazy_import('matplotlib.pyplot')") == []
+    proxy = lazy_import("json")
+    assert "not loaded" in repr(proxy)
+    assert proxy.dumps([1]) == "[1]" and "(loaded)" in repr(proxy)
@@ -0,0 +1,112 @@
+# Priceable history calls over an in-memory provider #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import algebra
+from cache import BarCache
+from bars import trim_to_period
+from instrument import Priceable
+from resample import resample_bars
+from providers import FrameProvider, RateLimitError
+from static_types.quoteables import LOADABLE
+from static_types.quote_timing import QuoteTiming
+
+def _frame(rows: int = 20) -> pd.DataFrame:
+    index = pd.date_range("2025-08-18 09:30", periods=rows, freq="min", tz="America/New_York")
+    close = 100 + np.arange(rows, dtype=np.float64)
+    return pd.DataFrame({"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.full(rows, 1000.0)}, index=index)
+
+def _sessions(days: int = 3, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex([
+        time for day in pd.bdate_range("2025-08-18", periods=days)
+        for time in pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=390, freq="min", tz="America/New_York")
+        ])
+    close = 100 * np.exp(np.cumsum(rng.standard_normal(len(index)) * 0.001))
+    return pd.DataFrame({"Open": close, "High": close * 1.001, "Low": close * 0.999, "Close": close,
+                         "Volume": rng.integers(100, 1000, len(index)).astype(np.float64)}, index=index)
+
+class _Recording(FrameProvider):
+    def __init__(self, frames: dict) -> None:
+        super().__init__(frames)
+        self.calls = []
+
+    def history(self, symbol, period, interval=None, start=None) -> pd.DataFrame:
+        self.calls.append((str(period), str(interval), start))
+        return super().history(symbol, period, interval, start=start)
+
+@pytest.fixture
+def xom() -> Priceable:
+    return Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=False, provider=FrameProvider({"XOM": _frame()}))
+
+def test_history_series_are_writable_copies(xom):
+    close = xom.get_price_history(period="1d", interval="1m")
+    close.iloc[0] = 99.0
+    algebra.add(close, pd.Series([10.0, 20.0]))
+    assert close.iloc[:2].tolist() == [109.0, 121.0]
+    volume = xom.get_volume_history(period="1d", interval="1m")
+    volume.iloc[-1] = 0.0
+    assert xom.get_price_history(period="1d", interval="1m").iloc[0] == 100.0
+    assert xom.get_volume_history(period="1d", interval="1m").iloc[-1] == 1000.0
+
+def test_timings_share_one_fetch(xom):
+    bars = xom.get_bars(period="1d", interval="1m")
+    assert xom.get_bars(period="1d", interval="1m") is bars
+    assert not bars.close.to_numpy().flags.writeable
+    high = xom.get_price_history(period="1d", interval="1m", price_timing=QuoteTiming.HIGH)
+    assert high.name == f"XOM {str(QuoteTiming.HIGH)}"
+    np.testing.assert_array_equal(high.to_numpy(), bars.high.to_numpy())
+
+def test_delta_refresh_appends_only_new_bars(tmp_path):
+    full = _sessions()
+    # the last bar was still in progress when cached, the next fetch revises it
+    partial = full.iloc[:900].copy()
+    partial.iloc[-1, partial.columns.get_loc("Close")] += 1.0
+    provider = _Recording({"XOM": partial})
+    cache = BarCache(str(tmp_path), ttl={"1m": 0})
+    Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=cache, provider=provider).get_bars(period="5d", interval="1m")
+    provider.frames["XOM"] = full
+    xom = Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=cache, provider=provider)
+    bars = xom.get_bars(period="5d", interval="1m", delta=True)
+    assert provider.calls[-1][2] == full.index[899] - pd.Timedelta(minutes=3)
+    pd.testing.assert_frame_equal(bars.to_frame(), full, check_freq=False)
+    pd.testing.assert_frame_equal(cache.get("XOM", "5d", "1m", allow_stale=True), full, check_freq=False)
+
+def test_delta_refresh_refetches_revised_history(tmp_path):
+    full = _sessions()
+    provider = _Recording({"XOM": full.iloc[:900].copy()})
+    cache = BarCache(str(tmp_path), ttl={"1m": 0})
+    Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=cache, provider=provider).get_bars(period="5d", interval="1m")
+    adjusted = full.copy()
+    adjusted[["Open", "High", "Low", "Close"]] *= 0.98
+    provider.frames["XOM"] = adjusted
+    bars = Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=cache, provider=provider).get_bars(period="5d", interval="1m", delta=True)
+    assert provider.calls[-1][2] is None and provider.calls[-2][2] is not None
+    pd.testing.assert_frame_equal(bars.to_frame(), adjusted, check_freq=False)
+
+def test_coarser_intervals_are_resampled_without_fetching(tmp_path):
+    full = _sessions()
+    provider = _Recording({"XOM": full})
+    cache = BarCache(str(tmp_path))
+    Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=cache, provider=provider).get_bars(period="5d", interval="1m")
+    xom = Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=cache, provider=provider)
+    hourly = xom.get_bars(period="1d", interval="1h").to_frame()
+    assert len(provider.calls) == 1
+    pd.testing.assert_frame_equal(hourly, resample_bars(trim_to_period(full, "1d"), "1h"))
+    xom.get_bars(period="1mo", interval="1h")
+    assert provider.calls[-1][:2] == ("1mo", "1h")
+
+def test_direct_yfinance_throttling_raises_rate_limit_error():
+    from yfinance.exceptions import YFRateLimitError
+
+    class ThrottledTicker:
+        def history(self, **kwargs):
+            raise YFRateLimitError()
+
+    xom = Priceable(type=LOADABLE.STOCK, name_symbol="XOM", cache=False)
+    xom.load = ThrottledTicker()
+    with pytest.raises(RateLimitError):
+        xom.get_bars(period="1d", interval="1m")
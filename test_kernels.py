@@ -0,0 +1,78 @@
+# Equivalence checks of the ndarray kernels and algebra wrappers against pandas #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import algebra
+import kernels
+
+@pytest.fixture
+def prices(make_prices) -> np.ndarray:
+    return make_prices(rows=600, tickers=8, missing=0.01).to_numpy(copy=True)
+
+def _assert_matches(result: np.ndarray, expected: np.ndarray, rtol: float = 1e-9) -> None:
+    expected = np.asarray(expected, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+    np.testing.assert_allclose(result, expected, rtol=rtol, atol=1e-12, equal_nan=True)
+
+@pytest.mark.parametrize("window", [1, 3, 7, 60])
+def test_rolling_mean_matches_pandas(window, prices):
+    _assert_matches(kernels.rolling_mean(prices, window), pd.DataFrame(prices).rolling(window).mean())
+
+@pytest.mark.parametrize("window", [2, 7, 60])
+def test_rolling_var_matches_pandas(window, prices):
+    returns = kernels.pct_change(prices)
+    _assert_matches(kernels.rolling_var(returns, window), pd.DataFrame(returns).rolling(window).var())
+
+def test_rolling_var_of_price_levels_within_cancellation_bound(prices):
+    _assert_matches(kernels.rolling_var(prices, 7), pd.DataFrame(prices).rolling(7).var(), rtol=1e-6)
+
+def test_infinite_values_count_as_missing():
+    values = np.array([1, 2, np.inf, 3, 4, 5, 6, 7, 8, 9], dtype=np.float64)
+    expected = pd.Series(values).rolling(3)
+    _assert_matches(kernels.rolling_mean(values, 3), expected.mean())
+    _assert_matches(kernels.rolling_var(values, 3), expected.var())
+    _assert_matches(kernels.rolling_mean(-values, 3), pd.Series(-values).rolling(3).mean())
+    np.testing.assert_array_equal(kernels.rolling_mean(values, 3)[5:], [4, 5, 6, 7, 8])
+
+def test_zero_price_only_blanks_windows_containing_it(make_prices):
+    prices = make_prices(rows=5000, tickers=3, seed=1).to_numpy(copy=True)
+    prices[100, 0] = 0.0
+    prices[3000, 1] = 0.0
+    expected = pd.DataFrame(prices).pct_change(fill_method=None).rolling(21).std() * np.sqrt(252)
+    result = kernels.rolling_volatility(prices, 21)
+    _assert_matches(result, expected)
+    # first window per column, plus the returns into and out of each zero price (<= window + 1 rows each)
+    assert np.isnan(result).sum() <= 3 * 21 + 2 * 22
+
+def test_algebra_wrappers_keep_labels(make_prices):
+    frame = make_prices(rows=100, tickers=3).set_axis(pd.date_range("2024-01-01", periods=100))
+    frame.iloc[40, 1] = 0.0
+    result = algebra.rolling_volatility(frame, window=10)
+    assert list(result.columns) == list(frame.columns) and result.index.equals(frame.index)
+    _assert_matches(result.to_numpy(), frame.pct_change(fill_method=None).rolling(10).std() * np.sqrt(252))
+    series = frame["XOM"]
+    _assert_matches(algebra.rolling_avg(series, 5).to_numpy(), series.rolling(5).mean())
+    _assert_matches(algebra.rolling_var(series, 5).to_numpy(), series.pct_change(fill_method=None).rolling(5).var())
+
+def test_out_buffer_may_be_the_input(make_prices):
+    prices = make_prices(rows=50, tickers=2).to_numpy(copy=True)
+    expected = kernels.rolling_mean(prices, 5)
+    buffer = prices.copy()
+    assert kernels.rolling_mean(buffer, 5, out=buffer) is buffer
+    _assert_matches(buffer, expected)
+
+def test_scale_and_diff_filled(make_prices):
+    prices = make_prices(rows=50, tickers=3).to_numpy(copy=True)
+    prices[:5, 2] = np.nan
+    frame = pd.DataFrame(prices)
+    first = frame.apply(lambda column: column.dropna().iloc[0])
+    _assert_matches(kernels.scale(prices, 100), frame / first * 100)
+    _assert_matches(kernels.diff_filled(prices), frame.diff().fillna(0.0))
+
+def test_step_signs_run_along_axis_zero(make_prices):
+    prices = make_prices(rows=40, tickers=3).to_numpy()
+    expected = np.column_stack([kernels.step_signs(prices[:, j]) for j in range(prices.shape[1])])
+    np.testing.assert_array_equal(kernels.step_signs(prices), expected)
+    assert kernels.step_signs(prices[:1]).tolist() == [[0, 0, 0]]
@@ -0,0 +1,55 @@
+# FFT cross-correlations against a direct sum over lags, and recovery of an injected lag #
+
+import numpy as np
+import pandas as pd
+
+from leadlag import LeadLagScanner, fft_length, standardized_returns
+
+def _prices(rows: int = 800, lag: int = 3, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    driver = rng.standard_normal(rows + lag) * 0.01
+    returns = np.column_stack([
+        driver[lag:],
+        0.8 * driver[:rows] + 0.006 * rng.standard_normal(rows),
+        0.01 * rng.standard_normal(rows),
+        ])
+    index = pd.date_range("2025-08-18 09:30", periods=rows, freq="min")
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=["NVDA", "AMD", "XOM"])
+
+def test_fft_length():
+    for n in [1, 7, 97, 1000, 4097]:
+        size = fft_length(n)
+        assert size >= n
+        for prime in (2, 3, 5):
+            while size % prime == 0:
+                size //= prime
+        assert size == 1
+    assert fft_length(97) == 100 and fft_length(1000) == 1000
+
+def test_ccf_matches_a_direct_sum():
+    prices = _prices()
+    scanner = LeadLagScanner(prices, max_lag=10)
+    returns = standardized_returns(prices)
+    leader, follower = returns[:, 0], returns[:, 1]
+    norm = np.sqrt((leader * leader).sum() * (follower * follower).sum())
+    expected = [(leader[max(0, -k):len(leader) - max(0, k)] * follower[max(0, k):len(follower) - max(0, -k)]).sum() / norm
+                for k in range(-10, 11)]
+    ccf = scanner.ccf("NVDA", "AMD")
+    np.testing.assert_allclose(ccf.to_numpy(), expected, atol=1e-12)
+    assert list(ccf.index) == list(range(-10, 11))
+
+def test_scan_recovers_an_injected_lag():
+    table = LeadLagScanner(_prices(lag=3), max_lag=10).scan(chunk_bytes=1)
+    top = table.iloc[0]
+    assert (top["leader"], top["follower"], top["lag"]) == ("NVDA", "AMD", 3)
+    assert top["corr"] > 0.5 and abs(top["corr0"]) < 0.2
+    np.testing.assert_allclose(table["zscore"], table["corr"] * np.sqrt(800))
+    reverse = LeadLagScanner(_prices(lag=3), max_lag=10).scan(leaders=["AMD"], top=1)
+    assert reverse["lag"].iloc[0] == -3
+
+def test_overnight_returns_are_dropped():
+    prices = _prices(rows=10)
+    prices.index = prices.index + pd.to_timedelta(np.repeat([0, 1], 5), unit="D")
+    returns = standardized_returns(prices)
+    np.testing.assert_array_equal(returns[[0, 5]], 0.0)
+    assert np.count_nonzero(standardized_returns(prices, sessions=False)[5])
@@ -0,0 +1,83 @@
+# Comovement neighbours against a brute-force pandas correlation matrix #
+
+import numpy as np
+import pandas as pd
+
+from neighbors import ComovementIndex
+
+def _prices(rows: int = 400, clusters: int = 4, per_cluster: int = 5, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    factors = rng.standard_normal((rows, clusters)) * 0.01
+    loadings = rng.uniform(0.3, 1.0, clusters * per_cluster)
+    returns = np.repeat(factors, per_cluster, axis=1) * loadings + rng.standard_normal((rows, clusters * per_cluster)) * 0.006
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    prices[1:][rng.random((rows - 1, prices.shape[1])) < 0.01] = np.nan
+    return pd.DataFrame(prices, columns=[f"T{i:02d}" for i in range(prices.shape[1])])
+
+def _brute_force(prices: pd.DataFrame, k: int, window=None) -> dict:
+    returns = prices.ffill().pct_change(fill_method=None)
+    corr = (returns if window is None else returns.iloc[-window:]).corr()
+    return {symbol: corr[symbol].drop(symbol).sort_values(ascending=False, kind="stable").head(k) for symbol in corr}
+
+def test_exact_queries_match_brute_force():
+    prices = _prices()
+    index = ComovementIndex(prices)
+    expected = _brute_force(prices, k=4)
+    for symbol in ("T00", "T07", "T19"):
+        result = index.query(symbol, k=4)
+        assert list(result.index) == list(expected[symbol].index)
+        np.testing.assert_allclose(result.to_numpy(), expected[symbol].to_numpy(), rtol=1e-10)
+    np.testing.assert_allclose(index.correlations("T03"), prices.ffill().pct_change(fill_method=None).corr()["T03"], rtol=1e-10)
+
+def test_query_all_matches_queries_whatever_the_block():
+    index = ComovementIndex(_prices())
+    table = index.query_all(k=3)
+    pd.testing.assert_frame_equal(index.query_all(k=3, block_bytes=1), table)
+    assert len(table) == 20 * 3
+    rows = table[table["symbol"] == "T11"]
+    expected = index.query("T11", k=3)
+    assert list(rows["neighbor"]) == list(expected.index) and list(rows["rank"]) == [1, 2, 3]
+    np.testing.assert_allclose(rows["corr"], expected.to_numpy())
+
+def test_approximate_queries_find_the_exact_neighbours():
+    index = ComovementIndex(_prices(), dims=64, candidates=3)
+    exact = index.query_all(k=4)
+    approximate = index.query_all(k=4, approximate=True)
+    recall = (exact.groupby("symbol")["neighbor"].apply(set) == approximate.groupby("symbol")["neighbor"].apply(set)).mean()
+    assert recall >= 0.9
+    np.testing.assert_allclose(approximate["corr"], [index.correlations(s)[n] for s, n in zip(approximate["symbol"], approximate["neighbor"])])
+
+def test_updates_and_save_load_match_a_full_build(tmp_path):
+    prices = _prices()
+    expected = ComovementIndex(prices, window=120)
+    index = ComovementIndex(prices.iloc[:50], window=120)
+    index.update(prices.iloc[50:300])
+    for _, row in prices.iloc[300:].iterrows():
+        index.update(row)
+    np.testing.assert_allclose(index.normalized(), expected.normalized(), atol=1e-12)
+    window = _brute_force(prices, k=3, window=120)["T05"]
+    np.testing.assert_allclose(index.query("T05", k=3).to_numpy(), window.to_numpy(), rtol=1e-10)
+
+    index.save(str(tmp_path / "index.npz"))
+    loaded = ComovementIndex.load(str(tmp_path / "index.npz"))
+    pd.testing.assert_frame_equal(loaded.query_all(k=3, approximate=True), index.query_all(k=3, approximate=True))
+
+def test_updates_keep_window_sums_without_rebuilding(monkeypatch):
+    prices = _prices()
+    # a ticker listed late and one with a zero price leave missing returns inside the window
+    prices.iloc[:330, 4] = np.nan
+    prices.iloc[350, 9] = 0.0
+    index = ComovementIndex(prices.iloc[:250], window=120)
+    expected = ComovementIndex(prices, window=120)
+    monkeypatch.setattr(index, "normalized", lambda: (_ for _ in ()).throw(AssertionError("exact queries must not rebuild")))
+    for _, row in prices.iloc[250:].iterrows():
+        index.update(row)
+        index.query("T04", k=3)
+    np.testing.assert_allclose(index._sum, expected._sum, rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(index._sumsq, expected._sumsq, rtol=1e-9)
+    returns = prices.ffill().pct_change(fill_method=None).iloc[-120:].replace([np.inf, -np.inf], np.nan)
+    centered = (returns - returns.mean()).fillna(0.0).to_numpy().T
+    z = centered / np.linalg.norm(centered, axis=1, keepdims=True)
+    np.testing.assert_allclose(expected.normalized(), z, atol=1e-12)
+    for symbol in ("T04", "T09", "T12"):
+        np.testing.assert_allclose(index.correlations(symbol), z @ z[int(symbol[1:])], atol=1e-12)
@@ -0,0 +1,75 @@
+# Reconvergence counts against a direct loop, and bootstrap reproducibility across batches, processes and reruns #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import reconvergence
+from reconvergence import ReconvergenceEstimator, RESULT_KIND
+from store import ResultStore
+
+THRESHOLDS = [0.5, 1.0, 1.5, 2.5]
+
+def _spreads(rows: int = 800, pairs: int = 3, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    spreads = np.empty((rows, pairs))
+    spreads[0] = 0.0
+    for t in range(1, rows):
+        spreads[t] = 0.9 * spreads[t - 1] + rng.standard_normal(pairs)
+    spreads[rng.random(spreads.shape) < 0.02] = np.nan
+    return pd.DataFrame(spreads, columns=pd.MultiIndex.from_tuples([("XOM", "CVX"), ("XOM", "COP"), ("CVX", "COP")][:pairs]))
+
+def _direct(spread: np.ndarray, threshold: float):
+    events = reconverged = 0
+    for now, after in zip(np.abs(spread[:-1]), np.abs(spread[1:])):
+        if np.isnan(now) or np.isnan(after) or not now > threshold:
+            continue
+        events += 1
+        reconverged += after < now
+    return events, reconverged
+
+def test_counts_match_a_direct_loop():
+    spreads = _spreads()
+    result = ReconvergenceEstimator(THRESHOLDS, n_boot=0).estimate(spreads)
+    assert list(result.columns) == ["leader", "follower", "D", "events", "reconverged", "probability", "lower", "upper"]
+    for (leader, follower), column in spreads.items():
+        rows = result[(result["leader"] == leader) & (result["follower"] == follower)]
+        for D, events, reconverged in rows[["D", "events", "reconverged"]].itertuples(index=False):
+            assert (events, reconverged) == _direct(column.to_numpy(), D)
+    np.testing.assert_allclose(result["probability"], result["reconverged"] / result["events"])
+
+def test_block_weights_resample_every_bar_count():
+    weights = reconvergence.block_weights(100, 30, np.random.default_rng(0))
+    assert weights.sum() == 100 and weights.shape == (100,)
+    np.testing.assert_array_equal(reconvergence.block_weights(5, 30, np.random.default_rng(0)), np.ones(5))
+
+def test_bootstrap_does_not_depend_on_batching_or_processes():
+    spreads = _spreads()
+    options = {"n_boot": 200, "block": 20, "seed": 5}
+    expected = ReconvergenceEstimator(THRESHOLDS, processes=1, **options).estimate(spreads)
+    batched = ReconvergenceEstimator(THRESHOLDS, processes=1, max_bytes=1, **options).estimate(spreads)
+    pooled = ReconvergenceEstimator(THRESHOLDS, processes=2, **options).estimate(spreads)
+    alone = ReconvergenceEstimator(THRESHOLDS, processes=1, **options).estimate(spreads.iloc[:, [1]])
+    pd.testing.assert_frame_equal(batched, expected)
+    pd.testing.assert_frame_equal(pooled, expected)
+    pd.testing.assert_frame_equal(alone, expected.iloc[len(THRESHOLDS):2 * len(THRESHOLDS)].reset_index(drop=True))
+    finite = expected.dropna()
+    assert ((finite["lower"] <= finite["probability"]) & (finite["probability"] <= finite["upper"])).all()
+
+def test_store_skips_estimated_pairs(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path))
+    spreads = _spreads()
+    first = ReconvergenceEstimator(THRESHOLDS, n_boot=50, processes=1, store=store).estimate(spreads.iloc[:, :2])
+    assert len(store.keys(RESULT_KIND)) == 2
+    estimated = []
+    original = ReconvergenceEstimator._estimate
+    monkeypatch.setattr(ReconvergenceEstimator, "_estimate", lambda self, values: estimated.append(values.shape[1]) or original(self, values))
+    second = ReconvergenceEstimator(THRESHOLDS, n_boot=50, processes=1, store=store).estimate(spreads)
+    assert estimated == [1]
+    pd.testing.assert_frame_equal(second.iloc[:len(first)], first)
+
+def test_thresholds_must_be_positive():
+    with pytest.raises(ValueError):
+        ReconvergenceEstimator([0.0, 1.0])
+    with pytest.raises(ValueError):
+        ReconvergenceEstimator([])
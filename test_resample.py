@@ -0,0 +1,41 @@
+# Local resampling of 1m bars against pandas resample anchored at the session open #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from resample import resample_bars, covers
+
+def _sessions(days: int = 3, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex([
+        time for day in pd.bdate_range("2025-08-18", periods=days)
+        for time in pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=390, freq="min", tz="America/New_York")
+        ])
+    close = 100 * np.exp(np.cumsum(rng.standard_normal(len(index)) * 0.001))
+    return pd.DataFrame({"Open": close * 0.9995, "High": close * 1.001, "Low": close * 0.999, "Close": close,
+                         "Volume": rng.integers(100, 1000, len(index)).astype(np.float64)}, index=index)
+
+HOW = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+@pytest.mark.parametrize("interval, rule", [("5m", "5min"), ("30m", "30min"), ("1h", "60min"), ("90m", "90min")])
+def test_intraday_bars_match_pandas(interval, rule):
+    minute = _sessions()
+    minute = minute.drop(minute.index[400:420])
+    expected = minute.resample(rule, origin="start_day", offset="9h30min").agg(HOW).dropna(subset=["Open"])
+    expected.index = expected.index.as_unit("ns")
+    pd.testing.assert_frame_equal(resample_bars(minute, interval), expected, check_freq=False)
+
+def test_sessions_are_never_crossed():
+    minute = _sessions()
+    hourly = resample_bars(minute, "1h")
+    assert len(hourly) == 3 * 7
+    assert (hourly.index.time == pd.Timestamp("15:30").time()).sum() == 3
+    daily = resample_bars(minute, "1d")
+    assert list(daily.index) == list(minute.index.normalize().unique())
+    np.testing.assert_allclose(daily["Volume"], minute["Volume"].groupby(minute.index.date).sum())
+    with pytest.raises(ValueError):
+        resample_bars(minute, "1wk")
+
+def test_covers():
+    assert covers("5d", "1d") and covers("1mo", "5d") and not covers("1d", "5d") and not covers("5d", "max")
@@ -0,0 +1,51 @@
+# Divergence scanner metrics against per-pair pandas, whatever the chunking or process count #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scanner import DivergenceScanner, pair_indices, METRICS
+from hedge import rolling_hedge
+
+@pytest.fixture
+def prices(make_prices) -> pd.DataFrame:
+    prices = make_prices(rows=300, tickers=5, missing=0.02)
+    prices.iloc[:3, 1] = np.nan
+    return prices
+
+def _expected(prices: pd.DataFrame, leader: str, follower: str, lookback=None, hedge_window=None) -> list:
+    filled = prices.ffill()
+    scaled = filled / filled.apply(lambda column: column.dropna().iloc[0]) * 100
+    if hedge_window is None:
+        spread = scaled[leader] - scaled[follower]
+    else:
+        spread = rolling_hedge(scaled[leader], scaled[follower], window=hedge_window)["spread"]
+    if lookback is not None:
+        spread = spread.iloc[-lookback:]
+    last = spread.iloc[-1]
+    return [last, abs(last), spread.abs().mean(), spread.abs().max(), (last - spread.mean()) / spread.std()]
+
+def test_pair_indices():
+    lead, follow = pair_indices(["A", "B", "C"])
+    assert list(zip(lead, follow)) == [(0, 1), (0, 2), (1, 2)]
+    lead, follow = pair_indices(["A", "B", "C"], leaders=["C"])
+    assert list(zip(lead, follow)) == [(2, 0), (2, 1)]
+    with pytest.raises(ValueError):
+        pair_indices(["A", "B"], leaders=["Z"])
+
+@pytest.mark.parametrize("lookback, hedge_window", [(None, None), (50, None), (50, 40)])
+def test_scan_matches_pandas_per_pair(lookback, hedge_window, prices):
+    table = DivergenceScanner(prices, lookback=lookback, hedge_window=hedge_window).scan(top=None, processes=1)
+    assert len(table) == 10 and table["abs_spread"].is_monotonic_decreasing
+    for row in table.itertuples(index=False):
+        expected = _expected(prices, row.leader, row.follower, lookback, hedge_window)
+        np.testing.assert_allclose([getattr(row, metric) for metric in METRICS], expected, rtol=1e-9)
+
+def test_scan_does_not_depend_on_chunks_or_processes(prices):
+    scanner = DivergenceScanner(prices, lookback=100)
+    expected = scanner.scan(top=None, processes=1)
+    pd.testing.assert_frame_equal(scanner.scan(top=None, processes=1, chunk_bytes=1), expected)
+    pd.testing.assert_frame_equal(scanner.scan(top=None, processes=2, chunk_bytes=1), expected)
+    leaders = scanner.scan(leaders=["CVX"], top=2, processes=1)
+    assert (leaders["leader"] == "CVX").all() and len(leaders) == 2
+    assert leaders["abs_spread"].iloc[0] == expected.query("leader == 'CVX' or follower == 'CVX'")["abs_spread"].max()
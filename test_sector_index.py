@@ -0,0 +1,73 @@
+# Synthetic sector index against a manual buy-and-hold basket, batched and updated bar by bar #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from providers import ProviderError
+from sector_index import SectorIndex, MarketCapCache
+
+@pytest.fixture
+def prices(make_prices) -> pd.DataFrame:
+    prices = make_prices(rows=120, tickers=3, missing=0.05, start=50.0, days=1)
+    prices.iloc[:10, 2] = np.nan
+    return prices
+
+def _basket(prices: pd.DataFrame, weights: dict, base: float = 100) -> np.ndarray:
+    value = np.zeros(len(prices))
+    for tick, weight in weights.items():
+        column = prices[tick].ffill()
+        value += weight * (column / column.dropna().iloc[0]).fillna(1.0).to_numpy()
+    return base * value / sum(weights.values())
+
+class _Caps:
+    def __init__(self, caps: dict) -> None:
+        self.caps, self.calls = dict(caps), []
+
+    def market_cap(self, symbol: str) -> float:
+        self.calls.append(symbol)
+        if symbol not in self.caps:
+            raise ProviderError(f"no cap for {symbol}")
+        return self.caps[symbol]
+
+def test_index_matches_a_manual_basket(tmp_path, prices):
+    weights = {"XOM": 0.5, "CVX": 0.3, "COP": 0.2}
+    np.testing.assert_allclose(SectorIndex(prices, weights=weights).values, _basket(prices, weights))
+    np.testing.assert_allclose(SectorIndex(prices, weights="equal", base=1).values, _basket(prices, dict.fromkeys(weights, 1), 1))
+    caps = MarketCapCache(str(tmp_path / "caps.json"), provider=_Caps({"XOM": 400.0, "CVX": 300.0, "COP": 100.0}))
+    cap_weighted = SectorIndex(prices, weights="cap", caps=caps)
+    # today's caps are taken back to the first bar through each constituent's price change
+    first, last = prices.apply(lambda column: column.dropna().iloc[0]), prices.ffill().iloc[-1]
+    backdated = pd.Series({"XOM": 400.0, "CVX": 300.0, "COP": 100.0}) * first / last
+    np.testing.assert_allclose(cap_weighted.weights, backdated / backdated.sum())
+    np.testing.assert_allclose(cap_weighted.values, _basket(prices, backdated.to_dict()))
+    # so the basket holds the constituents in proportion to today's caps at the last bar
+    held = cap_weighted.weights * last / first
+    np.testing.assert_allclose(held / held.sum(), [0.5, 0.375, 0.125])
+    with pytest.raises(ValueError):
+        SectorIndex(prices, weights={"SHEL": 1.0})
+    with pytest.raises(ValueError):
+        SectorIndex(prices, weights="float")
+
+def test_updates_match_the_batch_index(prices):
+    expected = SectorIndex(prices, weights="equal").values
+    index = SectorIndex(prices.iloc[:5], weights="equal")
+    updated = [index.update(row, time=time) for time, row in prices.iloc[5:].iterrows()]
+    np.testing.assert_allclose(updated, expected.iloc[5:])
+    pd.testing.assert_series_equal(index.values, expected, check_freq=False)
+
+def test_market_caps_are_cached_and_served_stale_offline(tmp_path):
+    path = str(tmp_path / "caps.json")
+    provider = _Caps({"XOM": 400.0, "CVX": 300.0})
+    caps = MarketCapCache(path, provider=provider)
+    assert list(caps.get(["XOM", "CVX"])) == [400.0, 300.0]
+    assert list(MarketCapCache(path, provider=provider).get(["CVX"])) == [300.0]
+    assert provider.calls == ["XOM", "CVX"]
+
+    offline = _Caps({})
+    stale = MarketCapCache(path, ttl=0, provider=offline)
+    assert list(stale.get(["XOM"])) == [400.0] and offline.calls == ["XOM"]
+    with pytest.raises(ProviderError):
+        stale.get(["COP"])
+    stale.put({"COP": 100.0})
+    assert list(MarketCapCache(path, provider=offline).get(["COP"])) == [100.0]
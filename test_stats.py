@@ -0,0 +1,78 @@
+# Streaming covariance and the prefix-sum correlation tensor against numpy and pandas references #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats import StreamingCovariance, rolling_correlation_matrix, pair_index
+
+def _returns(rows: int = 300, cols: int = 5, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    mixing = rng.standard_normal((cols, cols)) * 0.3 + np.eye(cols)
+    return 0.01 + rng.standard_normal((rows, cols)) @ mixing * 0.01
+
+def test_cumulative_matches_np_cov():
+    returns = _returns()
+    engine = StreamingCovariance()
+    for row in returns[:100]:
+        engine.update(row)
+    engine.update_batch(returns[100:])
+    np.testing.assert_allclose(engine.cov(), np.cov(returns, rowvar=False), rtol=1e-10)
+    np.testing.assert_allclose(engine.corr(), np.corrcoef(returns, rowvar=False), rtol=1e-10)
+
+def test_window_matches_trailing_np_cov():
+    returns = _returns()
+    engine = StreamingCovariance(window=40)
+    for t, row in enumerate(returns):
+        engine.update(row)
+        if t >= 39 and t % 17 == 0:
+            np.testing.assert_allclose(engine.cov(), np.cov(returns[t-39:t+1], rowvar=False), rtol=1e-9)
+
+def test_decay_matches_pandas_ewm():
+    returns = _returns()
+    engine = StreamingCovariance(decay=0.94)
+    engine.update_batch(returns[:200])
+    for row in returns[200:]:
+        engine.update(row)
+    expected = pd.DataFrame(returns).ewm(alpha=0.06).cov(bias=True).loc[len(returns) - 1].to_numpy()
+    np.testing.assert_allclose(engine.cov(), expected, rtol=1e-9)
+
+def test_non_finite_observations_are_skipped():
+    returns = _returns()
+    dirty = returns.copy()
+    dirty[10, 1], dirty[50, 3], dirty[90, 0] = np.nan, np.inf, -np.inf
+    clean = np.delete(returns, [10, 50, 90], axis=0)
+    for options in ({}, {"window": 30}, {"decay": 0.97}):
+        stepped, batched, reference = StreamingCovariance(**options), StreamingCovariance(**options), StreamingCovariance(**options)
+        for row in dirty:
+            stepped.update(row)
+        batched.update_batch(dirty)
+        reference.update_batch(clean)
+        assert stepped.skipped == batched.skipped == 3
+        np.testing.assert_allclose(stepped.cov(), reference.cov(), rtol=1e-9)
+        np.testing.assert_allclose(batched.cov(), reference.cov(), rtol=1e-9)
+
+@pytest.mark.parametrize("upper", [False, True])
+def test_rolling_correlation_matrix_matches_pandas(upper):
+    returns = _returns(rows=120, cols=4)
+    returns[30, 2] = np.nan
+    returns[70, 1] = np.inf
+    window = 20
+    frame = pd.DataFrame(returns).replace([np.inf, -np.inf], np.nan)
+    expected = frame.rolling(window).corr().to_numpy().reshape(len(returns), 4, 4)
+    result = rolling_correlation_matrix(returns, window, upper=upper, chunk_bytes=4096)
+    if upper:
+        i, j = pair_index(4)
+        expected = expected[:, i, j]
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+    assert np.isfinite(result[-1]).all()
+
+@pytest.mark.parametrize("chunk_bytes", [1, 8 * 6 * 6 * 7])
+def test_rolling_correlation_matrix_window_longer_than_chunks(chunk_bytes):
+    # chunks of 1 and 7 rows against a 90-row window, resynced exactly every 90 rows over 600 rows
+    returns = _returns(rows=600, cols=4)
+    returns[200, 3] = np.nan
+    expected = pd.DataFrame(returns).rolling(90).corr().to_numpy().reshape(len(returns), 4, 4)
+    result = rolling_correlation_matrix(returns, 90, chunk_bytes=chunk_bytes)
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+    assert np.isnan(result[200:290, 0, 3]).all() and np.isfinite(result[290:, 0, 3]).all()
@@ -0,0 +1,38 @@
+# Content-hash keys and atomic per-kind result storage #
+
+import numpy as np
+import pandas as pd
+
+from store import ResultStore, digest
+
+def test_digest_is_stable_and_content_sensitive():
+    values = np.arange(6.0)
+    assert digest(("XOM", "CVX"), values, [1, 2]) == digest(("XOM", "CVX"), values.copy(), [1, 2])
+    assert digest(values) != digest(values.reshape(2, 3))
+    assert digest(values) != digest(values.astype(np.float32))
+    assert digest(("XOM", "CVX")) != digest(("CVX", "XOM"))
+    series = pd.Series(values, index=pd.date_range("2025-01-01", periods=6))
+    assert digest(series) == digest(series.copy())
+    assert digest(series) != digest(series.shift(1, freq="D"))
+
+def test_put_get_load_remove(tmp_path):
+    store = ResultStore(str(tmp_path))
+    frames = {key: pd.DataFrame({"pair": [key], "value": [float(i)]}) for i, key in enumerate(["b", "a"])}
+    assert store.get("kind", "a") is None and store.load("kind").empty
+    for key, frame in frames.items():
+        store.put("kind", key, frame)
+    assert store.has("kind", "a") and store.keys("kind") == ["a", "b"]
+    pd.testing.assert_frame_equal(store.get("kind", "b"), frames["b"])
+    pd.testing.assert_frame_equal(store.load("kind"), pd.concat([frames["a"], frames["b"]], ignore_index=True))
+    assert sorted(path.name for path in (tmp_path / "kind").iterdir()) == ["a.parquet", "b.parquet"]
+    store.remove("kind", "a")
+    assert store.keys("kind") == ["b"]
+    store.remove("kind")
+    assert store.keys("kind") == []
+
+def test_unreadable_entries_read_as_missing(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.put("kind", "a", pd.DataFrame({"x": [1]}))
+    with open(store.path("kind", "a"), "wb") as f:
+        f.write(b"not parquet")
+    assert store.get("kind", "a") is None
@@ -0,0 +1,46 @@
+# Streaming accumulators must agree with the batch kernels and pandas rolling, bar by bar #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import kernels
+from streaming import RollingMean, RollingVariance, RollingVolatility
+
+@pytest.fixture
+def prices(make_prices) -> np.ndarray:
+    prices = make_prices(rows=400, tickers=4, missing=0.02).to_numpy(copy=True)
+    prices[150, 1] = 0.0
+    return prices
+
+def _stream(accumulator, rows: np.ndarray) -> np.ndarray:
+    return np.array([accumulator.update(row) for row in rows])
+
+@pytest.mark.parametrize("window", [1, 5, 30])
+def test_rolling_mean_updates_match_pandas(window, prices):
+    prices[200, 2] = np.inf
+    expected = pd.DataFrame(prices).rolling(window).mean().to_numpy()
+    np.testing.assert_allclose(_stream(RollingMean(window), prices), expected, rtol=1e-9, equal_nan=True)
+
+@pytest.mark.parametrize("window", [2, 7, 30])
+def test_rolling_variance_updates_match_pandas(window, prices):
+    expected = pd.DataFrame(prices).pct_change(fill_method=None).rolling(window).var().to_numpy()
+    np.testing.assert_allclose(_stream(RollingVariance(window), prices), expected, rtol=1e-8, atol=1e-15, equal_nan=True)
+
+def test_rolling_volatility_recovers_after_zero_price(prices):
+    expected = kernels.rolling_volatility(prices, 21)
+    result = _stream(RollingVolatility(21), prices)
+    np.testing.assert_allclose(result, expected, rtol=1e-9, equal_nan=True)
+    assert np.isfinite(result[150 + 22:, 1]).any()
+
+def test_scalar_updates_return_floats():
+    mean = RollingMean(window=3)
+    assert [mean.update(x) for x in [1, 2, 3, 4]][2:] == [2.0, 3.0]
+    assert isinstance(mean.update(5), float)
+
+def test_update_batch_matches_updates(prices):
+    stepped, batched = RollingVolatility(21), RollingVolatility(21)
+    expected = _stream(stepped, prices)
+    result = np.vstack([batched.update_batch(prices[:250]), batched.update_batch(prices[250:])])
+    np.testing.assert_allclose(result, expected, rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(batched.update(prices[-1]), stepped.update(prices[-1]), rtol=1e-9, equal_nan=True)
@@ -0,0 +1,72 @@
+# Bulk universe loading over fixture providers #
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from providers import FrameProvider, FileProvider, FakeProvider
+from universe import PriceUniverse, read_ticks
+
+def _frames(tickers=("XOM", "CVX", "COP"), rows: int = 30) -> dict:
+    index = pd.date_range("2025-08-18 09:30", periods=rows, freq="min", tz="America/New_York")
+    frames = {}
+    for i, tick in enumerate(tickers):
+        close = 100.0 * (i + 1) + np.arange(rows)
+        frames[tick] = pd.DataFrame({"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close,
+                                     "Volume": np.full(rows, 1000.0 * (i + 1))}, index=index)
+    frames["COP"] = frames["COP"].drop(index[5:8])
+    return frames
+
+def test_read_ticks(tmp_path):
+    path = tmp_path / "ticks.txt"
+    path.write_text("XOM\n\n# majors\nCVX\nXOM\n  COP  \n")
+    assert read_ticks(str(path)) == ["XOM", "CVX", "COP"]
+
+def test_load_aligns_tickers_and_reports_failures():
+    frames = _frames()
+    universe = PriceUniverse(["XOM", "CVX", "COP", "NOPE", "CVX"], provider=FrameProvider(frames), cache=False, max_workers=3)
+    prices = universe.load(period="1d", interval="1m")
+    assert list(prices.columns) == ["XOM", "CVX", "COP"] and list(universe.failures) == ["NOPE"]
+    expected = pd.concat([frames[tick]["Close"].rename(tick) for tick in ("XOM", "CVX", "COP")], axis=1)
+    pd.testing.assert_frame_equal(prices, expected)
+    assert prices["COP"].isna().sum() == 3
+    assert len(universe.load(period="1d", interval="1m", join="inner")) == 27
+    pd.testing.assert_frame_equal(universe.field("Volume"), pd.concat([frames[tick]["Volume"].rename(tick) for tick in ("XOM", "CVX", "COP")], axis=1))
+    values, index, tickers = universe.to_array()
+    assert values.shape == (27, 3) and tickers == ["XOM", "CVX", "COP"]
+    with pytest.raises(ValueError):
+        universe.raise_failures()
+
+def test_file_provider_reads_per_interval_files(tmp_path):
+    frames = _frames()
+    (tmp_path / "1m").mkdir()
+    frames["XOM"].to_parquet(tmp_path / "1m" / "XOM.parquet")
+    frames["CVX"].to_csv(tmp_path / "CVX.csv")
+    universe = PriceUniverse(["XOM", "CVX"], provider=FileProvider(str(tmp_path)), cache=False)
+    prices = universe.load(period="1d", interval="1m")
+    assert not universe.failures
+    np.testing.assert_allclose(prices.to_numpy(), np.column_stack([frames["XOM"]["Close"], frames["CVX"]["Close"]]))
+    assert str(prices.index.tz) == "America/New_York"
+
+def test_file_provider_reads_csv_in_exchange_time(tmp_path):
+    index = pd.DatetimeIndex(["2025-03-07 15:59", "2025-03-10 09:30"], tz="America/New_York")
+    frame = pd.DataFrame({"Close": [100.0, 101.0]}, index=index)
+    # offsets change across the DST switch
+    frame.to_csv(tmp_path / "XOM.csv")
+    frame.tz_localize(None).to_csv(tmp_path / "CVX.csv")
+    provider = FileProvider(str(tmp_path))
+    for symbol in ("XOM", "CVX"):
+        history = provider.history(symbol, period="1mo", interval="1d")
+        pd.testing.assert_index_equal(history.index, index, check_names=False)
+
+def test_fake_provider_is_repeatable_from_worker_threads():
+    symbols = ["COP"] + [f"T{i:02d}" for i in range(23)]
+    frames = _frames(symbols)
+    runs = []
+    for _ in range(2):
+        provider = FakeProvider(frames, latency=0.005, error_rate=0.3, seed=5)
+        universe = PriceUniverse(symbols, provider=provider, cache=False, max_workers=8)
+        universe.load(period="1d", interval="1m")
+        assert provider.calls == len(symbols) and provider.in_flight == 0 and 1 < provider.max_in_flight <= 8
+        runs.append(sorted(universe.failures))
+    assert runs[0] == runs[1] and 0 < len(runs[0]) < len(symbols)
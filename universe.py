@@ -0,0 +1,179 @@
+# Bulk multi-ticker loading into one aligned price frame #
+
+import asyncio
+import pandas as pd
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, List, Sequence, Optional, Dict, Tuple
+
+from bars import BarFrame
+from async_fetch import AsyncFetcher
+from cache import BarCache
+from instrument import Priceable
+from providers import DataProvider
+from static_types.quoteables import LOADABLE
+from static_types.quote_timing import QuoteTiming
+from static_types.time_range import Interval, Period
+
+def read_ticks(path: str) -> List[str]:
+    '''
+    Reads a ticks file (one symbol per line, ie: ticks/energy-us.txt) into a de-duplicated list.
+
+    Blank lines and lines starting with # are skipped.
+
+    **Examples**
+
+    >>> read_ticks('ticks/energy-us.txt')[:4]
+    ['XOM', 'CVX', 'SHEL', 'TTE']
+    '''
+    ticks = []
+    with open(path, "r") as f:
+        for line in f:
+            tick = line.strip()
+            if tick and not tick.startswith("#") and tick not in ticks:
+                ticks.append(tick)
+    return ticks
+
+class PriceUniverse:
+    '''
+    Loads many priceables through a bounded thread pool and aligns them into one wide frame (time x tickers).
+
+    Symbols that fail to load are left out of the frame and reported in *failures*.
+
+    **Examples**
+
+    >>> energy = PriceUniverse('ticks/energy-us.txt', max_workers=16)
+    >>> prices = energy.load(period=Period.MONTH, interval=Interval.DAY)
+    >>> prices.shape
+    (21, 243)
+    >>> energy.failures
+    {'PBR.A': "SymbolNotFoundError('No history returned for PBR.A.')", ...}
+    >>> volume = energy.field('Volume') #served from the loaded bars, no refetch
+    '''
+    def __init__(self,
+                 ticks: Union[str, Sequence[str]],
+                 provider: Optional[DataProvider] = None,
+                 cache: Union[BarCache, bool] = True,
+                 max_workers: int = 8
+                 ) -> None:
+        '''
+        :param ticks: list of ticker strings, or path to a ticks file
+        :param provider: (Optional) history source replacing yfinance
+        :param cache: True for the default bar cache, a BarCache instance, or False
+        :param max_workers: maximum number of concurrent fetches
+        '''
+        self.ticks = read_ticks(ticks) if isinstance(ticks, str) else list(dict.fromkeys(ticks))
+        self.provider = provider
+        self.cache = cache
+        self.max_workers = max_workers
+        self.bars: Dict[str, BarFrame] = {}
+        self.failures: Dict[str, str] = {}
+        self.prices: Optional[pd.DataFrame] = None
+
+    def _priceable(self, tick: str) -> Priceable:
+        return Priceable(type=LOADABLE.STOCK, name_symbol=tick, cache=self.cache, provider=self.provider)
+
+    def _fetch(self, tick: str, period: Union[Period, str], interval: Union[Interval, str, None]) -> BarFrame:
+        bars = self._priceable(tick).get_bars(period=period, interval=interval)
+        if len(bars)==0:
+            raise ValueError(f"Empty history for {tick}.")
+        return bars
+
+    async def _afetch(self, tick: str, period: Union[Period, str], interval: Union[Interval, str, None], fetcher: AsyncFetcher) -> BarFrame:
+        bars = await self._priceable(tick).aget_bars(period=period, interval=interval, fetcher=fetcher)
+        if len(bars)==0:
+            raise ValueError(f"Empty history for {tick}.")
+        return bars
+
+    def load(self,
+             period: Union[Period, str],
+             interval: Union[Interval, str] = None,
+             price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
+             join: str = "outer"
+             ) -> pd.DataFrame:
+        '''
+        Fetches every ticker and returns aligned prices, one column per loaded ticker.
+
+        :param period: period range for data lookback
+        :param interval: interval for price quoting during lookback period
+        :param price_timing: Open, Close, High, Low
+        :param join: outer keeps every timestamp (NaN where a ticker has no bar), inner keeps common timestamps
+        '''
+        self.bars = {}
+        self.failures = {}
+        workers = max(1, min(self.max_workers, len(self.ticks)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {tick: pool.submit(self._fetch, tick, period, interval) for tick in self.ticks}
+            for tick, future in futures.items():
+                try:
+                    self.bars[tick] = future.result()
+                except Exception as e:
+                    self.failures[tick] = repr(e)
+        self.prices = self.field(price_timing, join=join)
+        return self.prices
+
+    async def aload(self,
+                    period: Union[Period, str],
+                    interval: Union[Interval, str] = None,
+                    price_timing: Union[QuoteTiming, str] = QuoteTiming.CLOSE,
+                    join: str = "outer",
+                    fetcher: Optional[AsyncFetcher] = None,
+                    timeout: Optional[float] = None
+                    ) -> pd.DataFrame:
+        '''
+        Async load. Every cache miss goes through one AsyncFetcher, which bounds requests in flight,
+        rate-limits them and retries throttled requests with backoff.
+
+        :param fetcher: (Optional) shared fetcher, defaults to AsyncFetcher(provider, max_in_flight=max_workers)
+        :param timeout: (Optional) seconds after which unfinished symbols are cancelled and reported as failures
+
+        **Examples**
+
+        >>> energy = PriceUniverse('ticks/energy-us.txt')
+        >>> prices = asyncio.run(energy.aload(period='1d', interval='1m', fetcher=AsyncFetcher(max_in_flight=16, rate=8)))
+        '''
+        fetcher = fetcher if fetcher is not None else AsyncFetcher(self.provider, max_in_flight=self.max_workers)
+        self.bars = {}
+        self.failures = {}
+        tasks = {tick: asyncio.ensure_future(self._afetch(tick, period, interval, fetcher)) for tick in self.ticks}
+        try:
+            if tasks:
+                await asyncio.wait(tasks.values(), timeout=timeout)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for tick, task in tasks.items():
+            if task.cancelled():
+                self.failures[tick] = repr(TimeoutError(f"Fetch of {tick} cancelled after {timeout}s."))
+            elif task.exception() is not None:
+                self.failures[tick] = repr(task.exception())
+            else:
+                self.bars[tick] = task.result()
+        self.prices = self.field(price_timing, join=join)
+        return self.prices
+
+    def field(self, field: Union[QuoteTiming, str], join: str = "outer") -> pd.DataFrame:
+        '''
+        Returns one bar field (Open, High, Low, Close, Volume) of every loaded ticker as a wide frame.
+        '''
+        columns = [self.bars[tick].series(field, name=tick) for tick in self.ticks if tick in self.bars]
+        if not columns:
+            return pd.DataFrame()
+        return pd.concat(columns, axis=1, join=join)
+
+    def to_array(self) -> Tuple[np.ndarray, pd.Index, List[str]]:
+        '''
+        Returns loaded prices as a (time x tickers) float64 array, with its time index and column tickers.
+        '''
+        if self.prices is None:
+            raise ValueError("Universe has not been loaded. Call load() first.")
+        return self.prices.to_numpy(dtype=np.float64), self.prices.index, list(self.prices.columns)
+
+    def raise_failures(self) -> None:
+        '''
+        Raises a ValueError listing every symbol that failed to load.
+        '''
+        if self.failures:
+            raise ValueError(f"Failed to load priceables: {self.failures}")